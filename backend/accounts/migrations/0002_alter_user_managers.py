@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:51
+
+import analytics.changes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', analytics.changes.AuditedUserManager()),
+            ],
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
-class User(AbstractUser):
+from analytics.changes import AuditedModel, AuditedUserManager
+
+class User(AbstractUser, AuditedModel):
     ROLE_CHOICES = (
         ('CHC_ADMIN', 'CHC Administrator'),
         ('GOVT_ADMIN', 'Government Administrator'),
@@ -16,5 +18,10 @@ class User(AbstractUser):
     # Required for unique constraints if we want to enforce unique phone/email
     email = models.EmailField(unique=True)
 
+    objects = AuditedUserManager()
+    # last_login changes on every sign-in; password changes are recorded without the hash
+    audit_exclude = ('last_login',)
+    audit_masked = ('password',)
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
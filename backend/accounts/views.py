@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from .serializers import UserSerializer, RegisterSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import MyTokenObtainPairSerializer
+from utils.sparse import SparseQuerysetMixin
 
 User = get_user_model()
 
@@ -48,7 +49,7 @@ class ChangePasswordView(APIView):
         user.save()
         return Response({"message": "Password changed successfully", "status": "success"}, status=status.HTTP_200_OK)
 
-class CHCAdminListView(generics.ListAPIView):
+class CHCAdminListView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = UserSerializer
 
     def get_permissions(self):
@@ -66,5 +67,9 @@ class RemoveCHCAdminView(APIView):
     def delete(self, request, pk, *args, **kwargs):
         from django.shortcuts import get_object_or_404
         user = get_object_or_404(User, pk=pk, role='CHC_ADMIN')
+        chc = user.chc
         user.delete()
+        if chc:
+            # admin_name is part of the CHC payload; move its freshness token
+            chc.save(update_fields=['updated_at'])
         return Response({"message": "CHC Admin removed successfully"}, status=status.HTTP_204_NO_CONTENT)
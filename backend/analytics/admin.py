@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuditLog, Notification
+from .models import AuditLog, Notification, UsageDailyRollup
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
@@ -12,3 +12,8 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'title', 'notification_type', 'is_read', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('user__username', 'title')
+
+@admin.register(UsageDailyRollup)
+class UsageDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('machine', 'chc', 'machine_type', 'usage_date', 'total_hours', 'session_count')
+    list_filter = ('machine_type', 'usage_date', 'chc')
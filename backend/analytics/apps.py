@@ -0,0 +1,15 @@
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete, post_save
+
+class AnalyticsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'analytics'
+
+    def ready(self):
+        import analytics.signals
+        from .changes import AuditedModel
+
+        for model in apps.get_models():
+            if issubclass(model, AuditedModel):
+                post_save.connect(analytics.signals.audit_save, sender=model)
+                post_delete.connect(analytics.signals.audit_delete, sender=model)
@@ -0,0 +1,173 @@
+"""Buffered ``AuditLog`` writes.
+
+:func:`record` and :func:`record_many` hand rows to an in-process queue once
+the surrounding transaction commits, so a rolled-back change is never
+audited and the request does not pay for the insert. A daemon thread drains
+the queue with ``bulk_create`` every ``AUDIT_LOG_FLUSH_INTERVAL`` seconds, or
+sooner once ``AUDIT_LOG_BATCH_SIZE`` rows are waiting. Rows still queued when
+the process exits are written by an ``atexit`` hook.
+
+With ``AUDIT_LOG_MODE = 'sync'`` rows are inserted straight away inside the
+caller's transaction; the test runner uses this mode. ``'off'`` drops them.
+:func:`suspended` drops them for one block of code, such as seeding data.
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.dispatch import receiver
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+_suspended = contextvars.ContextVar('audit_suspended', default=False)
+
+
+class AuditWriter:
+    """Queue of unsaved ``AuditLog`` rows plus the thread that inserts them."""
+
+    def __init__(self, batch_size=500, flush_interval=1.0, max_attempts=3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.queue = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        # flush() may run on the writer thread and on a caller at the same time
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, rows):
+        for row in rows:
+            self.queue.put(row)
+        self._ensure_started()
+        if self.queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self.flush()
+        finally:
+            connection.close()
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows inserted."""
+        written = 0
+        with self._flush_lock:
+            while batch := self._drain():
+                written += self._write(batch)
+        return written
+
+    def _write(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                close_old_connections()
+                AuditLog.objects.bulk_create(batch)
+                return len(batch)
+            except DatabaseError:
+                logger.exception("Audit batch of %d rows failed (attempt %d of %d)", len(batch), attempt, self.max_attempts)
+                self._stopping.wait(0.1 * attempt)
+        # Last resort: the rows end up in the log instead of the table
+        for row in batch:
+            logger.error(
+                "Dropped audit row: user=%s action=%s table=%s record=%s new=%s at %s",
+                row.user_id, row.action_type, row.table_name, row.record_id, row.new_value, row.timestamp,
+            )
+        return 0
+
+    def stop(self, timeout=10):
+        """Stop the writer thread and write whatever is still queued."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditWriter(
+                batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 500),
+                flush_interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1.0),
+            )
+        return _writer
+
+
+@atexit.register
+def _flush_on_exit():
+    if _writer is not None:
+        _writer.stop()
+
+
+@receiver(setting_changed)
+def _reset_writer(setting, **kwargs):
+    global _writer
+    if setting.startswith('AUDIT_LOG_') and _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def record_many(rows):
+    """Audit ``rows`` (unsaved ``AuditLog`` instances) once the current transaction commits."""
+    if _suspended.get():
+        return
+    rows = list(rows)
+    if not rows:
+        return
+    mode = getattr(settings, 'AUDIT_LOG_MODE', 'async')
+    if mode == 'off':
+        return
+    if mode == 'sync':
+        AuditLog.objects.bulk_create(rows)
+        return
+    transaction.on_commit(lambda: get_audit_writer().submit(rows))
+
+
+def record(**fields):
+    """Audit a single change; takes the same keyword arguments as ``AuditLog``."""
+    record_many([AuditLog(**fields)])
+
+
+@contextmanager
+def suspended():
+    """Audit nothing inside the block on this thread (threads it starts still audit)."""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GOVT_SCOPE = 'govt'
+
+
+def _scope(chc_id):
+    return GOVT_SCOPE if chc_id is None else f"chc:{chc_id}"
+
+
+def _generation_key(scope):
+    return f"dashboard:{scope}:generation"
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def _generation(scope):
+    # A counter that was culled, expired or never set in this process starts
+    # from the clock, so it can never match the key of an older payload (or
+    # an ETag a client already holds)
+    return cache.get_or_set(_generation_key(scope), time.time_ns, timeout=_timeout())
+
+
+def dashboard_version(chc_id):
+    """Current generation of a scope; changes whenever its dashboards are invalidated."""
+    return _generation(_scope(chc_id))
+
+
+def get_dashboard(chc_id, build):
+    """Return the cached dashboard payload for a scope, building it on a miss.
+
+    ``chc_id=None`` is the global govt scope. Entries are keyed by a per-scope
+    generation counter, so a payload built while an invalidation is in flight
+    lands under a stale key and is never served. The counters expire with the
+    payloads: with a per-process cache, a worker that did not see a write
+    moves to a fresh generation after at most ``DASHBOARD_CACHE_TIMEOUT``.
+    """
+    scope = _scope(chc_id)
+    key = f"dashboard:{scope}:{_generation(scope)}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, timeout=_timeout())
+    return payload
+
+
+def _bump(scope):
+    try:
+        cache.incr(_generation_key(scope))
+    except ValueError:
+        cache.set(_generation_key(scope), time.time_ns(), timeout=_timeout())
+
+
+def invalidate_dashboards(chc_id):
+    """Drop the govt dashboard and the dashboard of ``chc_id`` once the current transaction commits."""
+    def bump():
+        _bump(GOVT_SCOPE)
+        if chc_id is not None:
+            _bump(_scope(chc_id))
+    transaction.on_commit(bump)
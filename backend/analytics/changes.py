@@ -0,0 +1,272 @@
+"""Automatic change capture into ``AuditLog``.
+
+Models inheriting :class:`AuditedModel` keep a snapshot of their column values
+taken when the row is loaded (``from_db``, a plain dict copy). Saving compares
+against the snapshot and audits only the fields that changed, as
+``old_value``/``new_value`` dicts keyed by column; an unchanged save writes
+nothing. Creates store the non-empty values and deletes store the last known
+ones. ``auto_now``/``auto_now_add`` columns are never tracked since the audit
+row has its own timestamp.
+
+:class:`AuditedQuerySet` covers the bulk paths Django does not send signals
+for: ``bulk_create``, ``bulk_update`` (diffed against each instance's
+snapshot) and ``update`` (diffed against the rows read just before it; only
+columns set to expressions such as ``F()`` are read back afterwards).
+``update`` and ``bulk_update`` also move ``auto_now`` columns such as
+``updated_at`` forward, as ``save()`` does.
+
+The save and delete receivers are connected for audited models only, so
+other models keep Django's fast bulk delete.
+
+Rows go through :func:`analytics.audit.record_many`. The acting user and IP
+address come from the request that :class:`AuditRequestMiddleware` remembers.
+Views can name the change with :func:`label`, e.g. ``APPROVE`` instead of
+``UPDATE``.
+"""
+import contextvars
+import datetime
+import decimal
+import uuid
+
+from django.contrib.auth.models import UserManager
+from django.db import models
+from django.utils import timezone
+
+from .audit import record_many
+from .models import AuditLog
+
+_request = contextvars.ContextVar('audit_request', default=None)
+# Set while bulk_update runs, whose per-batch update() calls are audited by bulk_update itself
+_in_bulk_update = contextvars.ContextVar('audit_in_bulk_update', default=False)
+
+MASK = '***'
+_tracked_columns = {}
+
+
+class AuditRequestMiddleware:
+    """Remembers the current request so audit rows can name the user and IP address.
+
+    DRF authenticates inside the view and copies the user onto this request,
+    so JWT users are seen too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+
+def acting_user_id():
+    """Id of the authenticated user behind the current request, if any."""
+    user = getattr(_request.get(), 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def tracked_columns(model):
+    """``(attnames, masked attnames)`` audited for ``model``."""
+    try:
+        return _tracked_columns[model]
+    except KeyError:
+        exclude = set(model.audit_exclude)
+        masked = set(model.audit_masked)
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+            and field.name not in exclude
+            and not getattr(field, 'auto_now', False)
+            and not getattr(field, 'auto_now_add', False)
+        ]
+        columns = (
+            tuple(field.attname for field in fields),
+            frozenset(field.attname for field in fields if field.name in masked),
+        )
+        _tracked_columns[model] = columns
+        return columns
+
+
+def snapshot(instance, fields=None):
+    """Remember the loaded values of ``instance`` (just ``fields`` after a partial refresh)."""
+    attnames, _ = tracked_columns(type(instance))
+    values = instance.__dict__
+    if fields is not None:
+        meta = instance._meta
+        fields = {meta.get_field(name).attname for name in fields}
+        attnames = [name for name in attnames if name in fields]
+    taken = {name: values[name] for name in attnames if name in values}
+    if fields is None:
+        instance._audit_snapshot = taken
+    else:
+        values.setdefault('_audit_snapshot', {}).update(taken)
+
+
+def label(instance, action_type, user=None, **extra):
+    """Audit the next save of ``instance`` as ``action_type`` by ``user``, adding ``extra`` to ``new_value``."""
+    instance._audit_label = (action_type, user, extra)
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _values(names, masked, values, compact):
+    return {
+        name: MASK if name in masked else _jsonable(values[name])
+        for name in names
+        if name in values and not (compact and values[name] in (None, ''))
+    }
+
+
+def _row(instance, action_type, old, new):
+    request = _request.get()
+    user_id = acting_user_id()
+    tagged = instance.__dict__.pop('_audit_label', None)
+    if tagged:
+        action_type, extra = tagged[0], tagged[2]
+        user_id = tagged[1].pk if tagged[1] is not None else user_id
+        new = {**(new or {}), **extra}
+    return AuditLog(
+        user_id=user_id,
+        action_type=action_type,
+        table_name=instance._meta.db_table,
+        record_id=str(instance.pk),
+        old_value=old or None,
+        new_value=new or None,
+        ip_address=request.META.get('REMOTE_ADDR') if request is not None else None,
+    )
+
+
+def created_row(instance):
+    attnames, masked = tracked_columns(type(instance))
+    row = _row(instance, 'CREATE', None, _values(attnames, masked, instance.__dict__, compact=True))
+    snapshot(instance)
+    return row
+
+
+def updated_row(instance, fields=None):
+    """The audit row for saving ``instance`` (only ``fields`` if given), or None when nothing changed."""
+    attnames, masked = tracked_columns(type(instance))
+    if fields is not None:
+        meta = instance._meta
+        fields = {meta.get_field(name).attname for name in fields}
+        attnames = [name for name in attnames if name in fields]
+    before = instance.__dict__.setdefault('_audit_snapshot', {})
+    current = instance.__dict__
+    changed = [
+        name for name in attnames
+        if name in before and name in current and before[name] != current[name]
+    ]
+    if not changed and '_audit_label' not in current:
+        return None
+    old = _values(changed, masked, before, compact=False)
+    new = _values(changed, masked, current, compact=False)
+    before.update((name, current[name]) for name in changed)
+    return _row(instance, 'UPDATE', old, new)
+
+
+def deleted_row(instance):
+    attnames, masked = tracked_columns(type(instance))
+    values = getattr(instance, '_audit_snapshot', None) or instance.__dict__
+    return _row(instance, 'DELETE', _values(attnames, masked, values, compact=True), None)
+
+
+class AuditedQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        record_many(created_row(obj) for obj in objs if obj.pk is not None)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        token = _in_bulk_update.set(True)
+        try:
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+        finally:
+            _in_bulk_update.reset(token)
+        record_many(filter(None, (updated_row(obj, fields) for obj in objs)))
+        return updated
+
+    def update(self, **kwargs):
+        # Django only fills auto_now columns on save(); incremental exports rely on them
+        for field in self.model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) and field.name not in kwargs and field.attname not in kwargs:
+                kwargs[field.name] = timezone.now()
+        if _in_bulk_update.get():
+            return super().update(**kwargs)
+        attnames, masked = tracked_columns(self.model)
+        fields = {}
+        for name, value in kwargs.items():
+            field = self.model._meta.get_field(name)
+            if field.attname in attnames:
+                fields[field.attname] = (field, value)
+        if not fields:
+            return super().update(**kwargs)
+        names = list(fields)
+        before = {row[0]: row[1:] for row in self.values_list('pk', *names)}
+        updated = super().update(**kwargs)
+        if not before:
+            return updated
+
+        literal, computed = {}, []
+        for name, (field, value) in fields.items():
+            if hasattr(value, 'resolve_expression'):
+                computed.append(name)
+            else:
+                literal[name] = field.to_python(value.pk if isinstance(value, models.Model) else value)
+        after = {}
+        if computed:
+            # Only the database knows what expressions such as F() produced
+            after = {
+                row[0]: dict(zip(computed, row[1:]))
+                for row in self.model._base_manager.using(self.db).filter(pk__in=list(before)).values_list('pk', *computed)
+            }
+        rows = []
+        for pk, values in before.items():
+            old = dict(zip(names, values))
+            new = {**literal, **after.get(pk, {})}
+            changed = [name for name in names if name in new and old[name] != new[name]]
+            if changed:
+                rows.append(_row(
+                    self.model(pk=pk), 'UPDATE',
+                    _values(changed, masked, old, compact=False), _values(changed, masked, new, compact=False),
+                ))
+        record_many(rows)
+        return updated
+
+
+AuditedManager = models.Manager.from_queryset(AuditedQuerySet)
+
+
+class AuditedUserManager(UserManager.from_queryset(AuditedQuerySet)):
+    pass
+
+
+class AuditedModel(models.Model):
+    """Base for models whose changes are audited; see the module docstring."""
+
+    # Field names left out of the audit trail, and ones recorded as changed without their value
+    audit_exclude = ()
+    audit_masked = ()
+
+    objects = AuditedManager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        snapshot(instance)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        snapshot(self, fields)
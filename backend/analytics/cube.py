@@ -0,0 +1,242 @@
+import threading
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from bookings.models import Booking
+from chc.models import CHC
+from machines.models import Machine
+from .models import AnalyticsCube, UsageDailyRollup
+
+USAGE_FIELDS = ('usage_hours', 'area_covered', 'residue_managed', 'fuel_consumed')
+COUNTER_FIELDS = ('machines_by_status', 'machines_by_type', 'bookings_by_status')
+
+_pending = threading.local()
+
+
+def _pending_set(name):
+    if not hasattr(_pending, name):
+        setattr(_pending, name, set())
+    return getattr(_pending, name)
+
+
+def schedule_cube_refresh(chc_id, state=None):
+    """Refresh the cube cells of ``chc_id`` (and its parents) once the current transaction commits.
+
+    ``state`` forces that state's cells to be recomputed too, for CHCs whose
+    own cube cell is already gone (deleted CHCs). Several writes inside one
+    transaction collapse into a single refresh: the first callback to run
+    drains everything pending.
+    """
+    if chc_id is None:
+        return
+    _pending_set('chc_ids').add(chc_id)
+    if state:
+        _pending_set('states').add(state)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    chc_ids, states = set(_pending_set('chc_ids')), set(_pending_set('states'))
+    _pending_set('chc_ids').clear()
+    _pending_set('states').clear()
+    if chc_ids:
+        refresh_cube(chc_ids, states)
+
+
+def _chc_cells(chcs):
+    chc_ids = [chc.id for chc in chcs]
+    machines = Machine.objects.filter(chc__in=chc_ids).order_by().values('chc', 'status', 'machine_type').annotate(n=Count('id'))
+    bookings = Booking.objects.filter(chc__in=chc_ids).order_by().values('chc', 'status').annotate(n=Count('id'))
+    usage = UsageDailyRollup.objects.filter(chc__in=chc_ids).order_by().values('chc').annotate(
+        usage_hours=Sum('total_hours'),
+        area_covered=Sum('area_covered'),
+        residue_managed=Sum('residue_managed'),
+        fuel_consumed=Sum('fuel_consumed'),
+    )
+
+    cells = {
+        chc.id: AnalyticsCube(
+            level='chc', state=chc.state, district=chc.district, chc=chc, name=chc.chc_name, chcs=1,
+            machines_by_status={}, machines_by_type={}, bookings_by_status={},
+        )
+        for chc in chcs
+    }
+    for row in machines:
+        cell = cells[row['chc']]
+        cell.machines += row['n']
+        cell.machines_by_status[row['status']] = cell.machines_by_status.get(row['status'], 0) + row['n']
+        cell.machines_by_type[row['machine_type']] = cell.machines_by_type.get(row['machine_type'], 0) + row['n']
+    for row in bookings:
+        cell = cells[row['chc']]
+        cell.bookings += row['n']
+        cell.bookings_by_status[row['status']] = row['n']
+    for row in usage:
+        for field in USAGE_FIELDS:
+            setattr(cells[row['chc']], field, row[field] or 0)
+    return list(cells.values())
+
+
+def _add(cell, child, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) the totals of ``child`` to ``cell``."""
+    cell.chcs += sign * child.chcs
+    cell.machines += sign * child.machines
+    cell.bookings += sign * child.bookings
+    for field in COUNTER_FIELDS:
+        counter = Counter(getattr(cell, field))
+        counter.update({key: sign * value for key, value in getattr(child, field).items()})
+        # Unary plus drops the keys that fell to zero
+        setattr(cell, field, dict(+counter))
+    for field in USAGE_FIELDS:
+        setattr(cell, field, Decimal(getattr(cell, field)) + sign * Decimal(getattr(child, field)))
+
+
+def _empty_cell(level, state, district):
+    return AnalyticsCube(
+        level=level, state=state, district=district, name=district or state,
+        machines_by_status={}, machines_by_type={}, bookings_by_status={},
+    )
+
+
+def _rollup(level, state, district, children):
+    cell = _empty_cell(level, state, district)
+    for child in children:
+        _add(cell, child)
+    return cell
+
+
+def _ancestors(cell):
+    return [('state', cell.state, ''), ('district', cell.state, cell.district)]
+
+
+CELL_FIELDS = ('name', 'chcs', 'machines', 'bookings') + COUNTER_FIELDS + USAGE_FIELDS
+
+
+def _with_retry(write, *args):
+    # A parent cell new to two concurrent refreshes is caught by the unique
+    # constraint; the loser retries and finds the winner's row
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return write(*args)
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def _save_parents(cells, existing):
+    """Write ``cells`` (keyed like ``existing``), dropping those left without CHCs."""
+    changed, created, emptied = [], [], []
+    now = timezone.now()
+    for key, cell in cells.items():
+        if cell.chcs <= 0:
+            if cell.pk is not None:
+                emptied.append(cell.pk)
+        elif cell.pk is None:
+            created.append(cell)
+        else:
+            cell.updated_at = now
+            changed.append(cell)
+    emptied += [cell.pk for key, cell in existing.items() if key not in cells]
+    AnalyticsCube.objects.bulk_update(changed, CELL_FIELDS + ('updated_at',))
+    AnalyticsCube.objects.bulk_create(created)
+    AnalyticsCube.objects.filter(pk__in=emptied).delete()
+
+
+def _apply_deltas(deltas):
+    """Add each ``(child, sign)`` of ``deltas`` to the parent cell it is keyed by.
+
+    Only the parent cells named in ``deltas`` are locked and read, so the
+    cost of a refresh does not grow with the number of CHCs in a state.
+    """
+    keys = Q()
+    for level, state, district in deltas:
+        keys |= Q(level=level, state=state, district=district)
+    existing = {
+        (cell.level, cell.state, cell.district): cell
+        for cell in AnalyticsCube.objects.select_for_update().filter(keys).order_by('level', 'state', 'district')
+    }
+    cells = {}
+    for key, changes in deltas.items():
+        cell = cells[key] = existing.get(key) or _empty_cell(*key)
+        for child, sign in changes:
+            _add(cell, child, sign)
+    _save_parents(cells, {})
+
+
+def _upsert_parents(states):
+    existing = {
+        (cell.level, cell.state, cell.district): cell
+        for cell in AnalyticsCube.objects.select_for_update().filter(level__in=['state', 'district'], state__in=states)
+    }
+    # Read after taking the locks, so the last refresh to get them sees every CHC cell written before it
+    children = defaultdict(list)
+    for cell in AnalyticsCube.objects.filter(level='chc', state__in=states):
+        for key in _ancestors(cell):
+            children[key].append(cell)
+
+    cells = {}
+    for key, cells_below in children.items():
+        rolled = _rollup(*key, cells_below)
+        cell = existing.get(key)
+        if cell is not None:
+            for field in CELL_FIELDS:
+                setattr(cell, field, getattr(rolled, field))
+            rolled = cell
+        cells[key] = rolled
+    _save_parents(cells, existing)
+
+
+def _same_cell(old, new):
+    return _ancestors(old) == _ancestors(new) and all(
+        getattr(old, field) == getattr(new, field) for field in CELL_FIELDS
+    )
+
+
+def refresh_cube(chc_ids=None, states=()):
+    """Recompute the cube for ``chc_ids`` and their ancestors, or the whole cube when omitted.
+
+    The parents of the given CHCs are moved by the difference between each
+    CHC's old and new cell. ``states`` (and a full rebuild) recompute their
+    parent cells from all their CHC cells instead; that is needed when a CHC
+    was deleted and its old cell is already gone.
+    """
+    with transaction.atomic():
+        chcs = CHC.objects.filter(is_active=True)
+        current = AnalyticsCube.objects.filter(level='chc')
+        states = set(states)
+        if chc_ids is not None:
+            # Refreshes of the same CHC queue up here, so each applies its delta to the cell the previous one wrote
+            list(CHC.objects.select_for_update().filter(id__in=chc_ids).order_by('pk').values_list('pk', flat=True))
+            chcs = chcs.filter(id__in=chc_ids)
+            current = current.filter(chc__in=chc_ids)
+        else:
+            states.update(AnalyticsCube.objects.values_list('state', flat=True))
+        old = {cell.chc_id: cell for cell in current}
+        chcs = list(chcs)
+        new = {cell.chc_id: cell for cell in _chc_cells(chcs)}
+
+        current.exclude(chc__in=list(new)).delete()
+        AnalyticsCube.objects.bulk_create(
+            list(new.values()), update_conflicts=True, unique_fields=['chc'],
+            update_fields=('level', 'state', 'district') + CELL_FIELDS + ('updated_at',),
+        )
+
+        if chc_ids is None:
+            states.update(chc.state for chc in chcs)
+        deltas = defaultdict(list)
+        for chc_id in set(old) | set(new):
+            before, after = old.get(chc_id), new.get(chc_id)
+            if before is not None and after is not None and _same_cell(before, after):
+                continue
+            for cell, sign in ((before, -1), (after, 1)):
+                if cell is not None and cell.state not in states:
+                    for key in _ancestors(cell):
+                        deltas[key].append((cell, sign))
+        if deltas:
+            _with_retry(_apply_deltas, deltas)
+        if states:
+            _with_retry(_upsert_parents, states)
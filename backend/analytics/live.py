@@ -0,0 +1,276 @@
+"""Live dashboard events for the server-sent events stream.
+
+Model signals call :func:`publish` with a small typed delta such as
+``booking.created``, ``booking.status``, ``machine.status`` or
+``usage.recorded``. Each delta is tagged with the CHC it belongs to and
+goes out once the transaction commits. The broker numbers events and keeps
+the last ``LIVE_EVENTS_HISTORY`` of them, so a reconnecting client can
+resume from ``Last-Event-ID``. Every open stream is a :class:`Subscriber`
+with a bounded queue. A stream is sent ``resync`` (re-fetch the dashboard)
+instead of the events it missed when it falls ``LIVE_EVENTS_QUEUE_SIZE``
+events behind, or resumes from an id the history no longer covers.
+
+``LIVE_EVENTS_BACKEND`` picks the broker. :class:`LocalBroker` only reaches
+streams in its own process, which is enough for a single ASGI worker.
+:class:`CacheBroker` shares events between workers through the Django cache,
+and each process relays them to its own streams from one polling thread.
+It needs a cache all workers see (Redis, Memcached or the file backend), not
+the default local-memory one.
+"""
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of the events a subscriber was too slow to take
+RESYNC = None
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+
+
+class Subscriber:
+    """One open stream: which events it may see and a bounded queue of them.
+
+    Must be created on the event loop that reads the queue.
+    """
+
+    def __init__(self, chc_id=None, queue_size=256):
+        # None sees every CHC (government admins)
+        self.chc_id = chc_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def wants(self, event):
+        return self.chc_id is None or event['chc_id'] == self.chc_id
+
+    def deliver(self, event):
+        """Queue ``event``; safe to call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # The loop has closed; the stream unsubscribes on its way out
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class LocalBroker:
+    """Fans events out to the streams of this process and keeps a replay history."""
+
+    def __init__(self, history=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._history = deque(maxlen=history)
+        self._latest = 0
+        self._subscribers = set()
+        # Numbering, history and delivery happen under one lock so every queue sees events in order
+        self._lock = threading.RLock()
+
+    def publish(self, event_type, data, chc_id=None):
+        with self._lock:
+            self._dispatch(self._event(self._latest + 1, event_type, data, chc_id))
+
+    def _event(self, seq, event_type, data, chc_id):
+        return {'id': f"{self.epoch}-{seq}", 'seq': seq, 'type': event_type, 'chc_id': chc_id, 'data': data}
+
+    def _dispatch(self, event):
+        with self._lock:
+            self._history.append(event)
+            self._latest = event['seq']
+            for subscriber in self._subscribers:
+                if subscriber.wants(event):
+                    subscriber.deliver(event)
+
+    def subscribe(self, subscriber, last_event_id=None):
+        """Register ``subscriber`` and return the events after ``last_event_id`` it may see.
+
+        Returns RESYNC when the history no longer reaches back to ``last_event_id``.
+        """
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if not last_event_id:
+                return []
+            epoch, _, seq = last_event_id.rpartition('-')
+            if epoch != self.epoch or not seq.isdigit():
+                return RESYNC
+            seq = int(seq)
+            if seq == self._latest:
+                return []
+            if seq > self._latest or not self._history or self._history[0]['seq'] > seq + 1:
+                return RESYNC
+            return [event for event in self._history if event['seq'] > seq and subscriber.wants(event)]
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def close(self):
+        pass
+
+
+class CacheBroker(LocalBroker):
+    """Shares events between worker processes through the default cache.
+
+    ``publish`` numbers an event with ``cache.incr`` and stores it under
+    ``live:event:<seq>`` for ``timeout`` seconds. Once a process has a
+    subscriber, a relay thread reads new events every ``poll_interval``
+    seconds and hands them to the local streams.
+    """
+
+    prefix = 'live:'
+
+    def __init__(self, history=1000, poll_interval=0.5, timeout=300):
+        super().__init__(history)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._join()
+        self._missing = (None, 0)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _join(self):
+        # Workers share the epoch, so an id issued by one is understood by all
+        cache.add(f"{self.prefix}epoch", uuid.uuid4().hex[:8], timeout=None)
+        cache.add(f"{self.prefix}seq", 0, timeout=None)
+        self.epoch = cache.get(f"{self.prefix}epoch")
+        self._latest = cache.get(f"{self.prefix}seq") or 0
+        self._history.clear()
+
+    def publish(self, event_type, data, chc_id=None):
+        try:
+            seq = cache.incr(f"{self.prefix}seq")
+        except ValueError:
+            # The cache was cleared; a new epoch tells clients to resync
+            self._join()
+            seq = cache.incr(f"{self.prefix}seq")
+        event = self._event(seq, event_type, data, chc_id)
+        cache.set(f"{self.prefix}event:{seq}", event, timeout=self.timeout)
+
+    def subscribe(self, subscriber, last_event_id=None):
+        self._ensure_started()
+        return super().subscribe(subscriber, last_event_id)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='live-events-relay', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.poll_interval):
+            try:
+                self.relay()
+            except Exception:
+                logger.exception("Live event relay failed")
+
+    def relay(self):
+        """Hand events published since the last call to this process's streams."""
+        latest = cache.get(f"{self.prefix}seq")
+        if latest is None or cache.get(f"{self.prefix}epoch") != self.epoch:
+            with self._lock:
+                self._join()
+            return
+        if latest <= self._latest:
+            return
+        keys = [f"{self.prefix}event:{seq}" for seq in range(self._latest + 1, latest + 1)]
+        found = cache.get_many(keys)
+        for key in keys:
+            event = found.get(key)
+            if event is None:
+                # Numbered but not stored yet: wait a couple of polls before giving it up
+                seq = int(key.rpartition(':')[2])
+                missing, polls = self._missing
+                self._missing = (seq, polls + 1 if missing == seq else 1)
+                if self._missing[1] <= 2:
+                    return
+                with self._lock:
+                    self._latest = seq
+                continue
+            self._dispatch(event)
+
+    def close(self):
+        self._stopping.set()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            path = getattr(settings, 'LIVE_EVENTS_BACKEND', 'analytics.live.LocalBroker')
+            _broker = import_string(path)(history=getattr(settings, 'LIVE_EVENTS_HISTORY', 1000))
+        return _broker
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    global _broker
+    if setting in ('LIVE_EVENTS_BACKEND', 'LIVE_EVENTS_HISTORY') and _broker is not None:
+        _broker.close()
+        _broker = None
+
+
+def publish(event_type, data, chc_id=None):
+    """Send an event to the live streams once the current transaction commits."""
+    transaction.on_commit(lambda: get_broker().publish(event_type, data, chc_id))
+
+
+def format_event(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def event_stream(subscriber, last_event_id=None, keepalive=15, max_age=3600, retry=3000):
+    """Server-sent events for ``subscriber``, ending after ``max_age`` seconds.
+
+    The browser reconnects on its own and resumes from the last id it saw.
+    A comment line every ``keepalive`` seconds keeps proxies from closing
+    an idle connection.
+    """
+    broker = get_broker()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_age
+    missed = broker.subscribe(subscriber, last_event_id)
+    try:
+        yield f"retry: {retry}\n\n"
+        if missed is RESYNC:
+            yield RESYNC_MESSAGE
+        else:
+            for event in missed:
+                yield format_event(event)
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is RESYNC:
+                subscriber.overflowed = False
+                yield RESYNC_MESSAGE
+            else:
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(subscriber)
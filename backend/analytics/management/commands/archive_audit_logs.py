@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics.retention import archive_audit_logs, archive_dir
+
+
+class Command(BaseCommand):
+    help = 'Move audit log rows older than the retention window into monthly gzip NDJSON archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Retention window (default: AUDIT_LOG_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.AUDIT_LOG_RETENTION_DAYS
+        moved = archive_audit_logs(timezone.now() - timedelta(days=days), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} audit log rows older than {days} days into {archive_dir()}"))
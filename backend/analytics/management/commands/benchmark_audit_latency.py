@@ -0,0 +1,94 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from analytics import audit
+from analytics.models import AuditLog
+from bookings.models import Booking
+from bookings.views import CHCBookingActionView
+from chc.models import CHC
+from machines.models import Machine
+
+FIRST_DAY = date(2031, 1, 1)
+MODES = ('off', 'sync', 'async')
+
+
+class Command(BaseCommand):
+    help = (
+        'Time booking approve/cancel requests with auditing off, written inside the request (sync) '
+        'and buffered to the background writer (async). Runs against the configured database with '
+        'throwaway data that is removed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Approve + cancel pairs per mode')
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        self.booking_ids = set()
+        with audit.suspended():
+            chc = CHC.objects.create(
+                chc_name='Audit Benchmark CHC', state='Benchmark', district='Benchmark', location='-',
+                pincode='000000', contact_number='0000000000', email='benchmark@example.com',
+            )
+            self.admin = User.objects.create_user(
+                username=f"audit-benchmark-{chc.id}", email='benchmark@example.com',
+                password=None, role='CHC_ADMIN', chc=chc,
+            )
+            self.machine = Machine.objects.create(chc=chc, machine_name='Bench', machine_type='Other', purchase_year=2024)
+        try:
+            for mode in MODES:
+                self.run_mode(chc, mode, options['requests'])
+        finally:
+            with audit.suspended():
+                AuditLog.objects.filter(
+                    table_name=Booking._meta.db_table, record_id__in=[str(pk) for pk in self.booking_ids]
+                ).delete()
+                self.admin.delete()
+                chc.delete()
+
+    def run_mode(self, chc, mode, count):
+        with audit.suspended():
+            Booking.objects.filter(chc=chc).delete()
+            bookings = [
+                Booking.objects.create(
+                    chc=chc, machine=self.machine, farmer_name='Farmer', farmer_contact='9876543210',
+                    farmer_email='farmer@example.com', farmer_aadhar='123456789012',
+                    start_date=FIRST_DAY + timedelta(days=2 * i), end_date=FIRST_DAY + timedelta(days=2 * i),
+                )
+                for i in range(count)
+            ]
+        self.booking_ids.update(booking.id for booking in bookings)
+        audited_before = AuditLog.objects.filter(user=self.admin).count()
+
+        with override_settings(AUDIT_LOG_MODE=mode):
+            timings = []
+            for action in ('approve', 'cancel'):
+                for booking in bookings:
+                    started = time.perf_counter()
+                    self.act(booking.id, action)
+                    timings.append(time.perf_counter() - started)
+            flushed = time.perf_counter()
+            if mode == 'async':
+                audit.get_audit_writer().flush()
+            flushed = time.perf_counter() - flushed
+
+        timings.sort()
+        audited = AuditLog.objects.filter(user=self.admin).count() - audited_before
+        self.stdout.write(
+            f"{mode:>5}: {len(timings)} requests, mean {statistics.mean(timings) * 1000:.2f}ms, "
+            f"p50 {timings[len(timings) // 2] * 1000:.2f}ms, p95 {timings[int(len(timings) * 0.95)] * 1000:.2f}ms; "
+            f"{audited} audit rows (final flush {flushed * 1000:.1f}ms)"
+        )
+
+    def act(self, booking_id, action):
+        request = self.factory.patch(f"/api/v1/bookings/chc/{booking_id}/action/", {'action': action}, format='json')
+        force_authenticate(request, user=self.admin)
+        response = CHCBookingActionView.as_view()(request, pk=booking_id)
+        if response.status_code != 200:
+            raise RuntimeError(f"{action} {booking_id} failed: {response.data}")
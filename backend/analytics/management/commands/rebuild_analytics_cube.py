@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from analytics.cube import refresh_cube
+from analytics.models import AnalyticsCube
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the state/district/CHC analytics cube from scratch'
+
+    def handle(self, *args, **options):
+        refresh_cube()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {AnalyticsCube.objects.count()} analytics cube cells"))
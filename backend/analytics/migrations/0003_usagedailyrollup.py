@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollup(apps, schema_editor):
+    MachineUsage = apps.get_model('usage', 'MachineUsage')
+    UsageDailyRollup = apps.get_model('analytics', 'UsageDailyRollup')
+    rows = MachineUsage.objects.order_by().values(
+        'chc', 'machine', 'machine__machine_type', 'usage_date'
+    ).annotate(
+        total_hours=Sum('total_hours_used'),
+        area_covered=Sum('area_covered'),
+        residue_managed=Sum('residue_managed'),
+        fuel_consumed=Sum('fuel_consumed'),
+        session_count=Count('id'),
+    )
+    UsageDailyRollup.objects.bulk_create([
+        UsageDailyRollup(
+            chc_id=row['chc'],
+            machine_id=row['machine'],
+            machine_type=row['machine__machine_type'],
+            usage_date=row['usage_date'],
+            total_hours=row['total_hours'] or 0,
+            area_covered=row['area_covered'] or 0,
+            residue_managed=row['residue_managed'] or 0,
+            fuel_consumed=row['fuel_consumed'] or 0,
+            session_count=row['session_count'],
+        ) for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_alter_auditlog_options'),
+        ('chc', '0003_remove_chc_admin_name'),
+        ('machines', '0002_alter_machine_options'),
+        ('usage', '0002_alter_machineusage_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('machine_type', models.CharField(max_length=50)),
+                ('usage_date', models.DateField()),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('area_covered', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('residue_managed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fuel_consumed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('chc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='chc.chc')),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='machines.machine')),
+            ],
+            options={
+                'ordering': ['-usage_date'],
+                'constraints': [models.UniqueConstraint(fields=('chc', 'machine', 'machine_type', 'usage_date'), name='unique_usage_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
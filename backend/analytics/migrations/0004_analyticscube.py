@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_usagedailyrollup'),
+        ('chc', '0003_remove_chc_admin_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('state', 'State'), ('district', 'District'), ('chc', 'CHC')], max_length=10)),
+                ('state', models.CharField(max_length=100)),
+                ('district', models.CharField(blank=True, default='', max_length=100)),
+                ('name', models.CharField(max_length=255)),
+                ('chcs', models.PositiveIntegerField(default=0)),
+                ('machines', models.PositiveIntegerField(default=0)),
+                ('machines_by_status', models.JSONField(default=dict)),
+                ('machines_by_type', models.JSONField(default=dict)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('bookings_by_status', models.JSONField(default=dict)),
+                ('usage_hours', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('area_covered', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('residue_managed', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fuel_consumed', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chc', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cube', to='chc.chc')),
+            ],
+            options={
+                'ordering': ['level', 'state', 'district', 'name'],
+                'indexes': [models.Index(fields=['level', 'state', 'district'], name='cube_drilldown_idx')],
+            },
+        ),
+    ]
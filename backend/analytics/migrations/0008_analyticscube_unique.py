@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:28
+
+from django.db import migrations, models
+
+
+def drop_duplicate_cells(apps, schema_editor):
+    # Concurrent refreshes could leave copies of a state or district cell; keep the newest
+    AnalyticsCube = apps.get_model('analytics', 'AnalyticsCube')
+    seen = set()
+    for cell in AnalyticsCube.objects.exclude(level='chc').order_by('-id').only('level', 'state', 'district'):
+        key = (cell.level, cell.state, cell.district)
+        if key in seen:
+            cell.delete()
+        seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_notification_indexes'),
+        ('chc', '0004_chc_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_cells, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='analyticscube',
+            constraint=models.UniqueConstraint(condition=models.Q(('level', 'chc'), _negated=True), fields=('level', 'state', 'district'), name='cube_cell_unique'),
+        ),
+    ]
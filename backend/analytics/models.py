@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class AuditLog(models.Model):
     ACTION_CHOICES = (
@@ -21,13 +22,20 @@ class AuditLog(models.Model):
     new_value = models.JSONField(null=True, blank=True)
     
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Stamped when the row is built, not when the buffered writer inserts it
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self):
         return f"{self.user} - {self.action_type} - {self.table_name}"
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Newest-first pages, archiving by age, and per-user / per-record history
+            models.Index(fields=['timestamp', 'id'], name='auditlog_time_idx'),
+            models.Index(fields=['user', 'timestamp'], name='auditlog_user_time_idx'),
+            models.Index(fields=['table_name', 'record_id'], name='auditlog_record_idx'),
+        ]
 
 class Notification(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
@@ -40,3 +48,75 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"{self.title} - {self.user}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # A user's newest-first list, and recounting their unread ones
+            models.Index(fields=['user', 'created_at'], name='notification_user_time_idx'),
+            models.Index(fields=['user', 'is_read'], name='notification_user_unread_idx'),
+        ]
+
+class UsageDailyRollup(models.Model):
+    """Per machine, per day totals of MachineUsage, maintained by analytics.signals."""
+    chc = models.ForeignKey('chc.CHC', on_delete=models.CASCADE, related_name='usage_rollups')
+    machine = models.ForeignKey('machines.Machine', on_delete=models.CASCADE, related_name='usage_rollups')
+    machine_type = models.CharField(max_length=50)
+    usage_date = models.DateField()
+
+    total_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    area_covered = models.DecimalField(max_digits=12, decimal_places=2, default=0) # in acres
+    residue_managed = models.DecimalField(max_digits=12, decimal_places=2, default=0) # in tons
+    fuel_consumed = models.DecimalField(max_digits=12, decimal_places=2, default=0) # in liters
+    session_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.machine_id} - {self.usage_date}"
+
+    class Meta:
+        ordering = ['-usage_date']
+        constraints = [
+            models.UniqueConstraint(fields=['chc', 'machine', 'machine_type', 'usage_date'], name='unique_usage_rollup_bucket'),
+        ]
+
+class AnalyticsCube(models.Model):
+    """Precomputed aggregates at state, district and CHC level, maintained by analytics.cube."""
+    LEVEL_CHOICES = (
+        ('state', 'State'),
+        ('district', 'District'),
+        ('chc', 'CHC'),
+    )
+
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    state = models.CharField(max_length=100)
+    district = models.CharField(max_length=100, blank=True, default='')
+    chc = models.OneToOneField('chc.CHC', on_delete=models.CASCADE, null=True, blank=True, related_name='cube')
+    name = models.CharField(max_length=255)
+
+    chcs = models.PositiveIntegerField(default=0)
+    machines = models.PositiveIntegerField(default=0)
+    machines_by_status = models.JSONField(default=dict)
+    machines_by_type = models.JSONField(default=dict)
+    bookings = models.PositiveIntegerField(default=0)
+    bookings_by_status = models.JSONField(default=dict)
+    usage_hours = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    area_covered = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    residue_managed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fuel_consumed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.level}: {self.name}"
+
+    class Meta:
+        ordering = ['level', 'state', 'district', 'name']
+        indexes = [
+            models.Index(fields=['level', 'state', 'district'], name='cube_drilldown_idx'),
+        ]
+        constraints = [
+            # CHC cells share their district's key and are kept unique by ``chc`` instead
+            models.UniqueConstraint(
+                fields=['level', 'state', 'district'], condition=~models.Q(level='chc'), name='cube_cell_unique',
+            ),
+        ]
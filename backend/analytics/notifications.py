@@ -0,0 +1,94 @@
+"""Notification fan-out and the cached unread counters behind the bell icon.
+
+Each user's unread count is cached under ``notifications:unread:<user id>``.
+New notifications ``incr`` it after commit, and marking read stores the
+recount, so the count endpoint normally runs no query. A missing key is
+rebuilt with one ``COUNT`` on the next read. With a per-process cache an
+adjustment only reaches the worker that made it, so counts expire after
+``NOTIFICATION_UNREAD_TIMEOUT`` seconds (30 by default).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import User
+from .models import Notification
+
+
+def _key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user_id):
+    count = cache.get(_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.set(_key(user_id), count, timeout=getattr(settings, 'NOTIFICATION_UNREAD_TIMEOUT', 30))
+    return count
+
+
+def adjust_unread(deltas):
+    """Apply ``{user_id: delta}`` to the cached counts once the current transaction commits."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    def apply():
+        for user_id, delta in deltas.items():
+            try:
+                if cache.incr(_key(user_id), delta) < 0:
+                    cache.delete(_key(user_id))
+            except ValueError:
+                pass  # Not cached; the next read counts
+    transaction.on_commit(apply)
+
+
+def mark_read(user_id, ids=None):
+    """Mark ``ids`` (or everything) read for a user; returns ``(marked, still unread)``."""
+    unread = Notification.objects.filter(user_id=user_id, is_read=False)
+    marked = (unread.filter(id__in=ids) if ids is not None else unread).update(is_read=True)
+    # Recount rather than decrement: this also repairs any drift in the cached value
+    remaining = unread.count() if ids is not None else 0
+    transaction.on_commit(lambda: cache.set(
+        _key(user_id), remaining, timeout=getattr(settings, 'NOTIFICATION_UNREAD_TIMEOUT', 30)
+    ))
+    return marked, remaining
+
+
+def notify_chc_admins(messages, exclude_user_id=None):
+    """Send each ``(chc_id, title, message, notification_type, related_url)`` to that CHC's active admins.
+
+    All notifications are written with a single ``bulk_create``.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    admins = {}
+    for user_id, chc_id in User.objects.filter(
+        role='CHC_ADMIN', is_active=True, chc_id__in={message[0] for message in messages}
+    ).exclude(pk=exclude_user_id).values_list('id', 'chc_id'):
+        admins.setdefault(chc_id, []).append(user_id)
+
+    notifications = [
+        Notification(user_id=user_id, title=title, message=message,
+                     notification_type=notification_type, related_url=related_url)
+        for chc_id, title, message, notification_type, related_url in messages
+        for user_id in admins.get(chc_id, ())
+    ]
+    Notification.objects.bulk_create(notifications)
+    adjust_unread(Counter(notification.user_id for notification in notifications))
+    return notifications
+
+
+def booking_message(booking, created=False):
+    """The notification tuple for a new booking or a booking's new status."""
+    if created:
+        title = f"New booking request {booking.booking_id}"
+        text = (f"{booking.farmer_name} requested {booking.machine.machine_name} "
+                f"from {booking.start_date} to {booking.end_date}.")
+    else:
+        title = f"Booking {booking.booking_id} is {booking.status}"
+        text = f"Booking {booking.booking_id} for {booking.farmer_name} is now {booking.status}."
+    return (booking.chc_id, title, text, 'BOOKING', f"chc_dashboard.html?booking={booking.booking_id}")
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def _ordinals(dates):
+    return np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+
+
+def occupancy_matrix(machine_ids, intervals, start_date, end_date):
+    """Build a boolean ``machines x days`` occupancy matrix.
+
+    ``machine_ids`` is a sorted sequence of machine ids (one row each) and
+    ``intervals`` an iterable of ``(machine_id, start_date, end_date)`` with
+    inclusive dates. Each interval adds +1 at its first day and -1 after its
+    last day in a difference array; a cumulative sum along the day axis then
+    gives the number of bookings covering every cell, without touching
+    individual days in Python.
+    """
+    days = (end_date - start_date).days + 1
+    machine_ids = np.asarray(machine_ids, dtype=np.int64)
+    intervals = list(intervals)
+    width = days + 1
+    counts = np.zeros(len(machine_ids) * width, dtype=np.int64)
+    if intervals and len(machine_ids):
+        owners, starts, ends = zip(*intervals)
+        owners = np.asarray(owners, dtype=np.int64)
+        rows = np.searchsorted(machine_ids, owners)
+        known = (rows < len(machine_ids)) & (machine_ids[np.minimum(rows, len(machine_ids) - 1)] == owners)
+
+        origin = start_date.toordinal()
+        first = _ordinals(starts) - origin
+        last = _ordinals(ends) - origin
+        keep = known & (last >= 0) & (first < days) & (first <= last)
+
+        base = rows[keep] * width
+        size = len(counts)
+        counts += np.bincount(base + np.clip(first[keep], 0, days), minlength=size)
+        counts -= np.bincount(base + np.clip(last[keep] + 1, 0, days), minlength=size)
+    diff = counts.reshape(len(machine_ids), width)
+    return np.cumsum(diff, axis=1)[:, :days] > 0
+
+
+def encode_rows(matrix):
+    """Encode each row of a boolean matrix as a string of '0'/'1' characters."""
+    if matrix.size == 0:
+        return [''] * matrix.shape[0]
+    raw = (matrix.astype(np.uint8) + ord('0')).tobytes()
+    width = matrix.shape[1]
+    return [raw[i:i + width].decode('ascii') for i in range(0, len(raw), width)]
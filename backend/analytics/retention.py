@@ -0,0 +1,178 @@
+"""Retention for ``AuditLog``: cold archives of old rows, and search across both tiers.
+
+:func:`archive_audit_logs` moves rows older than ``AUDIT_LOG_RETENTION_DAYS``
+out of the table, oldest first, in batches. Each batch is appended to one
+gzip NDJSON file per calendar month (UTC), e.g. ``auditlog-2025-10.ndjson.gz``
+under ``AUDIT_ARCHIVE_DIR``. Every append is a complete gzip member, so the
+files stay readable as one stream. A batch is deleted from the table only
+after its lines are on disk. If a run dies in between, the next run archives
+those rows again, and readers skip the duplicate lines.
+
+:func:`search_audit_logs` answers the same filters from the table and the
+archives, newest first. File names give the month, so only months inside
+the requested range are opened, and none once the table alone fills the
+page with newer rows.
+"""
+import datetime
+import gzip
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('id', 'user_id', 'action_type', 'table_name', 'record_id', 'old_value', 'new_value', 'ip_address', 'timestamp')
+_FILE_NAME = re.compile(r'^auditlog-(\d{4})-(\d{2})\.ndjson\.gz$')
+
+
+class _ArchiveEncoder(DjangoJSONEncoder):
+    # Keep microseconds so (timestamp, id) cursors match archived rows exactly
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def archive_dir():
+    return Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'audit'))
+
+
+def archive_path(year, month):
+    return archive_dir() / f"auditlog-{year:04d}-{month:02d}.ndjson.gz"
+
+
+def _month_bounds(year, month):
+    start = datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(year + month // 12, month % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+    return start, end
+
+
+def archive_audit_logs(older_than=None, batch_size=5000):
+    """Move rows with ``timestamp < older_than`` into the monthly archives; returns the number moved.
+
+    ``older_than`` defaults to ``AUDIT_LOG_RETENTION_DAYS`` days ago.
+    """
+    if older_than is None:
+        older_than = timezone.now() - datetime.timedelta(days=settings.AUDIT_LOG_RETENTION_DAYS)
+    archive_dir().mkdir(parents=True, exist_ok=True)
+    moved = 0
+    while True:
+        batch = list(
+            AuditLog.objects.filter(timestamp__lt=older_than)
+            .order_by('timestamp', 'id')
+            .values(*FIELDS)[:batch_size]
+        )
+        if not batch:
+            return moved
+        months = defaultdict(list)
+        for row in batch:
+            stamp = row['timestamp'].astimezone(datetime.timezone.utc)
+            months[stamp.year, stamp.month].append(json.dumps(row, cls=_ArchiveEncoder, separators=(',', ':')))
+        for (year, month), lines in months.items():
+            with open(archive_path(year, month), 'ab') as archive:
+                archive.write(gzip.compress(('\n'.join(lines) + '\n').encode()))
+                archive.flush()
+                os.fsync(archive.fileno())
+        AuditLog.objects.filter(pk__in=[row['id'] for row in batch]).delete()
+        moved += len(batch)
+
+
+def archived_months():
+    """``(year, month)`` of every archive file, oldest first."""
+    directory = archive_dir()
+    if not directory.is_dir():
+        return []
+    months = []
+    for path in directory.iterdir():
+        match = _FILE_NAME.match(path.name)
+        if match:
+            months.append((int(match[1]), int(match[2])))
+    return sorted(months)
+
+
+def read_archive(year, month):
+    """Rows of one month's archive, with ``timestamp`` parsed back into a datetime."""
+    try:
+        with gzip.open(archive_path(year, month), 'rt') as archive:
+            for line in archive:
+                row = json.loads(line)
+                row['timestamp'] = parse_datetime(row['timestamp'])
+                yield row
+    except (EOFError, gzip.BadGzipFile):
+        # A run that died mid-append leaves a truncated last member; its rows are still in the table
+        logger.warning("Archive %s ends in a truncated batch", archive_path(year, month))
+
+
+def _matches(row, filters):
+    return all(row[key] == value for key, value in filters.items())
+
+
+def search_audit_logs(user_id=None, table_name=None, action_type=None, record_id=None,
+                      start=None, end=None, before=None, limit=50, include_archive=True):
+    """Audit rows from the table and the archives, newest first.
+
+    ``start``/``end`` bound ``timestamp`` (inclusive/exclusive). ``before`` is
+    a ``(timestamp, id)`` pair from the last row of a previous page; only
+    older rows are returned.
+    """
+    filters = {
+        key: value for key, value in (
+            ('user_id', user_id), ('table_name', table_name),
+            ('action_type', action_type), ('record_id', record_id),
+        ) if value is not None
+    }
+    hot = AuditLog.objects.filter(**filters)
+    if start is not None:
+        hot = hot.filter(timestamp__gte=start)
+    if end is not None:
+        hot = hot.filter(timestamp__lt=end)
+    if before is not None:
+        hot = hot.filter(Q(timestamp__lt=before[0]) | Q(timestamp=before[0], id__lt=before[1]))
+    rows = list(hot.order_by('-timestamp', '-id').values(*FIELDS)[:limit])
+
+    if include_archive:
+        cold = []
+        for year, month in reversed(archived_months()):
+            month_start, month_end = _month_bounds(year, month)
+            if start is not None and month_end <= start:
+                break
+            if (end is not None and month_start >= end) or (before is not None and month_start > before[0]):
+                continue
+            if len(rows) >= limit and rows[-1]['timestamp'] >= month_end:
+                # The table already fills the page with rows newer than anything archived from here on
+                break
+            for row in read_archive(year, month):
+                stamp = row['timestamp']
+                if not _matches(row, filters):
+                    continue
+                if (start is not None and stamp < start) or (end is not None and stamp >= end):
+                    continue
+                if before is not None and (stamp, row['id']) >= tuple(before):
+                    continue
+                cold.append(row)
+            # Older months only hold older rows
+            if len(cold) >= limit:
+                break
+        rows.extend(cold)
+
+    newest = sorted(rows, key=lambda row: (row['timestamp'], row['id']), reverse=True)
+    unique, seen = [], set()
+    for row in newest:
+        key = (row['id'], row['timestamp'])
+        if key not in seen:
+            seen.add(key)
+            unique.append(row)
+        if len(unique) == limit:
+            break
+    return unique
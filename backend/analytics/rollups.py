@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from usage.models import MachineUsage
+from .models import UsageDailyRollup
+
+ROLLUP_AGGREGATES = {
+    'total_hours': Sum('total_hours_used'),
+    'area_covered': Sum('area_covered'),
+    'residue_managed': Sum('residue_managed'),
+    'fuel_consumed': Sum('fuel_consumed'),
+    'session_count': Count('id'),
+}
+# The unique key of a bucket (unique_usage_rollup_bucket)
+BUCKET_FIELDS = ['chc', 'machine', 'machine_type', 'usage_date']
+
+
+def _grouped_usage(queryset):
+    return queryset.order_by().values(
+        'chc', 'machine', 'machine__machine_type', 'usage_date'
+    ).annotate(**ROLLUP_AGGREGATES)
+
+
+def _to_rollup(row):
+    return UsageDailyRollup(
+        chc_id=row['chc'],
+        machine_id=row['machine'],
+        machine_type=row['machine__machine_type'],
+        usage_date=row['usage_date'],
+        total_hours=row['total_hours'] or 0,
+        area_covered=row['area_covered'] or 0,
+        residue_managed=row['residue_managed'] or 0,
+        fuel_consumed=row['fuel_consumed'] or 0,
+        session_count=row['session_count'],
+    )
+
+
+def refresh_usage_rollup(machine_id, usage_date):
+    """Recompute the rollup bucket(s) of one machine for one day.
+
+    Buckets are upserted in place; only buckets whose key no longer matches
+    any usage (the last session was deleted, or moved to another CHC or
+    machine type) are removed.
+    """
+    with transaction.atomic():
+        rollups = [
+            _to_rollup(row)
+            for row in _grouped_usage(MachineUsage.objects.filter(machine_id=machine_id, usage_date=usage_date))
+        ]
+        UsageDailyRollup.objects.bulk_create(
+            rollups, update_conflicts=True, unique_fields=BUCKET_FIELDS, update_fields=list(ROLLUP_AGGREGATES),
+        )
+        stale = UsageDailyRollup.objects.filter(machine_id=machine_id, usage_date=usage_date)
+        for rollup in rollups:
+            stale = stale.exclude(chc_id=rollup.chc_id, machine_type=rollup.machine_type)
+        stale.delete()
+
+
+def rebuild_usage_rollup(batch_size=1000):
+    """Drop and rebuild the whole rollup table from MachineUsage. Returns the bucket count."""
+    created = 0
+    with transaction.atomic():
+        UsageDailyRollup.objects.all().delete()
+        batch = []
+        for row in _grouped_usage(MachineUsage.objects.all()).iterator(chunk_size=batch_size):
+            batch.append(_to_rollup(row))
+            if len(batch) >= batch_size:
+                UsageDailyRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        UsageDailyRollup.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AuditLog, Notification
+from .models import AuditLog, Notification, AnalyticsCube
 
 class AuditLogSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,3 +10,9 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
+
+
+class AnalyticsCubeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalyticsCube
+        exclude = ('id',)
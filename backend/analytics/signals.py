@@ -0,0 +1,149 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from bookings.models import Booking
+from bookings.signals import bookings_bulk_changed
+from chc.models import CHC
+from machines.models import Machine
+from usage.models import MachineUsage
+from . import audit, live
+from .changes import acting_user_id, created_row, deleted_row, updated_row
+from .notifications import booking_message, notify_chc_admins
+from .models import UsageDailyRollup
+from .rollups import refresh_usage_rollup
+from .cache import invalidate_dashboards
+from .cube import schedule_cube_refresh
+
+@receiver(pre_save, sender=MachineUsage)
+def remember_usage_bucket(sender, instance, **kwargs):
+    # An edit may move the record to another machine or day, so the old
+    # bucket has to be refreshed as well as the new one.
+    instance._previous_rollup_bucket = None
+    loaded = getattr(instance, '_audit_snapshot', {})
+    if 'machine_id' in loaded and 'usage_date' in loaded:
+        # The audit snapshot already holds the values the row was loaded with
+        instance._previous_rollup_bucket = (loaded['machine_id'], loaded['usage_date'])
+    elif instance.pk:
+        instance._previous_rollup_bucket = MachineUsage.objects.filter(pk=instance.pk).values_list('machine_id', 'usage_date').first()
+
+@receiver(post_save, sender=MachineUsage)
+def update_rollup_on_save(sender, instance, **kwargs):
+    bucket = (instance.machine_id, instance.usage_date)
+    refresh_usage_rollup(*bucket)
+    previous = getattr(instance, '_previous_rollup_bucket', None)
+    if previous and previous != bucket:
+        refresh_usage_rollup(*previous)
+
+@receiver(post_delete, sender=MachineUsage)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    refresh_usage_rollup(instance.machine_id, instance.usage_date)
+
+@receiver(post_save, sender=Machine)
+def sync_rollup_machine_type(sender, instance, created, **kwargs):
+    if not created:
+        UsageDailyRollup.objects.filter(machine=instance).exclude(machine_type=instance.machine_type).update(machine_type=instance.machine_type)
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Machine)
+@receiver(post_delete, sender=Machine)
+@receiver(post_save, sender=MachineUsage)
+@receiver(post_delete, sender=MachineUsage)
+def invalidate_dashboard_cache(sender, instance, **kwargs):
+    invalidate_dashboards(instance.chc_id)
+    schedule_cube_refresh(instance.chc_id)
+
+@receiver(post_save, sender=CHC)
+@receiver(post_delete, sender=CHC)
+def invalidate_chc_dashboard_cache(sender, instance, **kwargs):
+    invalidate_dashboards(instance.pk)
+    schedule_cube_refresh(instance.pk, state=instance.state)
+
+@receiver(bookings_bulk_changed)
+def invalidate_bulk_booking_dashboards(sender, chc_ids, **kwargs):
+    for chc_id in chc_ids:
+        invalidate_dashboards(chc_id)
+        schedule_cube_refresh(chc_id)
+
+# Connected per audited model in AnalyticsConfig.ready(); a sender-less
+# post_delete receiver would turn off fast deletes for every model
+def audit_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    row = created_row(instance) if created else updated_row(instance, update_fields)
+    if row is not None:
+        audit.record_many([row])
+
+def audit_delete(sender, instance, **kwargs):
+    audit.record_many([deleted_row(instance)])
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_status(sender, instance, **kwargs):
+    # The audit snapshot holds the status the booking was loaded with
+    loaded = getattr(instance, '_audit_snapshot', {})
+    instance._previous_status = loaded.get('status')
+    instance._status_changed = 'status' in loaded and loaded['status'] != instance.status
+
+@receiver(post_save, sender=Booking)
+def notify_booking_change(sender, instance, created, raw=False, **kwargs):
+    if raw or not (created or getattr(instance, '_status_changed', False)):
+        return
+    notify_chc_admins([booking_message(instance, created=created)], exclude_user_id=acting_user_id())
+
+@receiver(bookings_bulk_changed)
+def notify_bulk_booking_changes(sender, bookings=(), user=None, **kwargs):
+    notify_chc_admins((booking_message(booking) for booking in bookings), exclude_user_id=getattr(user, 'pk', None))
+
+def _booking_event(booking, previous=None):
+    data = {
+        'id': booking.pk, 'booking_id': booking.booking_id, 'machine_id': booking.machine_id,
+        'status': booking.status, 'start_date': booking.start_date, 'end_date': booking.end_date,
+    }
+    if previous is not None:
+        data['previous_status'] = previous
+    return data
+
+@receiver(pre_save, sender=Machine)
+def remember_machine_status(sender, instance, **kwargs):
+    instance._previous_status = getattr(instance, '_audit_snapshot', {}).get('status')
+
+@receiver(post_save, sender=Booking)
+def publish_booking_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        live.publish('booking.created', _booking_event(instance), instance.chc_id)
+    elif getattr(instance, '_status_changed', False):
+        live.publish('booking.status', _booking_event(instance, instance._previous_status), instance.chc_id)
+
+@receiver(post_save, sender=Machine)
+def publish_machine_status(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_status', None)
+    if raw or created or previous is None or previous == instance.status:
+        return
+    live.publish('machine.status', {
+        'id': instance.pk, 'status': instance.status, 'previous_status': previous,
+    }, instance.chc_id)
+
+@receiver(post_save, sender=MachineUsage)
+def publish_usage(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    live.publish('usage.recorded', {
+        'id': instance.pk, 'machine_id': instance.machine_id, 'booking_id': instance.booking_id,
+        'usage_date': instance.usage_date, 'total_hours_used': instance.total_hours_used,
+    }, instance.chc_id)
+
+@receiver(bookings_bulk_changed)
+def publish_bulk_changes(sender, bookings=(), previous_statuses=None, machines=(), previous_machine_statuses=None, **kwargs):
+    previous_statuses = previous_statuses or {}
+    previous_machine_statuses = previous_machine_statuses or {}
+    for booking in bookings:
+        previous = previous_statuses.get(booking.pk)
+        if previous != booking.status:
+            live.publish('booking.status', _booking_event(booking, previous), booking.chc_id)
+    for machine in machines:
+        previous = previous_machine_statuses.get(machine.pk)
+        if previous != machine.status:
+            live.publish('machine.status', {
+                'id': machine.pk, 'status': machine.status, 'previous_status': previous,
+            }, machine.chc_id)
@@ -0,0 +1,999 @@
+import asyncio
+import gzip
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from analytics import audit, live, retention
+from analytics.cube import refresh_cube
+from analytics.rollups import refresh_usage_rollup
+from analytics.models import AnalyticsCube, AuditLog, Notification, UsageDailyRollup
+from bookings.models import Booking
+from chc.models import CHC
+from machines.models import Machine
+from usage.models import MachineUsage
+
+
+class GovtDashboardViewTests(APITestCase):
+    def setUp(self):
+        self.govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+        self.client.force_authenticate(user=self.govt_admin)
+        cache.clear()
+
+    def create_chc(self, index):
+        chc = CHC.objects.create(
+            chc_name=f"CHC {index}", state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email=f"chc{index}@example.com",
+        )
+        idle = Machine.objects.create(
+            chc=chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+        busy = Machine.objects.create(
+            chc=chc, machine_name='Mulcher', machine_type='Mulcher', purchase_year=2023, status='In Use'
+        )
+        booking = Booking.objects.create(
+            chc=chc, machine=busy, start_date=date(2025, 10, 1), end_date=date(2025, 10, 3),
+            status='Active', farmer_name='Ram Singh', farmer_contact='9876543210',
+            farmer_email='ram@example.com', farmer_aadhar='123456789012',
+        )
+        for machine in (idle, busy):
+            MachineUsage.objects.create(
+                machine=machine, chc=chc, booking=booking, farmer_name='Ram Singh',
+                farmer_contact='9876543210', usage_date=date(2025, 10, 1),
+                start_time=time(8, 0), end_time=time(10, 30),
+                area_covered=Decimal('2.00'), residue_managed=Decimal('1.50'),
+            )
+        return chc
+
+    def test_chc_analytics_totals(self):
+        chc = self.create_chc(1)
+        response = self.client.get(reverse('govt-dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['overview']['total_chcs'], 1)
+        self.assertEqual(response.data['overview']['total_machines'], 2)
+        self.assertEqual(response.data['overview']['total_usage_hours'], Decimal('5.00'))
+        row = response.data['chc_analytics'][0]
+        self.assertEqual(row['chc_id'], chc.id)
+        self.assertEqual(row['total_machines'], 2)
+        self.assertEqual(row['active_machines'], 1)
+        self.assertEqual(row['total_bookings'], 1)
+        self.assertEqual(row['active_bookings'], 1)
+        self.assertEqual(row['area_covered'], Decimal('4.00'))
+        self.assertEqual(row['residue_managed'], Decimal('3.00'))
+
+    def test_query_count_is_independent_of_chc_count(self):
+        self.create_chc(1)
+        with self.assertNumQueries(6):
+            self.client.get(reverse('govt-dashboard'))
+
+        for index in range(2, 12):
+            self.create_chc(index)
+        cache.clear()
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('govt-dashboard'))
+        self.assertEqual(len(response.data['chc_analytics']), 11)
+
+
+class GovtReportsViewTests(APITestCase):
+    def setUp(self):
+        govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+        self.client.force_authenticate(user=govt_admin)
+
+    def create_chc(self, district, statuses):
+        chc = CHC.objects.create(
+            chc_name=f"{district} CHC", state='Punjab', district=district, location='Main Road',
+            pincode='141001', contact_number='9876543210', email=f"{district.lower()}@example.com",
+        )
+        for status in statuses:
+            Machine.objects.create(
+                chc=chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022, status=status
+            )
+
+    def test_district_performance_uses_constant_queries(self):
+        self.create_chc('Ludhiana', ['Idle', 'Idle', 'Idle', 'In Use'])
+        self.create_chc('Patiala', ['In Use'])
+        for district in ('Amritsar', 'Bathinda', 'Jalandhar'):
+            self.create_chc(district, ['Idle'])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('govt-reports'))
+
+        performance = {row['district']: row for row in response.data['district_performance']}
+        self.assertEqual(len(performance), 5)
+        self.assertEqual(performance['Ludhiana']['machines'], 4)
+        self.assertEqual(performance['Ludhiana']['idle_machines'], 3)
+        self.assertEqual(performance['Patiala']['idle_machines'], 0)
+        messages = [item['message'] for item in response.data['recommendations']]
+        self.assertTrue(any(m.startswith('Ludhiana has 75% idle equipment') for m in messages))
+        self.assertFalse(any(m.startswith('Patiala') for m in messages))
+
+class GovtCHCDetailedAnalyticsViewTests(APITestCase):
+    def setUp(self):
+        govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+        self.client.force_authenticate(user=govt_admin)
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='CHC_ADMIN',
+            chc=self.chc, first_name='Gurpreet', last_name='Singh',
+        )
+
+    def add_machine(self, used_on):
+        machine = Machine.objects.create(
+            chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+        booking = Booking.objects.create(
+            chc=self.chc, machine=machine, start_date=used_on, end_date=used_on, status='Completed',
+            farmer_name='Ram Singh', farmer_contact='9876543210', farmer_email='ram@example.com',
+            farmer_aadhar='123456789012',
+        )
+        MachineUsage.objects.create(
+            machine=machine, chc=self.chc, booking=booking, farmer_name='Ram Singh',
+            farmer_contact='9876543210', usage_date=used_on, start_time=time(8, 0), end_time=time(11, 0),
+        )
+        return machine
+
+    def test_query_count_is_independent_of_machine_count(self):
+        url = reverse('govt-chc-detail-analytics', args=[self.chc.id])
+        self.add_machine(date(2025, 10, 1))
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+        for day in range(2, 8):
+            self.add_machine(date(2025, 10, day))
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+
+        self.assertEqual(response.data['chc_info']['admin'], 'Gurpreet Singh')
+        self.assertEqual(len(response.data['machines']), 7)
+        self.assertEqual(
+            sorted(m['last_used'] for m in response.data['machines']),
+            [date(2025, 10, day) for day in range(1, 8)]
+        )
+
+    def test_utilization_window(self):
+        today = timezone.localdate()
+        machine = self.add_machine(today)
+        MachineUsage.objects.create(
+            machine=machine, chc=self.chc, farmer_name='Ram Singh', farmer_contact='9876543210',
+            usage_date=today - timedelta(days=40), start_time=time(8, 0), end_time=time(9, 0),
+        )
+
+        url = reverse('govt-chc-detail-analytics', args=[self.chc.id])
+        response = self.client.get(url, {'days': 10})
+        utilization = response.data['machines'][0]['utilization']
+        self.assertEqual(utilization['active_days'], 1)
+        self.assertEqual(utilization['hours'], 3.0)
+        self.assertEqual(utilization['utilization_pct'], 10.0)
+
+        self.assertNotIn('utilization', self.client.get(url).data['machines'][0])
+        self.assertEqual(self.client.get(url, {'days': 'abc'}).status_code, 400)
+
+class UsageTimeSeriesViewTests(APITestCase):
+    def setUp(self):
+        govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+        self.client.force_authenticate(user=govt_admin)
+        self.punjab = self.create_machine('Punjab', 'Happy Seeder')
+        self.haryana = self.create_machine('Haryana', 'Mulcher')
+
+    def create_machine(self, state, machine_type):
+        chc = CHC.objects.create(
+            chc_name=f"{state} CHC", state=state, district='District', location='Main Road',
+            pincode='141001', contact_number='9876543210', email=f"{state.lower()}@example.com",
+        )
+        return Machine.objects.create(
+            chc=chc, machine_name=machine_type, machine_type=machine_type, purchase_year=2022
+        )
+
+    def record_usage(self, machine, usage_date, hours):
+        MachineUsage.objects.create(
+            machine=machine, chc=machine.chc, farmer_name='Ram Singh', farmer_contact='9876543210',
+            usage_date=usage_date, start_time=time(8, 0), end_time=time(9, 0),
+            total_hours_used=Decimal(hours), fuel_consumed=Decimal('1.50'),
+        )
+
+    def test_buckets_by_resolution(self):
+        self.record_usage(self.punjab, date(2025, 9, 30), '2.00')
+        self.record_usage(self.punjab, date(2025, 10, 1), '3.00')
+        self.record_usage(self.haryana, date(2025, 10, 6), '4.00')
+        url = reverse('usage-timeseries')
+
+        daily = self.client.get(url).data
+        self.assertEqual(daily['buckets'], ['2025-09-30', '2025-10-01', '2025-10-06'])
+        self.assertEqual(daily['hours'], [2.0, 3.0, 4.0])
+        self.assertEqual(daily['fuel'], [1.5, 1.5, 1.5])
+
+        weekly = self.client.get(url, {'resolution': 'week'}).data
+        self.assertEqual(weekly['buckets'], ['2025-W40', '2025-W41'])
+        self.assertEqual(weekly['hours'], [5.0, 4.0])
+
+        monthly = self.client.get(url, {'resolution': 'month', 'state': 'Punjab'}).data
+        self.assertEqual(monthly['buckets'], ['2025-09', '2025-10'])
+        self.assertEqual(monthly['hours'], [2.0, 3.0])
+
+        filtered = self.client.get(url, {'machine_type': 'Mulcher', 'start_date': '2025-10-01'}).data
+        self.assertEqual(filtered['buckets'], ['2025-10-06'])
+
+    def test_rejects_bad_parameters(self):
+        url = reverse('usage-timeseries')
+        self.assertEqual(self.client.get(url, {'resolution': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start_date': '2025-13-01'}).status_code, 400)
+
+class GovtOccupancyHeatmapViewTests(APITestCase):
+    def setUp(self):
+        govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+        self.client.force_authenticate(user=govt_admin)
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.seeder = Machine.objects.create(
+            chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+        self.mulcher = Machine.objects.create(
+            chc=self.chc, machine_name='Mulcher', machine_type='Mulcher', purchase_year=2022
+        )
+
+    def book(self, machine, start, end, status):
+        Booking.objects.create(
+            chc=self.chc, machine=machine, start_date=start, end_date=end, status=status,
+            farmer_name='Ram Singh', farmer_contact='9876543210', farmer_email='ram@example.com',
+            farmer_aadhar='123456789012',
+        )
+
+    def test_occupancy_matrix_and_utilization(self):
+        self.book(self.seeder, date(2025, 9, 28), date(2025, 10, 2), 'Completed')
+        self.book(self.seeder, date(2025, 10, 2), date(2025, 10, 3), 'Approved')
+        self.book(self.mulcher, date(2025, 10, 5), date(2025, 10, 9), 'Active')
+        self.book(self.mulcher, date(2025, 10, 1), date(2025, 10, 2), 'Pending')
+
+        response = self.client.get(
+            reverse('govt-occupancy-heatmap'), {'start_date': '2025-10-01', 'end_date': '2025-10-05'}
+        )
+
+        self.assertEqual(response.data['days'], 5)
+        rows = dict(zip([m['id'] for m in response.data['machines']], response.data['occupancy']))
+        self.assertEqual(rows[self.seeder.id], '11100')
+        self.assertEqual(rows[self.mulcher.id], '00001')
+        utilization = {m['id']: m['utilization_pct'] for m in response.data['machines']}
+        self.assertEqual(utilization, {self.seeder.id: 60.0, self.mulcher.id: 20.0})
+        self.assertEqual(response.data['chcs'][0]['utilization_pct'], 40.0)
+
+    def test_rejects_oversized_window(self):
+        response = self.client.get(
+            reverse('govt-occupancy-heatmap'), {'start_date': '2024-01-01', 'end_date': '2025-10-05'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+class UsageDailyRollupTests(APITestCase):
+    def setUp(self):
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.machine = Machine.objects.create(
+            chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+
+    def record_usage(self, usage_date, hours):
+        return MachineUsage.objects.create(
+            machine=self.machine, chc=self.chc, farmer_name='Ram Singh', farmer_contact='9876543210',
+            usage_date=usage_date, start_time=time(8, 0), end_time=time(9, 0),
+            total_hours_used=Decimal(hours), fuel_consumed=Decimal('3.00'),
+        )
+
+    def test_rollup_follows_creates_edits_and_deletes(self):
+        first = self.record_usage(date(2025, 10, 1), '2.00')
+        created = UsageDailyRollup.objects.get(machine=self.machine, usage_date=date(2025, 10, 1))
+        self.record_usage(date(2025, 10, 1), '3.00')
+        bucket = UsageDailyRollup.objects.get(machine=self.machine, usage_date=date(2025, 10, 1))
+        # Upserted in place rather than deleted and re-inserted
+        self.assertEqual(bucket.pk, created.pk)
+        self.assertEqual(bucket.total_hours, Decimal('5.00'))
+        self.assertEqual(bucket.fuel_consumed, Decimal('6.00'))
+        self.assertEqual(bucket.session_count, 2)
+        self.assertEqual(bucket.machine_type, 'Happy Seeder')
+
+        first.usage_date = date(2025, 10, 2)
+        first.save()
+        self.assertEqual(
+            UsageDailyRollup.objects.get(usage_date=date(2025, 10, 1)).total_hours, Decimal('3.00')
+        )
+        self.assertEqual(
+            UsageDailyRollup.objects.get(usage_date=date(2025, 10, 2)).total_hours, Decimal('2.00')
+        )
+
+        first.delete()
+        self.assertFalse(UsageDailyRollup.objects.filter(usage_date=date(2025, 10, 2)).exists())
+
+    def test_machine_type_change_moves_the_bucket(self):
+        self.record_usage(date(2025, 10, 1), '2.00')
+        Machine.objects.filter(pk=self.machine.pk).update(machine_type='Baler')
+        refresh_usage_rollup(self.machine.id, date(2025, 10, 1))
+        self.assertEqual(
+            list(UsageDailyRollup.objects.values_list('machine_type', 'total_hours')), [('Baler', Decimal('2.00'))]
+        )
+
+    def test_rebuild_command_restores_bulk_inserted_usage(self):
+        self.record_usage(date(2025, 10, 1), '2.00')
+        MachineUsage.objects.bulk_create([
+            MachineUsage(
+                machine=self.machine, chc=self.chc, farmer_name='Ram Singh', farmer_contact='9876543210',
+                usage_date=date(2025, 10, 3), start_time=time(8, 0), end_time=time(9, 0),
+                total_hours_used=Decimal('4.00'),
+            )
+        ])
+        UsageDailyRollup.objects.all().delete()
+
+        call_command('rebuild_usage_rollup', stdout=StringIO())
+
+        self.assertEqual(UsageDailyRollup.objects.count(), 2)
+        self.assertEqual(
+            UsageDailyRollup.objects.get(usage_date=date(2025, 10, 3)).total_hours, Decimal('4.00')
+        )
+
+
+class DashboardCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.machine = Machine.objects.create(
+            chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+        self.govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+        self.chc_admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='CHC_ADMIN', chc=self.chc
+        )
+
+    def record_usage(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            MachineUsage.objects.create(
+                machine=self.machine, chc=self.chc, farmer_name='Ram Singh', farmer_contact='9876543210',
+                usage_date=date(2025, 10, 1), start_time=time(8, 0), end_time=time(10, 0),
+            )
+
+    def assert_cached_until_usage_recorded(self, user, url):
+        self.client.force_authenticate(user=user)
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data, first.data)
+
+        self.record_usage()
+        return first.data, self.client.get(url).data
+
+    def test_govt_dashboard_is_cached_and_invalidated(self):
+        before, after = self.assert_cached_until_usage_recorded(
+            self.govt_admin, reverse('govt-dashboard')
+        )
+        self.assertEqual(before['overview']['total_usage_hours'], 0)
+        self.assertEqual(after['overview']['total_usage_hours'], Decimal('2.00'))
+
+    def test_chc_dashboard_is_cached_and_invalidated(self):
+        before, after = self.assert_cached_until_usage_recorded(
+            self.chc_admin, reverse('chc-dashboard')
+        )
+        self.assertEqual(before['total_usage_hours'], 0)
+        self.assertEqual(after['total_usage_hours'], 2.0)
+
+    def test_machine_save_invalidates_only_its_chc(self):
+        other = CHC.objects.create(
+            chc_name='Other', state='Punjab', district='Patiala', location='Nabha Road',
+            pincode='147001', contact_number='9876543211', email='other@example.com',
+        )
+        other_admin = User.objects.create_user(
+            username='other', email='other-admin@example.com', password='x', role='CHC_ADMIN', chc=other
+        )
+        self.client.force_authenticate(user=other_admin)
+        self.client.get(reverse('chc-dashboard'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.machine.status = 'Maintenance'
+            self.machine.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('chc-dashboard'))
+        self.client.force_authenticate(user=self.chc_admin)
+        response = self.client.get(reverse('chc-dashboard'))
+        self.assertEqual(response.data['charts']['status_breakdown'], {'Maintenance': 1})
+
+    def test_lost_generation_never_serves_an_older_payload(self):
+        self.client.force_authenticate(user=self.govt_admin)
+        url = reverse('govt-dashboard')
+        etag = self.client.get(url)['ETag']
+        # Written without the invalidation reaching this cache, as on another worker
+        MachineUsage.objects.create(
+            machine=self.machine, chc=self.chc, farmer_name='Ram Singh', farmer_contact='9876543210',
+            usage_date=date(2025, 10, 1), start_time=time(8, 0), end_time=time(10, 0),
+        )
+        # The counter is then culled or expires
+        cache.delete('dashboard:govt:generation')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['overview']['total_usage_hours'], Decimal('2.00'))
+
+    def test_file_based_cache_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}
+            with override_settings(CACHES=backend):
+                _, after = self.assert_cached_until_usage_recorded(
+                    self.govt_admin, reverse('govt-dashboard')
+                )
+        self.assertEqual(after['overview']['total_usage_hours'], Decimal('2.00'))
+
+
+class GovtDrilldownViewTests(APITestCase):
+    def setUp(self):
+        govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+        self.client.force_authenticate(user=govt_admin)
+
+    def create_chc(self, state, district, machines):
+        with self.captureOnCommitCallbacks(execute=True):
+            chc = CHC.objects.create(
+                chc_name=f"{district} CHC", state=state, district=district, location='Main Road',
+                pincode='141001', contact_number='9876543210', email=f"{district.lower()}@example.com",
+            )
+            for status in machines:
+                Machine.objects.create(
+                    chc=chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022, status=status
+                )
+        return chc
+
+    def drilldown(self, **params):
+        return self.client.get(reverse('govt-drilldown'), params).data['results']
+
+    def test_levels_are_maintained_incrementally(self):
+        ludhiana = self.create_chc('Punjab', 'Ludhiana', ['Idle', 'In Use'])
+        self.create_chc('Punjab', 'Patiala', ['Idle'])
+        self.create_chc('Haryana', 'Karnal', ['Idle', 'Idle', 'Idle'])
+
+        states = {row['name']: row for row in self.drilldown(level='state')}
+        self.assertEqual(states['Punjab']['chcs'], 2)
+        self.assertEqual(states['Punjab']['machines'], 3)
+        self.assertEqual(states['Punjab']['machines_by_status'], {'Idle': 2, 'In Use': 1})
+
+        districts = self.drilldown(level='district', state='Punjab', ordering='-machines')
+        self.assertEqual([row['name'] for row in districts], ['Ludhiana', 'Patiala'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MachineUsage.objects.create(
+                machine=ludhiana.machines.first(), chc=ludhiana, farmer_name='Ram Singh',
+                farmer_contact='9876543210', usage_date=date(2025, 10, 1),
+                start_time=time(8, 0), end_time=time(12, 0),
+            )
+            Booking.objects.create(
+                chc=ludhiana, machine=ludhiana.machines.first(), start_date=date(2025, 10, 1),
+                end_date=date(2025, 10, 2), farmer_name='Ram Singh', farmer_contact='9876543210',
+                farmer_email='ram@example.com', farmer_aadhar='123456789012',
+            )
+        chc_cell = self.drilldown(level='chc', state='Punjab', district='Ludhiana')[0]
+        self.assertEqual(chc_cell['usage_hours'], '4.00')
+        self.assertEqual(chc_cell['bookings_by_status'], {'Pending': 1})
+        self.assertEqual(AnalyticsCube.objects.get(level='state', state='Punjab').usage_hours, Decimal('4.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ludhiana.delete()
+        self.assertEqual([row['name'] for row in self.drilldown(level='district', state='Punjab')], ['Patiala'])
+
+    def test_refreshes_update_parent_cells_in_place(self):
+        self.create_chc('Punjab', 'Ludhiana', ['Idle'])
+        state_cell = AnalyticsCube.objects.get(level='state', state='Punjab')
+        patiala = self.create_chc('Punjab', 'Patiala', ['Idle', 'Idle'])
+        refresh_cube([patiala.id])
+        self.assertEqual(AnalyticsCube.objects.filter(level='state').count(), 1)
+        self.assertEqual(AnalyticsCube.objects.get(pk=state_cell.pk).machines, 3)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AnalyticsCube.objects.create(level='district', state='Punjab', district='Patiala', name='Patiala')
+
+    def test_refresh_cost_does_not_grow_with_the_state(self):
+        ludhiana = self.create_chc('Punjab', 'Ludhiana', ['Idle'])
+        # Outside captureOnCommitCallbacks, so the cube is left for refresh_cube below
+        Machine.objects.create(chc=ludhiana, machine_name='Baler', machine_type='Baler', purchase_year=2022)
+        with CaptureQueriesContext(connection) as small:
+            refresh_cube([ludhiana.id])
+        for district in ('Patiala', 'Amritsar', 'Jalandhar', 'Bathinda'):
+            self.create_chc('Punjab', district, ['Idle', 'In Use'])
+        Machine.objects.create(chc=ludhiana, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022)
+        with CaptureQueriesContext(connection) as large:
+            refresh_cube([ludhiana.id])
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+        state_cell = AnalyticsCube.objects.get(level='state', state='Punjab')
+        self.assertEqual((state_cell.chcs, state_cell.machines), (5, 11))
+        self.assertEqual(state_cell.machines_by_type, {'Happy Seeder': 10, 'Baler': 1})
+        rebuilt = {cell.pk: cell.machines_by_status for cell in AnalyticsCube.objects.exclude(level='chc')}
+        refresh_cube()
+        self.assertEqual(
+            {cell.pk: cell.machines_by_status for cell in AnalyticsCube.objects.exclude(level='chc')}, rebuilt
+        )
+
+    def test_reads_do_not_build_the_cube(self):
+        self.create_chc('Punjab', 'Ludhiana', ['Idle'])
+        AnalyticsCube.objects.all().delete()
+        self.assertEqual(self.drilldown(level='chc'), [])
+        self.assertFalse(AnalyticsCube.objects.exists())
+
+        call_command('rebuild_analytics_cube', stdout=StringIO())
+        self.assertEqual(len(self.drilldown(level='chc')), 1)
+        self.assertEqual(self.client.get(reverse('govt-drilldown'), {'level': 'village'}).status_code, 400)
+
+
+@override_settings(AUDIT_LOG_MODE='async')
+class AuditWriterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='x')
+        # Keep the writer thread out of the test transaction; flush() is called by hand
+        patcher = mock.patch.object(audit.AuditWriter, '_ensure_started')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, record_id):
+        audit.record(user=self.user, action_type='UPDATE', table_name='machines', record_id=str(record_id))
+
+    def test_rows_are_queued_after_commit_and_flushed_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for record_id in range(5):
+                self.record(record_id)
+        stamped = timezone.now()
+        self.assertFalse(AuditLog.objects.exists())
+
+        writer = audit.get_audit_writer()
+        writer.batch_size = 2
+        with self.assertNumQueries(3):
+            self.assertEqual(writer.flush(), 5)
+        self.assertEqual(sorted(AuditLog.objects.values_list('record_id', flat=True)), ['0', '1', '2', '3', '4'])
+        # The timestamp is taken when the change happens, not when the row is inserted
+        self.assertTrue(all(ts <= stamped for ts in AuditLog.objects.values_list('timestamp', flat=True)))
+
+    def test_rolled_back_changes_are_not_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.record(1)
+                raise RuntimeError
+        self.assertEqual(audit.get_audit_writer().flush(), 0)
+
+    def test_stop_writes_queued_rows(self):
+        writer = audit.AuditWriter(flush_interval=60)
+        writer.submit([AuditLog(user=self.user, action_type='DELETE', table_name='machines', record_id='7')])
+        writer.stop()
+        self.assertTrue(AuditLog.objects.filter(record_id='7').exists())
+
+    def test_failed_batches_are_logged_not_lost_silently(self):
+        writer = audit.AuditWriter(max_attempts=2)
+        writer.submit([AuditLog(user=self.user, action_type='DELETE', table_name='machines', record_id='7')])
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=DatabaseError), \
+                self.assertLogs('analytics.audit', 'ERROR') as logs:
+            self.assertEqual(writer.flush(), 0)
+        self.assertIn('Dropped audit row', logs.output[-1])
+
+    @override_settings(AUDIT_LOG_MODE='sync')
+    def test_sync_mode_writes_inside_the_request(self):
+        with self.assertNumQueries(1):
+            self.record(1)
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+
+class ChangeCaptureTests(APITestCase):
+    def setUp(self):
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='CHC_ADMIN', chc=self.chc
+        )
+        self.client.force_authenticate(user=self.admin)
+        AuditLog.objects.all().delete()
+
+    def audited(self, model, **filters):
+        return AuditLog.objects.filter(table_name=model._meta.db_table, **filters).order_by('pk')
+
+    def test_api_create_and_edit_store_minimal_diffs(self):
+        response = self.client.post(reverse('chc-machine-list-create'), {
+            'chc': self.chc.pk, 'machine_name': 'Seeder', 'machine_type': 'Happy Seeder', 'purchase_year': 2022,
+        })
+        machine_id = response.data['id']
+        created = self.audited(Machine, action_type='CREATE').get()
+        self.assertEqual(created.user, self.admin)
+        self.assertEqual(created.record_id, str(machine_id))
+        self.assertEqual(created.new_value['machine_name'], 'Seeder')
+        # Empty columns and auto timestamps are left out
+        self.assertNotIn('created_at', created.new_value)
+        self.assertFalse(any(value in (None, '') for value in created.new_value.values()))
+
+        self.client.patch(reverse('chc-machine-detail', args=[machine_id]), {'machine_name': 'Seeder 2'})
+        updated = self.audited(Machine, action_type='UPDATE').get()
+        self.assertEqual((updated.old_value, updated.new_value), ({'machine_name': 'Seeder'}, {'machine_name': 'Seeder 2'}))
+
+        # Saving without changes writes nothing
+        Machine.objects.get(pk=machine_id).save()
+        self.assertEqual(self.audited(Machine).count(), 2)
+
+    def test_sensitive_columns_are_masked_or_skipped(self):
+        self.admin.set_password('new-password')
+        self.admin.last_login = timezone.now()
+        self.admin.save()
+        row = self.audited(User, action_type='UPDATE').get()
+        self.assertEqual((row.old_value, row.new_value), ({'password': '***'}, {'password': '***'}))
+
+    def test_bulk_operations_are_audited(self):
+        machines = Machine.objects.bulk_create([
+            Machine(chc=self.chc, machine_name=f"M{i}", machine_code=f"M-{i}", machine_type='Mulcher', purchase_year=2022)
+            for i in range(3)
+        ])
+        self.assertEqual(self.audited(Machine, action_type='CREATE').count(), 3)
+
+        loaded = list(Machine.objects.order_by('pk'))
+        loaded[0].status = 'Maintenance'
+        Machine.objects.bulk_update(loaded, ['status'])
+        self.assertEqual(self.audited(Machine, action_type='UPDATE').get().record_id, str(machines[0].pk))
+
+        # Literal values need no read-back: snapshot, update, audit insert
+        with self.assertNumQueries(3):
+            Machine.objects.filter(pk__in=[m.pk for m in machines[1:]]).update(purchase_year=2020)
+        rows = self.audited(Machine, action_type='UPDATE', new_value__purchase_year=2020)
+        self.assertEqual([row.old_value for row in rows], [{'purchase_year': 2022}] * 2)
+
+        Machine.objects.filter(pk=machines[1].pk).update(purchase_year=F('purchase_year') + 1)
+        row = self.audited(Machine, action_type='UPDATE', new_value__purchase_year=2021).get()
+        self.assertEqual(row.old_value, {'purchase_year': 2020})
+
+        Machine.objects.filter(pk=machines[2].pk).delete()
+        deleted = self.audited(Machine, action_type='DELETE').get()
+        self.assertEqual(deleted.old_value['purchase_year'], 2020)
+
+    def test_unaudited_models_keep_fast_deletes(self):
+        AuditLog.objects.create(action_type='CREATE', table_name='x', record_id='1')
+        with self.assertNumQueries(1):
+            AuditLog.objects.filter(table_name='x').delete()
+
+    def test_usage_edit_reuses_the_loaded_bucket(self):
+        machine = Machine.objects.create(chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022)
+        usage = MachineUsage.objects.create(
+            machine=machine, chc=self.chc, farmer_name='Ram Singh', farmer_contact='9876543210',
+            farmer_aadhar='123456789012', usage_date=date(2025, 10, 1), start_time=time(8, 0), end_time=time(10, 0),
+        )
+        self.assertEqual(self.audited(MachineUsage, action_type='CREATE').get().new_value['farmer_aadhar'], '***')
+
+        usage = MachineUsage.objects.get(pk=usage.pk)
+        usage.usage_date = date(2025, 10, 2)
+        usage.save()
+        self.assertEqual(
+            self.audited(MachineUsage, action_type='UPDATE').get().new_value, {'usage_date': '2025-10-02'}
+        )
+        # Both days were refreshed without re-reading the old row
+        self.assertEqual(
+            list(UsageDailyRollup.objects.values_list('usage_date', flat=True)), [date(2025, 10, 2)]
+        )
+
+
+class AuditRetentionTests(APITestCase):
+    def setUp(self):
+        archive = tempfile.TemporaryDirectory()
+        self.addCleanup(archive.cleanup)
+        self.enterContext(override_settings(AUDIT_ARCHIVE_DIR=archive.name, AUDIT_LOG_RETENTION_DAYS=30))
+        self.govt = User.objects.create_user(username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN')
+        self.client.force_authenticate(user=self.govt)
+        AuditLog.objects.all().delete()
+        self.now = timezone.now()
+        # Two rows in each of the last five months plus today
+        for days_ago in (150, 140, 120, 110, 90, 80, 60, 50, 40, 35, 0):
+            AuditLog.objects.create(
+                user=self.govt if days_ago % 20 else None, action_type='UPDATE', table_name='machines_machine',
+                record_id=str(days_ago), new_value={'days_ago': days_ago},
+                timestamp=self.now - timedelta(days=days_ago),
+            )
+
+    def test_old_rows_move_to_monthly_archives(self):
+        out = StringIO()
+        call_command('archive_audit_logs', batch_size=3, stdout=out)
+        self.assertIn('Archived 10', out.getvalue())
+        self.assertEqual(list(AuditLog.objects.values_list('record_id', flat=True)), ['0'])
+
+        archived = [row for month in retention.archived_months() for row in retention.read_archive(*month)]
+        self.assertEqual(sorted(int(row['record_id']) for row in archived), [35, 40, 50, 60, 80, 90, 110, 120, 140, 150])
+        for year, month in retention.archived_months():
+            self.assertTrue(all(
+                (row['timestamp'].year, row['timestamp'].month) == (year, month)
+                for row in retention.read_archive(year, month)
+            ))
+        self.assertEqual(retention.archive_audit_logs(), 0)
+
+    def test_search_pages_through_table_and_archives(self):
+        retention.archive_audit_logs()
+        url = reverse('govt-audit-log')
+        seen, response = [], self.client.get(url, {'page_size': 4})
+        while True:
+            seen.extend(row['record_id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, ['0', '35', '40', '50', '60', '80', '90', '110', '120', '140', '150'])
+
+        only_hot = self.client.get(url, {'archived': 'false'}).data['results']
+        self.assertEqual([row['record_id'] for row in only_hot], ['0'])
+
+        start = (self.now - timedelta(days=125)).date().isoformat()
+        end = (self.now - timedelta(days=45)).date().isoformat()
+        filtered = self.client.get(url, {'user': self.govt.pk, 'start_date': start, 'end_date': end}).data['results']
+        self.assertEqual([row['record_id'] for row in filtered], ['50', '90', '110'])
+        self.assertEqual(filtered[0]['new_value'], {'days_ago': 50})
+
+    def test_full_pages_from_the_table_skip_the_archives(self):
+        retention.archive_audit_logs()
+        for days_ago in (1, 2):
+            AuditLog.objects.create(action_type='UPDATE', table_name='machines_machine', record_id=str(days_ago),
+                                    timestamp=self.now - timedelta(days=days_ago))
+        with mock.patch.object(retention, 'read_archive', wraps=retention.read_archive) as read_archive:
+            rows = retention.search_audit_logs(limit=2)
+            self.assertEqual([row['record_id'] for row in rows], ['0', '1'])
+            read_archive.assert_not_called()
+            self.assertEqual(len(retention.search_audit_logs(limit=4)), 4)
+            read_archive.assert_called()
+
+    def test_archived_batches_are_deleted_without_loading_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            retention.archive_audit_logs(batch_size=100)
+        deletes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(len(queries.captured_queries), 3)
+
+    def test_interrupted_runs_do_not_duplicate_or_break_reads(self):
+        retention.archive_audit_logs()
+        # A run that died after writing but before deleting leaves rows in both places
+        row = retention.search_audit_logs(record_id='35')[0]
+        AuditLog.objects.create(**{key: value for key, value in row.items()})
+        # ...and one that died mid-write leaves a truncated gzip member
+        year, month = retention.archived_months()[-1]
+        with open(retention.archive_path(year, month), 'ab') as archive:
+            archive.write(gzip.compress(b'{"id": 1}\n')[:12])
+
+        with self.assertLogs('analytics.retention', 'WARNING'):
+            rows = retention.search_audit_logs(table_name='machines_machine', limit=100)
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(len({row['record_id'] for row in rows}), 11)
+
+
+class NotificationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        other = CHC.objects.create(
+            chc_name='Other', state='Punjab', district='Patiala', location='Mall Road',
+            pincode='147001', contact_number='9876543211', email='other@example.com',
+        )
+        self.admin, self.colleague = [
+            User.objects.create_user(username=name, email=f"{name}@example.com", password='x', role='CHC_ADMIN', chc=self.chc)
+            for name in ('admin', 'colleague')
+        ]
+        self.outsider = User.objects.create_user(
+            username='outsider', email='outsider@example.com', password='x', role='CHC_ADMIN', chc=other
+        )
+        self.machine = Machine.objects.create(chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022)
+
+    def create_booking(self, day):
+        # Farmers book anonymously
+        self.client.force_authenticate(user=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('public-booking-create'), {
+                'machine': self.machine.id, 'start_date': date(2025, 10, day), 'end_date': date(2025, 10, day),
+                'farmer_name': 'Ram Singh', 'farmer_contact': '9876543210',
+                'farmer_email': 'ram@example.com', 'farmer_aadhar': '123456789012',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Booking.objects.latest('id')
+
+    def unread(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.get(reverse('notification-unread-count')).data['unread']
+
+    def test_new_bookings_reach_every_admin_of_the_chc(self):
+        booking = self.create_booking(1)
+        for user, expected in ((self.admin, 1), (self.colleague, 1), (self.outsider, 0)):
+            self.assertEqual(self.unread(user), expected)
+        notification = Notification.objects.get(user=self.admin)
+        self.assertEqual(notification.notification_type, 'BOOKING')
+        self.assertIn(booking.booking_id, notification.title)
+
+    def test_unread_count_is_served_from_the_counter(self):
+        self.assertEqual(self.unread(self.colleague), 0)
+        self.create_booking(1)
+
+        # An approval by one admin notifies the others and bumps their cached counts
+        booking = Booking.objects.get()
+        self.client.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('chc-booking-action', args=[booking.pk]), {'action': 'approve'}, format='json')
+        self.assertFalse(Notification.objects.filter(user=self.admin, title__contains='Approved').exists())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(self.colleague), 2)
+
+    def test_cached_counts_expire_within_seconds(self):
+        # Other workers' caches never see this process's adjustments
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.unread(self.admin)
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], 30)
+
+    def test_bulk_actions_fan_out_in_one_insert(self):
+        bookings = [self.create_booking(day) for day in (1, 3, 5)]
+        self.client.force_authenticate(user=self.admin)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('chc-booking-bulk-action'), {
+                'actions': [{'id': booking.id, 'action': 'approve'} for booking in bookings],
+            }, format='json')
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "analytics_notification"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Notification.objects.filter(user=self.colleague, title__endswith='Approved').count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.admin, title__endswith='Approved').count(), 0)
+
+    def test_list_and_mark_read(self):
+        for day in (1, 3, 5):
+            self.create_booking(day)
+        Notification.objects.create(user=self.outsider, title='Elsewhere', message='-')
+        self.assertEqual(self.unread(self.admin), 3)
+
+        page = self.client.get(reverse('notification-list'), {'page_size': 2}).data
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+        newest = page['results'][0]['id']
+
+        foreign = Notification.objects.get(user=self.outsider).id
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notification-mark-read'), {'ids': [newest, foreign]}, format='json')
+        self.assertEqual(response.data, {'updated': 1, 'unread': 2})
+        unread_ids = [row['id'] for row in self.client.get(reverse('notification-list'), {'unread': 'true'}).data['results']]
+        self.assertNotIn(newest, unread_ids)
+        self.assertFalse(Notification.objects.get(pk=foreign).is_read)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notification-mark-read'), {'all': True}, format='json')
+        self.assertEqual(response.data, {'updated': 2, 'unread': 0})
+        self.assertEqual(self.client.post(reverse('notification-mark-read'), {'ids': 'x'}, format='json').status_code, 400)
+
+
+class LiveEventsTests(APITestCase):
+    def setUp(self):
+        # A fresh broker for every test
+        self.enterContext(override_settings(LIVE_EVENTS_BACKEND='analytics.live.LocalBroker', LIVE_EVENTS_KEEPALIVE=0.05))
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='CHC_ADMIN', chc=self.chc)
+        self.govt = User.objects.create_user(username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN')
+        self.machine = Machine.objects.create(chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022)
+        self.broker = live.get_broker()
+
+    def published(self):
+        return [(event['type'], event['chc_id'], event['data']) for event in self.broker._history]
+
+    def test_model_changes_publish_typed_deltas_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('public-booking-create'), {
+                'machine': self.machine.id, 'start_date': date(2025, 10, 1), 'end_date': date(2025, 10, 1),
+                'farmer_name': 'Ram Singh', 'farmer_contact': '9876543210',
+                'farmer_email': 'ram@example.com', 'farmer_aadhar': '123456789012',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        booking = Booking.objects.get()
+        self.client.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('chc-booking-action', args=[booking.id]), {'action': 'approve'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('chc-booking-bulk-action'), {'actions': [{'id': booking.id, 'action': 'handover'}]}, format='json')
+        self.assertTrue(response.data['results'][0]['ok'])
+
+        events = self.published()
+        self.assertEqual([(event_type, chc_id) for event_type, chc_id, _ in events], [
+            ('booking.created', self.chc.id), ('booking.status', self.chc.id),
+            ('booking.status', self.chc.id), ('machine.status', self.chc.id),
+        ])
+        self.assertEqual(events[0][2]['booking_id'], booking.booking_id)
+        self.assertEqual((events[1][2]['previous_status'], events[1][2]['status']), ('Pending', 'Approved'))
+        self.assertEqual((events[2][2]['previous_status'], events[2][2]['status']), ('Approved', 'Active'))
+        self.assertEqual(events[3][2], {'id': self.machine.id, 'status': 'In Use', 'previous_status': 'Idle'})
+
+    def test_rolled_back_changes_publish_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic():
+                    self.machine.status = 'Maintenance'
+                    self.machine.save()
+                    raise DatabaseError
+        self.assertEqual(self.published(), [])
+
+    async def test_events_reach_subscribers_of_their_chc(self):
+        govt, own, other = live.Subscriber(None), live.Subscriber(self.chc.id), live.Subscriber(self.chc.id + 1)
+        for subscriber in (govt, own, other):
+            self.broker.subscribe(subscriber)
+        self.broker.publish('machine.status', {'id': 1}, self.chc.id)
+        await asyncio.sleep(0)
+        self.assertEqual(govt.queue.qsize(), 1)
+        self.assertEqual((await own.queue.get())['type'], 'machine.status')
+        self.assertTrue(other.queue.empty())
+
+    async def test_reconnects_replay_missed_events_or_resync(self):
+        for n in range(3):
+            self.broker.publish('usage.recorded', {'id': n}, self.chc.id if n != 1 else self.chc.id + 1)
+        first = self.broker._history[0]['id']
+        missed = self.broker.subscribe(live.Subscriber(self.chc.id), last_event_id=first)
+        self.assertEqual([event['data'] for event in missed], [{'id': 2}])
+        self.assertIs(self.broker.subscribe(live.Subscriber(), last_event_id='restarted-1'), live.RESYNC)
+
+        slow = live.Subscriber(queue_size=2)
+        self.broker.subscribe(slow)
+        for n in range(3):
+            self.broker.publish('usage.recorded', {'id': n}, self.chc.id)
+        await asyncio.sleep(0)
+        self.assertIs(await slow.queue.get(), live.RESYNC)
+        self.assertTrue(slow.queue.empty())
+
+    @override_settings(LIVE_EVENTS_MAX_AGE=0.5)
+    async def test_stream_is_scoped_to_the_token_user(self):
+        response = await self.async_client.get(reverse('live-events'), headers={'Authorization': f"Bearer {AccessToken.for_user(self.admin)}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        self.broker.publish('machine.status', {'id': 1}, self.chc.id + 1)
+        self.broker.publish('machine.status', {'id': 2}, self.chc.id)
+        received = await anext(chunks)
+        while received.startswith(b':'):
+            received = await anext(chunks)
+        self.assertEqual(received, f"id: {self.broker.epoch}-2\nevent: machine.status\ndata: {{\"id\":2}}\n\n".encode())
+        # The stream closes itself after LIVE_EVENTS_MAX_AGE and the browser reconnects
+        rest = [chunk async for chunk in chunks]
+        self.assertEqual(set(rest), {b': keepalive\n\n'})
+        self.assertEqual(self.broker._subscribers, set())
+
+    async def test_stream_requires_a_dashboard_user(self):
+        url = reverse('live-events')
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        self.assertEqual((await self.async_client.get(url, {'token': 'garbage'})).status_code, 401)
+        farmer = await User.objects.acreate(username='farmer', email='farmer@example.com', role='CHC_ADMIN')
+        self.assertEqual((await self.async_client.get(url, {'token': str(AccessToken.for_user(farmer))})).status_code, 403)
+
+    def test_stream_needs_the_asgi_server(self):
+        self.client.force_authenticate(user=self.govt)
+        response = self.client.get(reverse('live-events'), {'token': str(AccessToken.for_user(self.govt))})
+        self.assertEqual(response.status_code, 501)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import GovtDashboardView, CHCDashboardView, MachineAnalyticsView, GovtCHCDetailedAnalyticsView, GovtReportsView
+from .views import GovtDashboardView, CHCDashboardView, MachineAnalyticsView, GovtCHCDetailedAnalyticsView, GovtReportsView, UsageTimeSeriesView, GovtOccupancyHeatmapView, GovtDrilldownView, GovtAuditLogView, NotificationListView, NotificationUnreadCountView, NotificationMarkReadView, LiveEventsView
 
 urlpatterns = [
     path('govt/dashboard/', GovtDashboardView.as_view(), name='govt-dashboard'),
@@ -7,4 +7,12 @@ urlpatterns = [
     path('machines/', MachineAnalyticsView.as_view(), name='machine-analytics'),
     path('govt/chc/<int:chc_id>/', GovtCHCDetailedAnalyticsView.as_view(), name='govt-chc-detail-analytics'),
     path('govt/reports/', GovtReportsView.as_view(), name='govt-reports'),
+    path('govt/drilldown/', GovtDrilldownView.as_view(), name='govt-drilldown'),
+    path('govt/audit/', GovtAuditLogView.as_view(), name='govt-audit-log'),
+    path('govt/occupancy/', GovtOccupancyHeatmapView.as_view(), name='govt-occupancy-heatmap'),
+    path('notifications/', NotificationListView.as_view(), name='notification-list'),
+    path('notifications/unread-count/', NotificationUnreadCountView.as_view(), name='notification-unread-count'),
+    path('notifications/mark-read/', NotificationMarkReadView.as_view(), name='notification-mark-read'),
+    path('live/', LiveEventsView.as_view(), name='live-events'),
+    path('usage/timeseries/', UsageTimeSeriesView.as_view(), name='usage-timeseries'),
 ]
@@ -1,69 +1,139 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import permissions
-from django.db.models import Count, Sum, Avg
+from rest_framework import generics, filters, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from asgiref.sync import sync_to_async
+import numpy as np
+from datetime import datetime, time, timedelta
+from django.db.models import Count, Sum, Avg, Q, OuterRef, Prefetch, Subquery
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from accounts.models import User
 from machines.models import Machine
 from bookings.models import Booking
 from usage.models import MachineUsage
 from chc.models import CHC
+from chc.views import IsGovtAdmin
+from utils.conditional import ConditionalGetMixin
+from utils.pagination import KeysetPagination
+from .models import UsageDailyRollup, AnalyticsCube, AuditLog, Notification
+from .serializers import AnalyticsCubeSerializer, NotificationSerializer
+from .notifications import mark_read, unread_count
+from .cache import get_dashboard, dashboard_version
+from .occupancy import occupancy_matrix, encode_rows
+from .retention import search_audit_logs
+from .live import Subscriber, event_stream
 
-class GovtDashboardView(APIView):
+
+def _group_by(queryset, field, **aggregates):
+    """Run ``aggregates`` grouped by ``field`` and return a ``{value: row}`` dict."""
+    # order_by() clears the model's default ordering, which would otherwise
+    # leak into the GROUP BY clause.
+    rows = queryset.order_by().values(field).annotate(**aggregates)
+    return {row.pop(field): row for row in rows}
+
+
+def _total(grouped, key):
+    return sum((row[key] or 0 for row in grouped.values()), 0)
+
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, returning None when it is invalid."""
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+class AnalyticsFreshnessMixin(ConditionalGetMixin):
+    """Use the dashboard cache generation (no queries) as the freshness token.
+
+    The generation of a scope moves on every booking, machine, usage or CHC
+    write; the date is mixed in because some reports default to "today".
+    """
+    def get_freshness_chc(self):
+        user = self.request.user
+        return None if user.role == 'GOVT_ADMIN' else user.chc_id
+
+    def get_freshness_token(self):
+        return f"{dashboard_version(self.get_freshness_chc())}:{timezone.localdate()}"
+
+
+class GovtDashboardView(AnalyticsFreshnessMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
         if request.user.role != 'GOVT_ADMIN':
             return Response({"error": "Unauthorized"}, status=403)
-        
-        # 1. Overall Key Metrics
-        total_chcs = CHC.objects.filter(is_active=True).count()
-        total_machines = Machine.objects.count()
-        total_bookings = Booking.objects.count()
-        total_usage_hours = MachineUsage.objects.aggregate(Sum('total_hours_used'))['total_hours_used__sum'] or 0
-        total_residue_managed = MachineUsage.objects.aggregate(Sum('residue_managed'))['residue_managed__sum'] or 0
-        total_area_covered = MachineUsage.objects.aggregate(Sum('area_covered'))['area_covered__sum'] or 0
+        return Response(get_dashboard(None, self.build_payload))
+
+    def build_payload(self):
+        # Per-CHC rollups: one grouped query per table, using conditional
+        # aggregation so the query count does not grow with the number of CHCs.
+        machine_stats = _group_by(
+            Machine.objects.all(), 'chc',
+            total_machines=Count('id'),
+            active_machines=Count('id', filter=Q(status='In Use')),
+        )
+        booking_stats = _group_by(
+            Booking.objects.all(), 'chc',
+            total_bookings=Count('id'),
+            active_bookings=Count('id', filter=Q(status='Active')),
+        )
+        usage_stats = _group_by(
+            UsageDailyRollup.objects.all(), 'chc',
+            total_hours=Sum('total_hours'),
+            area_covered=Sum('area_covered'),
+            residue_managed=Sum('residue_managed'),
+        )
+
+        # 1. Overall Key Metrics (folded from the per-CHC rollups)
+        chcs = list(CHC.objects.filter(is_active=True).values('id', 'chc_name', 'district'))
+        total_chcs = len(chcs)
+        total_machines = _total(machine_stats, 'total_machines')
+        total_bookings = _total(booking_stats, 'total_bookings')
+        total_usage_hours = _total(usage_stats, 'total_hours')
+        total_residue_managed = _total(usage_stats, 'residue_managed')
+        total_area_covered = _total(usage_stats, 'area_covered')
 
         # 2. Charts Data (State-Wide)
         # Status Breakdown (Active/Idle/Maintenance)
-        status_breakdown_qs = Machine.objects.values('status').annotate(count=Count('id'))
+        status_breakdown_qs = Machine.objects.order_by().values('status').annotate(count=Count('id'))
         status_breakdown = {item['status']: item['count'] for item in status_breakdown_qs}
         
         # Machine Type Breakdown
-        machine_types_qs = Machine.objects.values('machine_type').annotate(count=Count('id'))
+        machine_types_qs = Machine.objects.order_by().values('machine_type').annotate(count=Count('id'))
         machine_types = {item['machine_type']: item['count'] for item in machine_types_qs}
 
         # 3. CHC-Wise Analytics (Leaderboard Matrix)
-        # Calculate active machine count per CHC, usage hours, area, and residue
-        chcs = CHC.objects.filter(is_active=True)
         chc_metrics = []
         for chc in chcs:
-            chc_id = chc.id
-            chc_machines = Machine.objects.filter(chc=chc)
-            chc_total_machines = chc_machines.count()
-            chc_active_machines = chc_machines.filter(status='In Use').count()
-            
-            chc_bookings = Booking.objects.filter(chc=chc)
-            chc_total_bookings = chc_bookings.count()
-            chc_active_bookings = chc_bookings.filter(status='Active').count()
-            
-            chc_usage = MachineUsage.objects.filter(chc=chc)
-            c_hours = chc_usage.aggregate(Sum('total_hours_used'))['total_hours_used__sum'] or 0
-            c_area = chc_usage.aggregate(Sum('area_covered'))['area_covered__sum'] or 0
-            c_residue = chc_usage.aggregate(Sum('residue_managed'))['residue_managed__sum'] or 0
-            
+            machines = machine_stats.get(chc['id'], {})
+            bookings = booking_stats.get(chc['id'], {})
+            usage = usage_stats.get(chc['id'], {})
             chc_metrics.append({
-                "chc_id": chc_id,
-                "chc_name": chc.chc_name,
-                "district": chc.district,
-                "total_machines": chc_total_machines,
-                "active_machines": chc_active_machines,
-                "total_bookings": chc_total_bookings,
-                "active_bookings": chc_active_bookings,
-                "total_hours": c_hours,
-                "area_covered": c_area,
-                "residue_managed": c_residue
+                "chc_id": chc['id'],
+                "chc_name": chc['chc_name'],
+                "district": chc['district'],
+                "total_machines": machines.get('total_machines', 0),
+                "active_machines": machines.get('active_machines', 0),
+                "total_bookings": bookings.get('total_bookings', 0),
+                "active_bookings": bookings.get('active_bookings', 0),
+                "total_hours": usage.get('total_hours') or 0,
+                "area_covered": usage.get('area_covered') or 0,
+                "residue_managed": usage.get('residue_managed') or 0
             })
 
-        return Response({
+        return {
             "overview": {
                 "total_chcs": total_chcs,
                 "total_machines": total_machines,
@@ -77,37 +147,42 @@ class GovtDashboardView(APIView):
                 "machine_types": machine_types
             },
             "chc_analytics": chc_metrics
-        })
+        }
 
-class CHCDashboardView(APIView):
+class CHCDashboardView(AnalyticsFreshnessMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
         user = request.user
-        if user.role != 'CHC_ADMIN' or not user.chc:
+        if user.role != 'CHC_ADMIN' or not user.chc_id:
             return Response({"error": "Unauthorized"}, status=403)
         
-        chc = user.chc
+        return Response(get_dashboard(user.chc_id, lambda: self.build_payload(user.chc_id)))
+
+    def build_payload(self, chc):
         machines = Machine.objects.filter(chc=chc)
         bookings = Booking.objects.filter(chc=chc)
+        usage = UsageDailyRollup.objects.filter(chc=chc).aggregate(
+            hours=Sum('total_hours'), area=Sum('area_covered'), residue=Sum('residue_managed')
+        )
         
-        return Response({
+        return {
             "total_machines": machines.count(),
             "machines_available": machines.filter(status='Idle').count(),
             "machines_in_use": machines.filter(status='In Use').count(),
             "pending_bookings": bookings.filter(status='Pending').count(),
             "active_bookings": bookings.filter(status='Active').count(),
-            "total_usage_hours": float(MachineUsage.objects.filter(chc=chc).aggregate(Sum('total_hours_used'))['total_hours_used__sum'] or 0),
-            "total_area_covered": float(MachineUsage.objects.filter(chc=chc).aggregate(Sum('area_covered'))['area_covered__sum'] or 0),
-            "total_residue_managed": float(MachineUsage.objects.filter(chc=chc).aggregate(Sum('residue_managed'))['residue_managed__sum'] or 0),
+            "total_usage_hours": float(usage['hours'] or 0),
+            "total_area_covered": float(usage['area'] or 0),
+            "total_residue_managed": float(usage['residue'] or 0),
             "charts": {
                 "status_breakdown": {item['status']: item['count'] for item in machines.values('status').annotate(count=Count('id'))},
                 "machine_types": {item['machine_type']: item['count'] for item in machines.values('machine_type').annotate(count=Count('id'))}
             }
-        })
+        }
 
 
-class MachineAnalyticsView(APIView):
+class MachineAnalyticsView(AnalyticsFreshnessMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
@@ -129,35 +204,63 @@ class MachineAnalyticsView(APIView):
             "status_breakdown": status_breakdown,
         })
 
-class GovtCHCDetailedAnalyticsView(APIView):
+class GovtCHCDetailedAnalyticsView(AnalyticsFreshnessMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
+    def get_freshness_chc(self):
+        return self.kwargs['chc_id']
+
     def get(self, request, chc_id):
         if request.user.role != 'GOVT_ADMIN':
             return Response({"error": "Unauthorized"}, status=403)
 
+        days = request.query_params.get('days')
+        if days is not None:
+            try:
+                days = int(days)
+            except ValueError:
+                days = 0
+            if not 1 <= days <= 366:
+                return Response({"error": "days must be between 1 and 366"}, status=400)
+
+        active_admins = Prefetch(
+            'admins',
+            queryset=User.objects.filter(role='CHC_ADMIN', is_active=True).order_by('id'),
+            to_attr='active_admins'
+        )
         try:
-            chc = CHC.objects.get(id=chc_id)
+            chc = CHC.objects.prefetch_related(active_admins).get(id=chc_id)
         except CHC.DoesNotExist:
             return Response({"error": "CHC not found"}, status=404)
 
         # Basic Info
+        admin = chc.active_admins[0] if chc.active_admins else None
         chc_info = {
             "id": chc.id,
             "name": chc.chc_name,
             "district": chc.district,
-            "admin": chc.admin.get_full_name() if chc.admin else None,
+            "admin": admin.get_full_name() if admin else None,
             "total_machines": chc.total_machines,
             "contact": chc.contact_number
         }
 
-        # Machines
-        machines_qs = Machine.objects.filter(chc=chc)
+        # Machines, annotated with their latest usage date (and window utilization if requested)
+        machine_usage = MachineUsage.objects.filter(machine=OuterRef('pk'))
+        machines_qs = Machine.objects.filter(chc=chc).annotate(
+            last_used=Subquery(machine_usage.order_by('-usage_date').values('usage_date')[:1])
+        )
+        if days:
+            window = UsageDailyRollup.objects.filter(
+                machine=OuterRef('pk'), usage_date__gt=timezone.localdate() - timedelta(days=days)
+            ).order_by().values('machine')
+            machines_qs = machines_qs.annotate(
+                window_days=Subquery(window.annotate(c=Count('id')).values('c')),
+                window_hours=Subquery(window.annotate(h=Sum('total_hours')).values('h')),
+            )
+
         machines_data = []
         for m in machines_qs:
-            # Get latest usage
-            latest_usage = m.usage_records.order_by('-usage_date').first()
-            machines_data.append({
+            machine = {
                 "id": m.id,
                 "name": m.machine_name,
                 "type": m.machine_type,
@@ -165,11 +268,19 @@ class GovtCHCDetailedAnalyticsView(APIView):
                 "status": m.status,
                 "hours": float(m.total_hours_used),
                 "last_serviced": m.last_serviced_date,
-                "last_used": latest_usage.usage_date if latest_usage else None
-            })
+                "last_used": m.last_used
+            }
+            if days:
+                machine["utilization"] = {
+                    "days": days,
+                    "active_days": m.window_days or 0,
+                    "hours": float(m.window_hours or 0),
+                    "utilization_pct": round((m.window_days or 0) * 100 / days, 1)
+                }
+            machines_data.append(machine)
 
         # Recent Bookings
-        bookings_qs = Booking.objects.filter(chc=chc).order_by('-created_at')[:10]
+        bookings_qs = Booking.objects.filter(chc=chc).select_related('machine').order_by('-created_at')[:10]
         bookings_data = [{
             "id": b.id,
             "farmer": b.farmer_name,
@@ -180,7 +291,7 @@ class GovtCHCDetailedAnalyticsView(APIView):
         } for b in bookings_qs]
 
         # Usage History (Recent 10)
-        usage_qs = MachineUsage.objects.filter(chc=chc).order_by('-usage_date', '-start_time')[:10]
+        usage_qs = MachineUsage.objects.filter(chc=chc).select_related('machine').order_by('-usage_date', '-start_time')[:10]
         usage_data = [{
             "id": u.id,
             "machine": u.machine.machine_name if u.machine else "N/A",
@@ -197,7 +308,7 @@ class GovtCHCDetailedAnalyticsView(APIView):
             "recent_usage": usage_data
         })
 
-class GovtReportsView(APIView):
+class GovtReportsView(AnalyticsFreshnessMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
@@ -206,33 +317,33 @@ class GovtReportsView(APIView):
 
         # Generate Insights for the Reports Page
         
-        # 1. Provide district wise aggregation
-        district_data = CHC.objects.values('district').annotate(
+        # 1. Provide district wise aggregation, one GROUP BY per table
+        district_data = CHC.objects.order_by('district').values('district').annotate(
             total_chcs=Count('id', distinct=True)
         )
+        machine_stats = _group_by(
+            Machine.objects.all(), 'chc__district',
+            total=Count('id'),
+            idle=Count('id', filter=Q(status='Idle')),
+        )
+        usage_stats = _group_by(
+            UsageDailyRollup.objects.all(), 'chc__district',
+            hours=Sum('total_hours'),
+            area=Sum('area_covered'),
+        )
         
         district_performance = []
         for d in district_data:
             dist = d['district']
-            chcs_in_district = CHC.objects.filter(district=dist)
-            
-            # Aggregate machines
-            machines = Machine.objects.filter(chc__in=chcs_in_district)
-            total_machines = machines.count()
-            idle_machines = machines.filter(status='Idle').count()
-            
-            # Aggregate usage
-            usage = MachineUsage.objects.filter(chc__in=chcs_in_district)
-            hours = usage.aggregate(Sum('total_hours_used'))['total_hours_used__sum'] or 0
-            area = usage.aggregate(Sum('area_covered'))['area_covered__sum'] or 0
-            
+            machines = machine_stats.get(dist, {})
+            usage = usage_stats.get(dist, {})
             district_performance.append({
                 "district": dist,
                 "chcs": d['total_chcs'],
-                "machines": total_machines,
-                "idle_machines": idle_machines,
-                "hours": float(hours),
-                "area": float(area)
+                "machines": machines.get('total', 0),
+                "idle_machines": machines.get('idle', 0),
+                "hours": float(usage.get('hours') or 0),
+                "area": float(usage.get('area') or 0)
             })
 
         # 2. Recommendations (Consistent Logic)
@@ -265,3 +376,289 @@ class GovtReportsView(APIView):
             "district_performance": district_performance,
             "recommendations": recommendations
         })
+
+
+class UsageTimeSeriesView(AnalyticsFreshnessMixin, APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    RESOLUTIONS = {
+        'day': (TruncDay, lambda d: d.isoformat()),
+        'week': (TruncWeek, lambda d: '{0}-W{1:02d}'.format(*d.isocalendar())),
+        'month': (TruncMonth, lambda d: d.strftime('%Y-%m')),
+    }
+
+    def get(self, request):
+        if request.user.role == 'GOVT_ADMIN':
+            usage = UsageDailyRollup.objects.all()
+        elif request.user.role == 'CHC_ADMIN' and request.user.chc_id:
+            usage = UsageDailyRollup.objects.filter(chc=request.user.chc_id)
+        else:
+            return Response({"error": "Unauthorized"}, status=403)
+
+        params = request.query_params
+        resolution = params.get('resolution', 'day')
+        if resolution not in self.RESOLUTIONS:
+            return Response({"error": "resolution must be one of day, week, month"}, status=400)
+        trunc, label = self.RESOLUTIONS[resolution]
+
+        for param, lookup in (('start_date', 'usage_date__gte'), ('end_date', 'usage_date__lte')):
+            if params.get(param):
+                value = _parse_date(params[param])
+                if value is None:
+                    return Response({"error": f"{param} must be a YYYY-MM-DD date"}, status=400)
+                usage = usage.filter(**{lookup: value})
+        if params.get('chc') and not params['chc'].isdigit():
+            return Response({"error": "chc must be a CHC id"}, status=400)
+        for param, lookup in (('state', 'chc__state'), ('district', 'chc__district'),
+                              ('chc', 'chc'), ('machine_type', 'machine_type')):
+            if params.get(param):
+                usage = usage.filter(**{lookup: params[param]})
+
+        rows = usage.order_by().annotate(bucket=trunc('usage_date')).values('bucket').annotate(
+            hours=Sum('total_hours'),
+            area=Sum('area_covered'),
+            residue=Sum('residue_managed'),
+            fuel=Sum('fuel_consumed'),
+        ).order_by('bucket')
+
+        series = {"buckets": [], "hours": [], "area": [], "residue": [], "fuel": []}
+        for row in rows:
+            series["buckets"].append(label(row['bucket']))
+            for metric in ("hours", "area", "residue", "fuel"):
+                series[metric].append(float(row[metric] or 0))
+
+        return Response({"resolution": resolution, **series})
+
+
+class GovtOccupancyHeatmapView(AnalyticsFreshnessMixin, APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    OCCUPYING_STATUSES = ['Approved', 'Active', 'Completed']
+    MAX_DAYS = 366
+
+    def get(self, request):
+        if request.user.role != 'GOVT_ADMIN':
+            return Response({"error": "Unauthorized"}, status=403)
+
+        params = request.query_params
+        # Defaults to the 30 days ending today
+        end_date = _parse_date(params['end_date']) if params.get('end_date') else timezone.localdate()
+        if params.get('start_date'):
+            start_date = _parse_date(params['start_date'])
+        elif end_date:
+            start_date = end_date - timedelta(days=29)
+        else:
+            start_date = None
+        if start_date is None or end_date is None:
+            return Response({"error": "start_date and end_date must be YYYY-MM-DD dates"}, status=400)
+        days = (end_date - start_date).days + 1
+        if not 1 <= days <= self.MAX_DAYS:
+            return Response({"error": f"The window must span 1 to {self.MAX_DAYS} days"}, status=400)
+        if params.get('chc') and not params['chc'].isdigit():
+            return Response({"error": "chc must be a CHC id"}, status=400)
+
+        machines = Machine.objects.all()
+        for param, lookup in (('state', 'chc__state'), ('district', 'chc__district'),
+                              ('chc', 'chc'), ('machine_type', 'machine_type')):
+            if params.get(param):
+                machines = machines.filter(**{lookup: params[param]})
+        machine_rows = list(machines.order_by('id').values_list('id', 'machine_code', 'machine_name', 'chc_id'))
+        machine_ids = [row[0] for row in machine_rows]
+
+        intervals = Booking.objects.filter(
+            machine__in=machines,
+            status__in=self.OCCUPYING_STATUSES,
+            start_date__lte=end_date,
+            end_date__gte=start_date
+        ).order_by().values_list('machine_id', 'start_date', 'end_date')
+        matrix = occupancy_matrix(machine_ids, intervals, start_date, end_date)
+
+        # Utilization = occupied machine-days / available machine-days
+        occupied_days = matrix.sum(axis=1)
+        chc_ids = sorted({row[3] for row in machine_rows})
+        chc_index = np.searchsorted(chc_ids, [row[3] for row in machine_rows])
+        chc_occupied = np.bincount(chc_index, weights=occupied_days, minlength=len(chc_ids))
+        chc_machines = np.bincount(chc_index, minlength=len(chc_ids))
+        chc_names = dict(CHC.objects.filter(id__in=chc_ids).values_list('id', 'chc_name'))
+
+        return Response({
+            "start_date": start_date,
+            "end_date": end_date,
+            "days": days,
+            "machines": [{
+                "id": machine_id,
+                "code": code,
+                "name": name,
+                "chc_id": chc_id,
+                "utilization_pct": round(float(occupied) * 100 / days, 1)
+            } for (machine_id, code, name, chc_id), occupied in zip(machine_rows, occupied_days)],
+            "occupancy": encode_rows(matrix),
+            "chcs": [{
+                "chc_id": chc_id,
+                "chc_name": chc_names.get(chc_id),
+                "machines": int(count),
+                "utilization_pct": round(float(occupied) * 100 / (count * days), 1)
+            } for chc_id, count, occupied in zip(chc_ids, chc_machines, chc_occupied)]
+        })
+
+
+class GovtDrilldownView(ConditionalGetMixin, generics.ListAPIView):
+    """One level of the state -> district -> CHC cube, e.g. ``?level=district&state=Punjab``.
+
+    Reads never build the cube; it is kept up to date by signals and built
+    after a fresh deploy with ``manage.py rebuild_analytics_cube``. Until
+    then the results are empty.
+    """
+    serializer_class = AnalyticsCubeSerializer
+    permission_classes = (permissions.IsAuthenticated, IsGovtAdmin)
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['name', 'chcs', 'machines', 'bookings', 'usage_hours', 'area_covered', 'residue_managed', 'fuel_consumed']
+    ordering = ['name']
+
+    def get_queryset(self):
+        params = self.request.query_params
+        level = params.get('level', 'state')
+        if level not in dict(AnalyticsCube.LEVEL_CHOICES):
+            raise ValidationError({"level": "Must be one of state, district, chc."})
+
+        queryset = AnalyticsCube.objects.filter(level=level)
+        for param in ('state', 'district'):
+            if params.get(param):
+                queryset = queryset.filter(**{param: params[param]})
+        return queryset
+
+
+class GovtAuditLogView(APIView):
+    """Audit trail search over the live table and the monthly archives, newest first."""
+    permission_classes = (permissions.IsAuthenticated, IsGovtAdmin)
+    page_size = 50
+    max_page_size = 500
+
+    def get(self, request):
+        params = request.query_params
+        bounds = {}
+        for param in ('start_date', 'end_date'):
+            if params.get(param):
+                day = _parse_date(params[param])
+                if day is None:
+                    return Response({"error": f"{param} must be a YYYY-MM-DD date"}, status=400)
+                # end_date is inclusive
+                day += timedelta(days=1) if param == 'end_date' else timedelta()
+                bounds[param] = timezone.make_aware(datetime.combine(day, time.min))
+        if params.get('user') and not params['user'].isdigit():
+            return Response({"error": "user must be a user id"}, status=400)
+        try:
+            page_size = max(1, min(int(params.get('page_size', self.page_size)), self.max_page_size))
+        except ValueError:
+            page_size = self.page_size
+
+        paginator = KeysetPagination()
+        cursor = paginator.decode_cursor(request, ['-timestamp', '-id'], AuditLog)
+        before = tuple(cursor) if cursor is not None else None
+
+        rows = search_audit_logs(
+            user_id=int(params['user']) if params.get('user') else None,
+            table_name=params.get('table') or None,
+            action_type=params.get('action') or None,
+            record_id=params.get('record') or None,
+            start=bounds.get('start_date'),
+            end=bounds.get('end_date'),
+            before=before,
+            limit=page_size + 1,
+            include_archive=params.get('archived') != 'false',
+        )
+        next_link = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_link = replace_query_param(
+                request.build_absolute_uri(), paginator.cursor_query_param,
+                paginator.encode_cursor([last['timestamp'], last['id']]),
+            )
+        for row in rows:
+            row['user'] = row.pop('user_id')
+        return Response({"next": next_link, "results": rows})
+
+
+class NotificationListView(generics.ListAPIView):
+    """The signed-in user's notifications, newest first; ``?unread=true`` for unread only."""
+    serializer_class = NotificationSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread') == 'true':
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+
+class NotificationUnreadCountView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        return Response({"unread": unread_count(request.user.pk)})
+
+
+class NotificationMarkReadView(APIView):
+    """Marks ``ids`` (or, with ``all: true``, every notification) as read."""
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        ids = request.data.get('ids')
+        if request.data.get('all') is True:
+            ids = None
+        elif not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+            return Response({"error": "Send ids as a non-empty list of notification ids, or all: true"}, status=400)
+        updated, unread = mark_read(request.user.pk, ids)
+        return Response({"updated": updated, "unread": unread})
+
+
+def _live_user(request):
+    """The JWT user behind a live stream request, from the Authorization header or ``?token=``.
+
+    ``EventSource`` cannot send headers, so browsers pass the access token in the query string.
+    """
+    auth = JWTAuthentication()
+    try:
+        if request.GET.get('token'):
+            return auth.get_user(auth.get_validated_token(request.GET['token']))
+        authenticated = auth.authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return authenticated[0] if authenticated else None
+
+
+class LiveEventsView(View):
+    """Server-sent events with dashboard deltas: every CHC for government admins, their own CHC for CHC admins.
+
+    Needs the ASGI server; under WSGI each open stream would hold a worker thread.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Live events are only served by the ASGI application"}, status=501)
+        user = await sync_to_async(_live_user)(request)
+        if user is None:
+            return JsonResponse({"error": "Authentication credentials were not provided or are invalid"}, status=401)
+        if user.role == 'GOVT_ADMIN':
+            chc_id = None
+        elif user.role == 'CHC_ADMIN' and user.chc_id:
+            chc_id = user.chc_id
+        else:
+            return JsonResponse({"error": "You do not have permission to perform this action."}, status=403)
+
+        subscriber = Subscriber(chc_id, queue_size=getattr(settings, 'LIVE_EVENTS_QUEUE_SIZE', 256))
+        response = StreamingHttpResponse(
+            event_stream(
+                subscriber,
+                last_event_id=request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'),
+                keepalive=getattr(settings, 'LIVE_EVENTS_KEEPALIVE', 15),
+                max_age=getattr(settings, 'LIVE_EVENTS_MAX_AGE', 3600),
+            ),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
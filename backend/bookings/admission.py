@@ -0,0 +1,46 @@
+"""Per-machine serialization of booking admission decisions.
+
+Deciding whether a booking may take a machine's dates (approve, handover)
+is a read-then-write. ``machine_admission`` makes it atomic for the machines
+involved without serializing unrelated machines:
+
+* on databases with ``SELECT ... FOR UPDATE`` (Postgres) the machine rows are
+  locked for the rest of the transaction;
+* on SQLite, which has no row locks, in-process locks order the threads of
+  one worker (one lock per group of machines, from a fixed pool), and the
+  ``IMMEDIATE`` transaction mode set in settings makes transactions of other
+  processes wait for the write lock instead of deciding on a stale read.
+"""
+import threading
+from contextlib import ExitStack, contextmanager
+
+from django.db import connection, transaction
+
+from machines.models import Machine
+
+# Machines share a fixed pool of locks (machine id modulo its size), so the
+# pool does not grow with every machine ever admitted
+LOCK_STRIPES = 64
+_machine_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+def _stripes(machine_ids):
+    return sorted({machine_id % LOCK_STRIPES for machine_id in machine_ids})
+
+
+@contextmanager
+def machine_admission(machine_ids):
+    """Run the block in a transaction that owns the given machines.
+
+    Locks are always taken in ascending order (row ids, or stripe numbers on
+    SQLite), so batches touching several machines cannot deadlock each other.
+    """
+    machine_ids = sorted(set(machine_ids))
+    with ExitStack() as stack:
+        if not connection.features.has_select_for_update:
+            for stripe in _stripes(machine_ids):
+                stack.enter_context(_machine_locks[stripe])
+        stack.enter_context(transaction.atomic())
+        if connection.features.has_select_for_update:
+            list(Machine.objects.select_for_update().filter(pk__in=machine_ids).order_by('pk').values_list('pk', flat=True))
+        yield
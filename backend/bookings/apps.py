@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class BookingsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'bookings'
+
+    def ready(self):
+        import bookings.signals
@@ -0,0 +1,99 @@
+"""Per-machine availability index shared by every booking overlap check.
+
+The Approved/Active bookings of a machine are loaded once (through the
+``(machine, status, start_date, end_date)`` index), merged into disjoint
+sorted ranges and cached. Overlap and free-window questions are then
+answered with binary search instead of a fresh ``Booking`` query.
+
+Booking writes delete the entry on commit, but a local-memory cache is per
+process, so entries also expire after ``AVAILABILITY_CACHE_TIMEOUT``
+seconds to bound what other workers serve.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Booking
+
+BLOCKING_STATUSES = ('Approved', 'Active')
+
+
+class MachineAvailability:
+    """Sorted, merged booked ranges of one machine (dates are inclusive)."""
+
+    def __init__(self, bookings):
+        # ``bookings`` is a list of (booking_id, start_date, end_date, status)
+        self.bookings = sorted(bookings, key=lambda b: (b[1], b[2]))
+        self.active_booking_ids = [b[0] for b in self.bookings if b[3] == 'Active']
+        self.starts = []
+        self.ends = []
+        for _, start, end, _ in self.bookings:
+            if self.ends and start <= self.ends[-1] + timedelta(days=1):
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def without(self, booking_id):
+        return MachineAvailability([b for b in self.bookings if b[0] != booking_id])
+
+    def is_free(self, start, end, exclude=None):
+        """True when no blocking booking (other than ``exclude``) overlaps ``[start, end]``."""
+        if exclude is not None and any(b[0] == exclude for b in self.bookings):
+            return self.without(exclude).is_free(start, end)
+        # The last range starting on or before ``end`` is the only candidate,
+        # because ranges are disjoint and sorted.
+        index = bisect_right(self.starts, end) - 1
+        return index < 0 or self.ends[index] < start
+
+    def next_free_window(self, days, not_before):
+        """First ``(start, end)`` of ``days`` consecutive free days starting on or after ``not_before``."""
+        candidate = not_before
+        index = bisect_left(self.ends, candidate)
+        while index < len(self.starts):
+            if self.starts[index] > candidate and (self.starts[index] - candidate).days >= days:
+                break
+            candidate = max(candidate, self.ends[index] + timedelta(days=1))
+            index += 1
+        return candidate, candidate + timedelta(days=days - 1)
+
+    def booked_ranges(self):
+        return [{"start_date": s, "end_date": e} for s, e in zip(self.starts, self.ends)]
+
+
+def _cache_key(machine_id):
+    return f"availability:machine:{machine_id}"
+
+
+def blocking_bookings(machine_ids):
+    return Booking.objects.filter(machine__in=machine_ids, status__in=BLOCKING_STATUSES).order_by()
+
+
+def _load(machine_id):
+    rows = blocking_bookings([machine_id]).values_list('id', 'start_date', 'end_date', 'status')
+    bookings = [(pk, start.toordinal(), end.toordinal(), status) for pk, start, end, status in rows]
+    cache.set(_cache_key(machine_id), bookings, timeout=getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 30))
+    return bookings
+
+
+def get_availability(machine_id, fresh=False):
+    """Return the availability index of a machine.
+
+    Read-only callers use the cached interval list. Callers about to change a
+    booking into a blocking status pass ``fresh=True`` so the decision never
+    rests on an entry another process has not invalidated yet.
+    """
+    bookings = None if fresh else cache.get(_cache_key(machine_id))
+    if bookings is None:
+        bookings = _load(machine_id)
+    return MachineAvailability([
+        (pk, date.fromordinal(start), date.fromordinal(end), status)
+        for pk, start, end, status in bookings
+    ])
+
+
+def invalidate_availability(machine_id):
+    transaction.on_commit(lambda: cache.delete(_cache_key(machine_id)))
@@ -0,0 +1,146 @@
+"""Batch processing of CHC booking actions.
+
+``apply_booking_actions`` validates a whole list of actions in memory, in the
+order given, so an approval earlier in the batch blocks an overlapping one
+later in it and a rejection frees its dates for the rest of the batch. The
+accepted changes are then written with a constant number of queries.
+"""
+from django.utils import timezone
+
+from analytics import changes
+from machines.models import Machine
+from .admission import machine_admission
+from .availability import BLOCKING_STATUSES, blocking_bookings
+from .models import Booking
+from .signals import bookings_bulk_changed
+
+BOOKING_ACTIONS = ('approve', 'reject', 'handover', 'complete', 'cancel')
+MAX_BULK_ACTIONS = 500
+
+
+class ActionError(Exception):
+    pass
+
+
+def _overlaps(intervals, booking):
+    return any(
+        pk != booking.id and start <= booking.end_date and end >= booking.start_date
+        for pk, (start, end, _) in intervals.items()
+    )
+
+
+def _apply(booking, action, notes, intervals, user):
+    """Apply one action by ``user`` to ``booking`` in memory; returns the machine status to set, if any."""
+    machine_status = None
+    if action == 'approve':
+        if _overlaps(intervals, booking):
+            raise ActionError("Machine is already booked and approved for the selected dates.")
+        booking.status = 'Approved'
+        booking.approved_by = user
+    elif action == 'reject':
+        booking.status = 'Rejected'
+        booking.rejection_reason = notes
+        booking.approved_by = user
+    elif action == 'handover':
+        if booking.status != 'Approved':
+            raise ActionError("Only approved bookings can be handed over.")
+        if booking.machine.status == 'In Use' or any(s == 'Active' for _, _, s in intervals.values()):
+            raise ActionError("Machine is already handed over to someone else.")
+        booking.status = 'Active'
+        machine_status = 'In Use'
+    elif action == 'complete':
+        if booking.status != 'Active':
+            raise ActionError("Only active bookings can be completed.")
+        booking.status = 'Completed'
+        machine_status = 'Idle'
+    elif action == 'cancel':
+        booking.status = 'Cancelled'
+        booking.rejection_reason = notes
+    else:
+        raise ActionError("Invalid action")
+    return machine_status
+
+
+def apply_booking_actions(user, items):
+    """Apply ``items`` (dicts with ``id``, ``action`` and optional ``notes``) for a CHC admin.
+
+    Invalid items are reported and skipped; the others are saved in one
+    transaction that owns every affected machine. Returns one result dict
+    per item, in input order.
+    """
+    ids = [item.get('id') for item in items]
+    valid_ids = [pk for pk in ids if isinstance(pk, int)]
+    machine_ids = Booking.objects.filter(pk__in=valid_ids).order_by().values_list('machine_id', flat=True).distinct()
+    with machine_admission(machine_ids):
+        return _apply_batch(user, items, ids, valid_ids)
+
+
+def _apply_batch(user, items, ids, valid_ids):
+    bookings = Booking.objects.select_related('machine').order_by().in_bulk(valid_ids)
+    machines = {}
+    for booking in bookings.values():
+        # Share one Machine instance per machine so status changes carry through the batch
+        booking.machine = machines.setdefault(booking.machine_id, booking.machine)
+    machine_ids = set(machines)
+
+    # Blocking intervals per machine, kept current as the batch is applied
+    intervals = {machine_id: {} for machine_id in machine_ids}
+    for pk, machine_id, start, end, booking_status in blocking_bookings(machine_ids).values_list(
+        'id', 'machine_id', 'start_date', 'end_date', 'status'
+    ):
+        intervals[machine_id][pk] = (start, end, booking_status)
+
+    results, changed, seen = [], {}, set()
+    changed_machines = {}
+    # Statuses before the batch, for listeners that report transitions
+    previous_statuses, previous_machine_statuses = {}, {}
+    now = timezone.now()
+    for item, pk in zip(items, ids):
+        action, notes = item.get('action'), item.get('notes', '')
+        result = {"id": pk, "action": action}
+        booking = bookings.get(pk) if isinstance(pk, int) else None
+        try:
+            if booking is None or booking.chc_id != user.chc_id:
+                raise ActionError("Booking not found")
+            if pk in seen:
+                raise ActionError("Booking appears more than once in this batch")
+            seen.add(pk)
+            status_before, machine_status_before = booking.status, booking.machine.status
+            machine_status = _apply(booking, action, notes, intervals[booking.machine_id], user)
+        except ActionError as exc:
+            result.update(ok=False, error=str(exc))
+            results.append(result)
+            continue
+
+        if booking.status in BLOCKING_STATUSES:
+            intervals[booking.machine_id][pk] = (booking.start_date, booking.end_date, booking.status)
+        else:
+            intervals[booking.machine_id].pop(pk, None)
+        if machine_status:
+            previous_machine_statuses.setdefault(booking.machine_id, machine_status_before)
+            booking.machine.status = machine_status
+            booking.machine.updated_at = now
+            changed_machines[booking.machine_id] = booking.machine
+        previous_statuses[pk] = status_before
+        booking.updated_at = now
+        changed[pk] = booking
+        changes.label(booking, action.upper(), user=user, notes=notes)
+        result.update(ok=True, status=booking.status)
+        results.append(result)
+
+    if changed:
+        Booking.objects.bulk_update(changed.values(), ['status', 'rejection_reason', 'approved_by', 'updated_at'])
+        if changed_machines:
+            Machine.objects.bulk_update(changed_machines.values(), ['status', 'updated_at'])
+        # bulk_update skips post_save, so caches are invalidated explicitly
+        bookings_bulk_changed.send(
+            sender=Booking,
+            machine_ids={booking.machine_id for booking in changed.values()},
+            chc_ids={booking.chc_id for booking in changed.values()},
+            bookings=list(changed.values()),
+            previous_statuses=previous_statuses,
+            machines=list(changed_machines.values()),
+            previous_machine_statuses=previous_machine_statuses,
+            user=user,
+        )
+    return results
@@ -0,0 +1,174 @@
+"""Allocation of the public ``booking_id`` codes (``BKG-XXXXXXX``).
+
+The default :class:`SequenceBlockAllocator` takes numbers from a database
+counter in blocks, so a worker thread only touches the database once per
+``BOOKING_ID_BLOCK_SIZE`` bookings, and turns each number into a short code
+with a keyed Feistel permutation. The permutation is a bijection, so distinct
+numbers always give distinct codes: uniqueness never depends on luck or on
+retrying after an ``IntegrityError``, and codes can be generated up front for
+``bulk_create``. ``decode_booking_id`` reverses it.
+
+The allocator is chosen with the ``BOOKING_ID_ALLOCATOR`` setting.
+"""
+import hashlib
+import random
+import string
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+PREFIX = 'BKG-'
+# Crockford base32: no I, L, O or U, so codes survive being read out over the phone
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CODE_LENGTH = 7
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+# Unbalanced Feistel halves; the widths swap every round, so ROUNDS must be even
+LEFT_BITS, RIGHT_BITS = 17, 18
+ROUNDS = 4
+SEQUENCE_NAME = 'booking_id'
+
+
+def _round_keys(key):
+    digest = hashlib.blake2b(str(key).encode(), digest_size=4 * ROUNDS).digest()
+    return [int.from_bytes(digest[i:i + 4], 'big') for i in range(0, len(digest), 4)]
+
+
+def _mix(half, round_key, bits):
+    half = ((half ^ round_key) * 0x2C1B3C6D) & 0xFFFFFFFF
+    return (half ^ (half >> 15)) & ((1 << bits) - 1)
+
+
+def _feistel(value, keys):
+    left_bits, right_bits = LEFT_BITS, RIGHT_BITS
+    left, right = value >> right_bits, value & ((1 << right_bits) - 1)
+    for round_key in keys:
+        left, right = right, left ^ _mix(right, round_key, left_bits)
+        left_bits, right_bits = right_bits, left_bits
+    return (left << right_bits) | right
+
+
+def _feistel_inverse(value, keys):
+    left_bits, right_bits = LEFT_BITS, RIGHT_BITS
+    left, right = value >> right_bits, value & ((1 << right_bits) - 1)
+    for round_key in reversed(keys):
+        left_bits, right_bits = right_bits, left_bits
+        left, right = right ^ _mix(left, round_key, left_bits), left
+    return (left << right_bits) | right
+
+
+_SHIFTS = tuple(range(5 * (CODE_LENGTH - 1), -1, -5))
+
+
+def _encode(number):
+    # Five bits per base32 character, most significant first
+    return PREFIX + ''.join([ALPHABET[(number >> shift) & 31] for shift in _SHIFTS])
+
+
+class BaseBookingIdAllocator:
+    def allocate(self, count=1):
+        """Return ``count`` new booking ids."""
+        raise NotImplementedError
+
+
+class SequenceBlockAllocator(BaseBookingIdAllocator):
+    def __init__(self, block_size=None, key=None, sequence_name=SEQUENCE_NAME):
+        self.sequence_name = sequence_name
+        self.block_size = block_size or getattr(settings, 'BOOKING_ID_BLOCK_SIZE', 1000)
+        self.keys = _round_keys(key if key is not None else getattr(settings, 'BOOKING_ID_KEY', 'crm-tracker'))
+        self._local = threading.local()
+
+    def obfuscate(self, number):
+        if not 0 <= number < CODE_SPACE:
+            raise ValueError("Booking id sequence exhausted")
+        return _encode(_feistel(number, self.keys))
+
+    def decode(self, booking_id):
+        """Sequence number behind a code produced by this allocator, or None."""
+        code = booking_id.upper()
+        if not code.startswith(PREFIX) or len(code) != len(PREFIX) + CODE_LENGTH:
+            return None
+        value = 0
+        for char in code[len(PREFIX):]:
+            if char not in ALPHABET:
+                return None
+            value = value * len(ALPHABET) + ALPHABET.index(char)
+        return _feistel_inverse(value, self.keys)
+
+    def allocate(self, count=1):
+        ids = []
+        while len(ids) < count:
+            block = self._block()
+            take = min(count - len(ids), block['end'] - block['next'])
+            ids.extend(self.obfuscate(number) for number in range(block['next'], block['next'] + take))
+            block['next'] += take
+        return ids
+
+    def _block(self):
+        block = getattr(self._local, 'block', None)
+        if block is None or block['next'] >= block['end'] or not self._usable(block):
+            block = self._local.block = self._reserve()
+        return block
+
+    def _usable(self, block):
+        # A block reserved inside a transaction only belongs to us once that
+        # transaction commits. Until then it may only be used by the same
+        # transaction: if it rolls back, the counter goes back and another
+        # worker can reserve the same numbers. Django drops queued on_commit
+        # callbacks on rollback, so a missing callback means the block is void.
+        if block['committed']:
+            return True
+        return any(entry[1] is block['confirm'] for entry in connection.run_on_commit)
+
+    def _reserve(self):
+        from .models import BookingIdSequence
+
+        with transaction.atomic():
+            # The UPDATE takes the row (Postgres) or database (SQLite) write
+            # lock first, so the value read back is ours alone
+            counter = BookingIdSequence.objects.filter(name=self.sequence_name)
+            if not counter.update(next_value=F('next_value') + self.block_size):
+                BookingIdSequence.objects.get_or_create(name=self.sequence_name)
+                counter.update(next_value=F('next_value') + self.block_size)
+            end = counter.values_list('next_value', flat=True).get()
+        block = {'next': end - self.block_size, 'end': end, 'committed': False}
+        block['confirm'] = lambda: block.update(committed=True)
+        transaction.on_commit(block['confirm'])
+        return block
+
+
+class RandomBookingIdAllocator(BaseBookingIdAllocator):
+    """The original scheme: six random characters, unique only by chance."""
+
+    def allocate(self, count=1):
+        chars = string.ascii_uppercase + string.digits
+        return [PREFIX + ''.join(random.choices(chars, k=6)) for _ in range(count)]
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_booking_id_allocator():
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            path = getattr(settings, 'BOOKING_ID_ALLOCATOR', 'bookings.ids.SequenceBlockAllocator')
+            _allocator = import_string(path)()
+        return _allocator
+
+
+@receiver(setting_changed)
+def _reset_allocator(setting, **kwargs):
+    global _allocator
+    if setting.startswith('BOOKING_ID_'):
+        _allocator = None
+
+
+def decode_booking_id(booking_id):
+    allocator = get_booking_id_allocator()
+    return allocator.decode(booking_id) if hasattr(allocator, 'decode') else None
@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from analytics import audit
+from analytics.models import AuditLog
+from bookings.availability import BLOCKING_STATUSES
+from bookings.models import Booking
+from bookings.views import CHCBookingActionView, PublicBookingCreateView
+from chc.models import CHC
+from machines.models import Machine
+
+FIRST_DAY = date(2030, 10, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the booking create + approve path from concurrent threads and report '
+        'throughput and double bookings, for one shared machine and for one machine per thread. '
+        'Runs against the configured database with throwaway data that is removed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submitters', type=int, default=50)
+        parser.add_argument('--rounds', type=int, default=5, help='Create + approve pairs per submitter')
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        # Bookings the benchmark created, whose audit rows are removed at the end
+        self.booking_ids = set()
+        with audit.suspended():
+            chc = CHC.objects.create(
+                chc_name='Admission Benchmark CHC', state='Benchmark', district='Benchmark', location='-',
+                pincode='000000', contact_number='0000000000', email='benchmark@example.com',
+            )
+            self.admin = User.objects.create_user(
+                username=f"admission-benchmark-{chc.id}", email='benchmark@example.com',
+                password=None, role='CHC_ADMIN', chc=chc,
+            )
+            submitters, rounds = options['submitters'], options['rounds']
+            machines = [
+                Machine.objects.create(chc=chc, machine_name=f"Bench {i}", machine_type='Other', purchase_year=2024)
+                for i in range(submitters)
+            ]
+        try:
+            self.run_scenario('same machine', [machines[0]] * submitters, rounds)
+            self.run_scenario('different machines', machines, rounds)
+        finally:
+            # Write out the benchmark's buffered audit rows so they can be removed too
+            audit.get_audit_writer().flush()
+            with audit.suspended():
+                self.booking_ids.update(Booking.objects.filter(chc=chc).values_list('id', flat=True))
+                AuditLog.objects.filter(
+                    table_name=Booking._meta.db_table, record_id__in=[str(pk) for pk in self.booking_ids]
+                ).delete()
+                AuditLog.objects.filter(table_name=Machine._meta.db_table, record_id__in=[str(m.id) for m in machines]).delete()
+                self.admin.delete()
+                chc.delete()
+
+    def run_scenario(self, name, machines, rounds):
+        with audit.suspended():
+            stale = Booking.objects.filter(machine__in=set(machines))
+            self.booking_ids.update(stale.values_list('id', flat=True))
+            stale.delete()
+        barrier = threading.Barrier(len(machines))
+        outcomes = {'approved': 0, 'refused': 0, 'errors': 0}
+        outcome_lock = threading.Lock()
+
+        def submit(index, machine):
+            tally = {'approved': 0, 'refused': 0, 'errors': 0}
+            try:
+                barrier.wait()
+                for round_no in range(rounds):
+                    start = FIRST_DAY + timedelta(days=3 * round_no)
+                    tally[self.create_and_approve(index, machine, start)] += 1
+            finally:
+                connections.close_all()
+                with outcome_lock:
+                    for key, value in tally.items():
+                        outcomes[key] += value
+
+        threads = [threading.Thread(target=submit, args=(i, m)) for i, m in enumerate(machines)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        requests = 2 * len(machines) * rounds
+        self.stdout.write(
+            f"{name}: {len(machines)} submitters, {requests} requests in {elapsed:.2f}s "
+            f"({requests / elapsed:.0f} req/s); {outcomes['approved']} approved, "
+            f"{outcomes['refused']} refused, {outcomes['errors']} errors, "
+            f"{self.count_double_bookings(machines)} double bookings"
+        )
+
+    def create_and_approve(self, index, machine, start):
+        try:
+            request = self.factory.post('/api/v1/bookings/public/create/', {
+                'machine': machine.id, 'start_date': start, 'end_date': start + timedelta(days=1),
+                'farmer_name': f"Farmer {index}", 'farmer_contact': '9876543210',
+                'farmer_email': 'farmer@example.com', 'farmer_aadhar': '123456789012',
+            }, format='json')
+            response = PublicBookingCreateView.as_view()(request)
+            if response.status_code != 201:
+                return 'refused'
+            booking_id = Booking.objects.filter(
+                machine=machine, farmer_name=f"Farmer {index}", start_date=start
+            ).values_list('id', flat=True).first()
+
+            request = self.factory.patch(f"/api/v1/bookings/chc/{booking_id}/action/", {'action': 'approve'}, format='json')
+            force_authenticate(request, user=self.admin)
+            response = CHCBookingActionView.as_view()(request, pk=booking_id)
+            return 'approved' if response.status_code == 200 else 'refused'
+        except Exception:
+            return 'errors'
+
+    def count_double_bookings(self, machines):
+        double = 0
+        last_end = {}
+        for machine_id, start, end in Booking.objects.filter(
+            machine__in=set(machines), status__in=BLOCKING_STATUSES
+        ).order_by('machine_id', 'start_date').values_list('machine_id', 'start_date', 'end_date'):
+            if machine_id in last_end and start <= last_end[machine_id]:
+                double += 1
+            last_end[machine_id] = max(end, last_end.get(machine_id, end))
+        return double
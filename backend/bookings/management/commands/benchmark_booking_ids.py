@@ -0,0 +1,52 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from bookings.ids import ALPHABET, PREFIX, RandomBookingIdAllocator, SequenceBlockAllocator
+from bookings.models import BookingIdSequence
+
+BENCHMARK_SEQUENCE = 'booking_id_benchmark'
+# Crockford digits -> the digits int(..., 32) understands
+CROCKFORD_TO_BASE32 = str.maketrans(ALPHABET, '0123456789abcdefghijklmnopqrstuv')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure booking id allocation rate and count duplicate codes for the sequence '
+        'block allocator and the legacy random allocator. Uses its own counter row, which '
+        'is removed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10_000_000)
+        parser.add_argument('--batch', type=int, default=10_000, help='Ids requested per allocate() call')
+        parser.add_argument('--block-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count, batch = options['count'], options['batch']
+        sequence = SequenceBlockAllocator(block_size=options['block_size'], sequence_name=BENCHMARK_SEQUENCE)
+        try:
+            self.report('sequence blocks', sequence, count, batch,
+                        lambda code: int(code[len(PREFIX):].translate(CROCKFORD_TO_BASE32), 32))
+        finally:
+            BookingIdSequence.objects.filter(name=BENCHMARK_SEQUENCE).delete()
+        self.report('legacy random', RandomBookingIdAllocator(), count, batch,
+                    lambda code: int(code[len(PREFIX):], 36))
+
+    def report(self, name, allocator, count, batch, to_int):
+        values = np.empty(count, dtype=np.int64)
+        elapsed = 0.0
+        done = 0
+        while done < count:
+            size = min(batch, count - done)
+            started = time.perf_counter()
+            codes = allocator.allocate(size)
+            elapsed += time.perf_counter() - started
+            values[done:done + size] = np.fromiter(map(to_int, codes), dtype=np.int64, count=size)
+            done += size
+
+        duplicates = count - len(np.unique(values))
+        self.stdout.write(
+            f"{name}: {count} ids in {elapsed:.2f}s ({count / elapsed:,.0f} ids/s), {duplicates} duplicates"
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_alter_booking_booking_id'),
+        ('chc', '0004_chc_updated_at'),
+        ('machines', '0002_alter_machine_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['machine', 'status', 'start_date', 'end_date'], name='booking_availability_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_bookingidsequence'),
+        ('chc', '0004_chc_updated_at'),
+        ('machines', '0002_alter_machine_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['chc', 'status', 'created_at'], name='booking_chc_status_idx'),
+        ),
+    ]
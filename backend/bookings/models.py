@@ -1,14 +1,22 @@
+from django.conf import settings
 from django.db import models
 
-import random
-import string
+from analytics.changes import AuditedModel
+
+from .ids import get_booking_id_allocator
 
 def generate_short_booking_id():
-    chars = string.ascii_uppercase + string.digits
-    unique_part = ''.join(random.choices(chars, k=6))
-    return f"BKG-{unique_part}"
+    return get_booking_id_allocator().allocate()[0]
+
+class BookingIdSequence(models.Model):
+    """Counter behind ``SequenceBlockAllocator``; workers reserve blocks of numbers from it."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
 
-class Booking(models.Model):
+class Booking(AuditedModel):
     STATUS_CHOICES = (
         ('Pending', 'Pending'),
         ('Approved', 'Approved'),
@@ -18,6 +26,8 @@ class Booking(models.Model):
         ('Cancelled', 'Cancelled'),
     )
     
+    audit_masked = ('farmer_aadhar',)
+
     booking_id = models.CharField(max_length=50, default=generate_short_booking_id, unique=True, editable=False)
     chc = models.ForeignKey('chc.CHC', on_delete=models.CASCADE, related_name='bookings')
     machine = models.ForeignKey('machines.Machine', on_delete=models.CASCADE, related_name='bookings')
@@ -36,6 +46,10 @@ class Booking(models.Model):
     field_area = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
     purpose = models.TextField(blank=True, null=True)
     rejection_reason = models.TextField(blank=True, null=True)
+    # The CHC admin who approved or rejected the booking
+    approved_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='decided_bookings'
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -45,3 +59,11 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves the per-machine availability index and overlap lookups
+            models.Index(fields=['machine', 'status', 'start_date', 'end_date'], name='booking_availability_idx'),
+            # CHC booking lists: filtered by CHC and status category, newest first
+            models.Index(fields=['chc', 'status', 'created_at'], name='booking_chc_status_idx'),
+            # Incremental exports select rows changed since the last run
+            models.Index(fields=['updated_at'], name='booking_updated_idx'),
+        ]
@@ -1,9 +1,11 @@
 from rest_framework import serializers
+from utils.sparse import SparseFieldsMixin
 from .models import Booking
-from machines.serializers import MachineSerializer
+from machines.serializers import MachineSerializer, MachineSummarySerializer
+from chc.models import CHC
 from chc.serializers import CHCSerializer
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     machine_details = MachineSerializer(source='machine', read_only=True)
     chc_details = CHCSerializer(source='chc', read_only=True)
 
@@ -11,6 +13,25 @@ class BookingSerializer(serializers.ModelSerializer):
         model = Booking
         fields = '__all__'
         read_only_fields = ('booking_status', 'created_at', 'updated_at', 'rejection_reason', 'approved_by')
+        expandable_fields = ('machine_details', 'chc_details')
+
+class CHCSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CHC
+        fields = ('id', 'chc_name', 'state', 'district', 'location', 'contact_number')
+
+class BookingListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Lean BookingSerializer for lists: machine and CHC summaries, no per-row queries.
+
+    Expects ``select_related('machine', 'chc')``.
+    """
+    machine_details = MachineSummarySerializer(source='machine', read_only=True)
+    chc_details = CHCSummarySerializer(source='chc', read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = '__all__'
+        expandable_fields = ('machine_details', 'chc_details')
 
 class BookingCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+from .models import Booking
+from .availability import invalidate_availability
+
+# Sent after bulk status changes that bypass post_save, with ``machine_ids``,
+# ``chc_ids``, the changed ``bookings`` and ``machines``, their statuses before
+# the batch (``previous_statuses``, ``previous_machine_statuses``, keyed by pk)
+# and the acting ``user``
+bookings_bulk_changed = Signal()
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_machine_availability(sender, instance, **kwargs):
+    invalidate_availability(instance.machine_id)
+
+@receiver(bookings_bulk_changed)
+def invalidate_bulk_availability(sender, machine_ids, **kwargs):
+    for machine_id in machine_ids:
+        invalidate_availability(machine_id)
@@ -0,0 +1,357 @@
+import threading
+import time
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings, skipIfDBFeature, skipUnlessDBFeature
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from analytics.models import AuditLog
+from bookings import admission
+from bookings.availability import MachineAvailability, get_availability
+from bookings.ids import CODE_SPACE, SequenceBlockAllocator, decode_booking_id, get_booking_id_allocator
+from bookings.models import Booking, BookingIdSequence
+from chc.models import CHC
+from machines.models import Machine
+
+
+class MachineAvailabilityTests(APITestCase):
+    def test_merged_ranges_and_overlap(self):
+        availability = MachineAvailability([
+            (1, date(2025, 10, 5), date(2025, 10, 7), 'Approved'),
+            (2, date(2025, 10, 8), date(2025, 10, 9), 'Active'),
+            (3, date(2025, 10, 20), date(2025, 10, 21), 'Approved'),
+        ])
+        self.assertEqual(availability.booked_ranges(), [
+            {'start_date': date(2025, 10, 5), 'end_date': date(2025, 10, 9)},
+            {'start_date': date(2025, 10, 20), 'end_date': date(2025, 10, 21)},
+        ])
+        self.assertEqual(availability.active_booking_ids, [2])
+        self.assertTrue(availability.is_free(date(2025, 10, 1), date(2025, 10, 4)))
+        self.assertFalse(availability.is_free(date(2025, 10, 1), date(2025, 10, 5)))
+        self.assertFalse(availability.is_free(date(2025, 10, 9), date(2025, 10, 12)))
+        self.assertTrue(availability.is_free(date(2025, 10, 10), date(2025, 10, 19)))
+        self.assertTrue(availability.is_free(date(2025, 10, 8), date(2025, 10, 9), exclude=2))
+
+    def test_next_free_window(self):
+        availability = MachineAvailability([
+            (1, date(2025, 10, 5), date(2025, 10, 7), 'Approved'),
+            (2, date(2025, 10, 10), date(2025, 10, 12), 'Approved'),
+        ])
+        self.assertEqual(availability.next_free_window(3, date(2025, 10, 1)), (date(2025, 10, 1), date(2025, 10, 3)))
+        self.assertEqual(availability.next_free_window(3, date(2025, 10, 4)), (date(2025, 10, 13), date(2025, 10, 15)))
+        self.assertEqual(availability.next_free_window(2, date(2025, 10, 6)), (date(2025, 10, 8), date(2025, 10, 9)))
+
+
+class BookingAvailabilityViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.machine = Machine.objects.create(
+            chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='CHC_ADMIN', chc=self.chc
+        )
+
+    def book(self, start, end, status='Pending'):
+        return Booking.objects.create(
+            chc=self.chc, machine=self.machine, start_date=start, end_date=end, status=status,
+            farmer_name='Ram Singh', farmer_contact='9876543210',
+            farmer_email='ram@example.com', farmer_aadhar='123456789012',
+        )
+
+    def test_booked_dates_are_served_from_cache_until_bookings_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(date(2025, 10, 5), date(2025, 10, 7), status='Approved')
+        url = reverse('machine-booked-dates', args=[self.machine.id])
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            get_availability(self.machine.id, fresh=True)
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], 30)
+        with self.assertNumQueries(0):
+            get_availability(self.machine.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(date(2025, 10, 20), date(2025, 10, 21), status='Approved')
+        response = self.client.get(url)
+        self.assertEqual(response.data[1], {'start_date': date(2025, 10, 20), 'end_date': date(2025, 10, 21)})
+
+    def test_approve_rejects_overlap_with_fresh_index(self):
+        self.book(date(2025, 10, 5), date(2025, 10, 7), status='Approved')
+        pending = self.book(date(2025, 10, 6), date(2025, 10, 8))
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.patch(reverse('chc-booking-action', args=[pending.id]), {'action': 'approve'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_next_free_window_endpoint(self):
+        self.book(date(2025, 10, 1), date(2025, 10, 4), status='Approved')
+        response = self.client.get(
+            reverse('machine-next-free', args=[self.machine.id]), {'days': 2, 'from': '2025-10-02'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['start_date'], date(2025, 10, 5))
+        self.assertEqual(self.client.get(
+            reverse('machine-next-free', args=[self.machine.id]), {'days': 0}
+        ).status_code, 400)
+
+
+class CHCBookingBulkActionViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='CHC_ADMIN', chc=self.chc
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def create_machine(self):
+        return Machine.objects.create(
+            chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+
+    def book(self, machine, start, end, status='Pending'):
+        return Booking.objects.create(
+            chc=self.chc, machine=machine, start_date=start, end_date=end, status=status,
+            farmer_name='Ram Singh', farmer_contact='9876543210',
+            farmer_email='ram@example.com', farmer_aadhar='123456789012',
+        )
+
+    def post(self, actions):
+        return self.client.post(reverse('chc-booking-bulk-action'), {'actions': actions}, format='json')
+
+    def test_conflicts_inside_the_batch_are_reported_per_item(self):
+        machine = self.create_machine()
+        approved = self.book(machine, date(2025, 10, 1), date(2025, 10, 3), status='Approved')
+        first = self.book(machine, date(2025, 10, 5), date(2025, 10, 7))
+        clashing = self.book(machine, date(2025, 10, 6), date(2025, 10, 8))
+        freed = self.book(machine, date(2025, 10, 2), date(2025, 10, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post([
+                {'id': first.id, 'action': 'approve'},
+                {'id': clashing.id, 'action': 'approve'},
+                {'id': approved.id, 'action': 'cancel', 'notes': 'Farmer withdrew'},
+                {'id': freed.id, 'action': 'approve'},
+                {'id': first.id, 'action': 'reject'},
+                {'id': 999999, 'action': 'approve'},
+            ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['applied'], response.data['failed']), (3, 3))
+        self.assertEqual([r['ok'] for r in response.data['results']], [True, False, True, True, False, False])
+        statuses = dict(Booking.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[first.id], 'Approved')
+        self.assertEqual(statuses[clashing.id], 'Pending')
+        self.assertEqual(statuses[approved.id], 'Cancelled')
+        self.assertEqual(statuses[freed.id], 'Approved')
+        approvers = dict(Booking.objects.values_list('id', 'approved_by'))
+        self.assertEqual(approvers[first.id], self.admin.id)
+        self.assertEqual(approvers[freed.id], self.admin.id)
+        self.assertIsNone(approvers[clashing.id])
+        audited = AuditLog.objects.filter(table_name='bookings_booking').exclude(action_type='CREATE')
+        self.assertEqual(
+            sorted(audited.values_list('action_type', 'old_value', 'new_value')),
+            [('APPROVE', {'status': 'Pending', 'approved_by_id': None},
+              {'status': 'Approved', 'approved_by_id': self.admin.id, 'notes': ''}),
+             ('APPROVE', {'status': 'Pending', 'approved_by_id': None},
+              {'status': 'Approved', 'approved_by_id': self.admin.id, 'notes': ''}),
+             ('CANCEL', {'status': 'Approved', 'rejection_reason': None},
+              {'status': 'Cancelled', 'rejection_reason': 'Farmer withdrew', 'notes': 'Farmer withdrew'})],
+        )
+        self.assertEqual(
+            get_availability(machine.id).booked_ranges(),
+            [{'start_date': date(2025, 10, 2), 'end_date': date(2025, 10, 2)},
+             {'start_date': date(2025, 10, 5), 'end_date': date(2025, 10, 7)}],
+        )
+
+    def test_handover_and_complete_update_machines(self):
+        machine = self.create_machine()
+        active = self.book(machine, date(2025, 10, 1), date(2025, 10, 3), status='Active')
+        machine.status = 'In Use'
+        machine.save()
+        next_up = self.book(machine, date(2025, 10, 4), date(2025, 10, 6), status='Approved')
+
+        response = self.post([{'id': active.id, 'action': 'complete'}, {'id': next_up.id, 'action': 'handover'}])
+        self.assertEqual(response.data['applied'], 2)
+        machine.refresh_from_db()
+        self.assertEqual(machine.status, 'In Use')
+        self.assertEqual(Booking.objects.get(pk=next_up.id).status, 'Active')
+
+    def test_query_count_is_independent_of_batch_size(self):
+        machine = self.create_machine()
+        small = [self.book(machine, date(2025, 11, day), date(2025, 11, day)) for day in (1, 2)]
+        large = [self.book(self.create_machine(), date(2025, 12, 1), date(2025, 12, 2)) for _ in range(10)]
+
+        # Machine lookup, savepoint, bookings, intervals, update, audit insert,
+        # release, CHC admins to notify (the acting admin is the only one)
+        with self.assertNumQueries(8):
+            self.post([{'id': b.id, 'action': 'approve'} for b in small])
+        with self.assertNumQueries(8):
+            self.post([{'id': b.id, 'action': 'approve'} for b in large])
+
+    def test_rejects_malformed_requests(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.client.post(reverse('chc-booking-bulk-action'), {}, format='json').status_code, 400)
+
+
+class BookingAdmissionConcurrencyTests(TransactionTestCase):
+    # The in-memory SQLite test database is one shared cache that fails with
+    # "table is locked" instead of waiting, so threads need a real server
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_concurrent_approvals_never_double_book(self):
+        out = StringIO()
+        call_command('benchmark_booking_admission', submitters=8, rounds=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('same machine: 8 submitters', lines[0])
+        self.assertIn('2 approved', lines[0])
+        self.assertIn('16 approved', lines[1])
+        for line in lines:
+            self.assertIn('0 errors, 0 double bookings', line)
+        self.assertFalse(Booking.objects.exists())
+
+
+    @skipIfDBFeature('has_select_for_update')
+    def test_striped_locks_serialize_approvals_on_sqlite(self):
+        chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        machine = Machine.objects.create(chc=chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022)
+        # Shares a stripe with ``machine``; taking both must not deadlock
+        neighbour = Machine.objects.create(
+            id=machine.id + admission.LOCK_STRIPES, chc=chc, machine_name='Baler',
+            machine_type='Baler', purchase_year=2022,
+        )
+        bookings = [
+            Booking.objects.create(
+                chc=chc, machine=machine, start_date=date(2025, 10, day), end_date=date(2025, 10, day + 2),
+                farmer_name='Ram Singh', farmer_contact='9876543210',
+                farmer_email='ram@example.com', farmer_aadhar='123456789012',
+            )
+            for day in range(1, 7)
+        ]
+        barrier = threading.Barrier(len(bookings))
+        errors = []
+
+        def approve(booking):
+            try:
+                barrier.wait()
+                # Every query runs inside the admission block: the shared-cache
+                # test database reports "table is locked" rather than waiting
+                with admission.machine_admission([booking.machine_id, neighbour.id]):
+                    if get_availability(booking.machine_id, fresh=True).is_free(booking.start_date, booking.end_date):
+                        time.sleep(0.01)
+                        Booking.objects.filter(pk=booking.pk).update(status='Approved')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=approve, args=(booking,)) for booking in bookings]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertEqual(errors, [])
+        approved = Booking.objects.filter(status='Approved').order_by('start_date')
+        self.assertTrue(approved.exists())
+        for earlier, later in zip(approved, approved[1:]):
+            self.assertLess(earlier.end_date, later.start_date)
+
+
+@override_settings(BOOKING_ID_BLOCK_SIZE=5)
+class BookingIdAllocatorTests(APITestCase):
+    def test_codes_are_short_distinct_and_reversible(self):
+        allocator = SequenceBlockAllocator(key='test')
+        numbers = list(range(2000)) + [CODE_SPACE - 1]
+        codes = [allocator.obfuscate(number) for number in numbers]
+        self.assertEqual(len(set(codes)), len(codes))
+        self.assertTrue(all(len(code) == 11 and code.startswith('BKG-') for code in codes))
+        self.assertEqual([allocator.decode(code) for code in codes], numbers)
+        self.assertIsNone(allocator.decode('BKG-ABC123'))
+
+    def test_bulk_create_reserves_blocks_not_rows(self):
+        chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        machine = Machine.objects.create(
+            chc=chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022
+        )
+        bookings = [
+            Booking(chc=chc, machine=machine, start_date=date(2025, 10, 1), end_date=date(2025, 10, 2),
+                    farmer_name='Ram Singh', farmer_contact='9876543210',
+                    farmer_email='ram@example.com', farmer_aadhar='123456789012')
+            for _ in range(12)
+        ]
+        Booking.objects.bulk_create(bookings)
+
+        self.assertEqual(BookingIdSequence.objects.get().next_value, 15)
+        numbers = sorted(decode_booking_id(b) for b in Booking.objects.values_list('booking_id', flat=True))
+        self.assertEqual(numbers, list(range(12)))
+
+    def test_block_reserved_in_rolled_back_transaction_is_discarded(self):
+        allocator = get_booking_id_allocator()
+        try:
+            with transaction.atomic():
+                allocator.allocate()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(BookingIdSequence.objects.exists())
+
+        allocator.allocate()
+        self.assertEqual(BookingIdSequence.objects.get().next_value, 5)
+
+
+class CHCBookingListViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='CHC_ADMIN', chc=self.chc
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def add_bookings(self, count):
+        for _ in range(count):
+            machine = Machine.objects.create(
+                chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022, status='In Use'
+            )
+            Booking.objects.create(
+                chc=self.chc, machine=machine, start_date=date(2025, 10, 1), end_date=date(2025, 10, 2),
+                status='Active', farmer_name='Ram Singh', farmer_contact='9876543210',
+                farmer_email='ram@example.com', farmer_aadhar='123456789012',
+            )
+
+    def test_query_count_is_independent_of_booking_count(self):
+        url = reverse('chc-booking-list')
+        self.add_bookings(2)
+        # Three freshness aggregates and the bookings with their machine and CHC
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertEqual(response.data[0]['machine_details']['machine_name'], 'Seeder')
+        self.assertEqual(response.data[0]['chc_details']['chc_name'], 'CHC')
+
+        self.add_bookings(20)
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertEqual(len(response.data), 22)
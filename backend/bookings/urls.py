@@ -1,10 +1,12 @@
 from django.urls import path
-from .views import PublicBookingCreateView, PublicBookingStatusView, CHCBookingListView, CHCBookingActionView, MachineBookedDatesView
+from .views import PublicBookingCreateView, PublicBookingStatusView, CHCBookingListView, CHCBookingActionView, CHCBookingBulkActionView, MachineBookedDatesView, MachineNextFreeWindowView
 
 urlpatterns = [
     path('public/create/', PublicBookingCreateView.as_view(), name='public-booking-create'),
     path('public/<str:booking_id>/status/', PublicBookingStatusView.as_view(), name='public-booking-status'),
     path('public/machine/<int:machine_id>/dates/', MachineBookedDatesView.as_view(), name='machine-booked-dates'),
+    path('public/machine/<int:machine_id>/next-free/', MachineNextFreeWindowView.as_view(), name='machine-next-free'),
     path('chc/', CHCBookingListView.as_view(), name='chc-booking-list'),
     path('chc/<int:pk>/action/', CHCBookingActionView.as_view(), name='chc-booking-action'),
+    path('chc/bulk-action/', CHCBookingBulkActionView.as_view(), name='chc-booking-bulk-action'),
 ]
@@ -1,11 +1,21 @@
 from rest_framework import generics, permissions, filters, serializers
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Booking
-from .serializers import BookingSerializer, BookingCreateSerializer
+from .serializers import BookingSerializer, BookingCreateSerializer, BookingListSerializer
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
-from analytics.models import AuditLog, Notification
+from analytics import changes
+from machines.models import Machine
+from chc.models import CHC
+from utils.conditional import ConditionalGetMixin
+from utils.pagination import KeysetPagination
+from utils.sparse import SparseQuerysetMixin
+from .availability import get_availability
+from .bulk import apply_booking_actions, MAX_BULK_ACTIONS
+from .admission import machine_admission
+from datetime import date
+from django.utils import timezone
 
 class PublicBookingCreateView(generics.CreateAPIView):
     queryset = Booking.objects.all()
@@ -17,41 +27,40 @@ class PublicBookingCreateView(generics.CreateAPIView):
         start_date = serializer.validated_data['start_date']
         end_date = serializer.validated_data['end_date']
         
-        # Availability Check
-        overlapping_bookings = Booking.objects.filter(
-            machine=machine,
-            status__in=['Approved', 'Active'],
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        )
-        
-        if overlapping_bookings.exists():
+        # Availability Check (a Pending request blocks nothing, so the cached index is enough)
+        if not get_availability(machine.id).is_free(start_date, end_date):
              raise serializers.ValidationError("Machine is not available for the selected dates.")
 
         serializer.save(status='Pending', chc=machine.chc)
         # Here we should convert BookingCreateSerializer to BookingSerializer for response if needed
         # Or trigger notifications
 
-class PublicBookingStatusView(generics.RetrieveAPIView):
+class PublicBookingStatusView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveAPIView):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     permission_classes = (permissions.AllowAny,)
     lookup_field = 'booking_id'
 
-class CHCBookingListView(generics.ListAPIView):
-    serializer_class = BookingSerializer
+class CHCBookingListView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListAPIView):
+    serializer_class = BookingListSerializer
+    pagination_class = KeysetPagination
     permission_classes = (permissions.IsAuthenticated,)
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
     filterset_fields = ['machine']
     ordering_fields = ['booking_date', 'start_date', 'farmer_name', 'status']
     search_fields = ['farmer_name', 'farmer_contact', 'booking_id', 'machine__machine_name']
 
+    def get_freshness_querysets(self):
+        # Each booking embeds its machine and CHC details
+        chc_id = self.request.user.chc_id
+        return [self.get_queryset(), Machine.objects.filter(chc=chc_id), CHC.objects.filter(pk=chc_id)]
+
     def get_queryset(self):
         user = self.request.user
         if not (user.role == 'CHC_ADMIN' and user.chc):
             return Booking.objects.none()
             
-        queryset = Booking.objects.filter(chc=user.chc)
+        queryset = Booking.objects.select_related('machine', 'chc').filter(chc=user.chc)
         
         # 1. Custom Filtering by start_date, end_date
         start_date = self.request.query_params.get('start_date')
@@ -102,69 +111,94 @@ class CHCBookingActionView(generics.UpdateAPIView):
         if booking.chc != request.user.chc:
             return Response({"error": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
 
-        if action == 'approve':
-            overlapping_bookings = Booking.objects.filter(
-                machine=booking.machine,
-                status__in=['Approved', 'Active'],
-                start_date__lte=booking.end_date,
-                end_date__gte=booking.start_date
-            ).exclude(id=booking.id)
-            
-            if overlapping_bookings.exists():
-                return Response({"error": "Machine is already booked and approved for the selected dates."}, status=status.HTTP_400_BAD_REQUEST)
-
-            booking.status = 'Approved'
-            booking.approved_by = request.user
-            # Check availability again logic
-        elif action == 'reject':
-            booking.status = 'Rejected'
-            booking.rejection_reason = notes
-            booking.approved_by = request.user
-        elif action == 'handover':
-            if booking.status != 'Approved':
-                return Response({"error": "Only approved bookings can be handed over."}, status=status.HTTP_400_BAD_REQUEST)
+        # Decide and write while owning the machine, so concurrent approvals
+        # and handovers of the same machine cannot both pass the checks
+        with machine_admission([booking.machine_id]):
+            # Reloads the booking and drops the cached machine, both may be stale
+            booking.refresh_from_db()
+            if action == 'approve':
+                availability = get_availability(booking.machine_id, fresh=True)
+                if not availability.is_free(booking.start_date, booking.end_date, exclude=booking.id):
+                    return Response({"error": "Machine is already booked and approved for the selected dates."}, status=status.HTTP_400_BAD_REQUEST)
+
+                booking.status = 'Approved'
+                booking.approved_by = request.user
+                # Check availability again logic
+            elif action == 'reject':
+                booking.status = 'Rejected'
+                booking.rejection_reason = notes
+                booking.approved_by = request.user
+            elif action == 'handover':
+                if booking.status != 'Approved':
+                    return Response({"error": "Only approved bookings can be handed over."}, status=status.HTTP_400_BAD_REQUEST)
             
-            if booking.machine.status == 'In Use' or Booking.objects.filter(machine=booking.machine, status='Active').exists():
-                return Response({"error": "Machine is already handed over to someone else."}, status=status.HTTP_400_BAD_REQUEST)
-
-            booking.status = 'Active'
-            booking.machine.status = 'In Use'
-            booking.machine.save()
-            # Could set actual_start_time here
-        elif action == 'complete':
-            if booking.status != 'Active':
-                 return Response({"error": "Only active bookings can be completed."}, status=status.HTTP_400_BAD_REQUEST)
-            booking.status = 'Completed'
-            booking.machine.status = 'Idle'
-            booking.machine.save()
-            # Could set actual_end_time here
-        elif action == 'cancel':
-            booking.status = 'Cancelled'
-            booking.rejection_reason = notes # Reuse for cancellation reason
-        else:
-            return Response({"error": "Invalid action"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        booking.save()
-        
-        # Log Audit
-        AuditLog.objects.create(
-            user=request.user,
-            action_type=action.upper(),
-            table_name='bookings',
-            record_id=str(booking.id),
-            new_value={'status': booking.status, 'notes': notes}
-        )
+                availability = get_availability(booking.machine_id, fresh=True)
+                if booking.machine.status == 'In Use' or availability.active_booking_ids:
+                    return Response({"error": "Machine is already handed over to someone else."}, status=status.HTTP_400_BAD_REQUEST)
+
+                booking.status = 'Active'
+                booking.machine.status = 'In Use'
+                booking.machine.save()
+                # Could set actual_start_time here
+            elif action == 'complete':
+                if booking.status != 'Active':
+                     return Response({"error": "Only active bookings can be completed."}, status=status.HTTP_400_BAD_REQUEST)
+                booking.status = 'Completed'
+                booking.machine.status = 'Idle'
+                booking.machine.save()
+                # Could set actual_end_time here
+            elif action == 'cancel':
+                booking.status = 'Cancelled'
+                booking.rejection_reason = notes # Reuse for cancellation reason
+            else:
+                return Response({"error": "Invalid action"}, status=status.HTTP_400_BAD_REQUEST)
         
+            # The change-capture layer audits the save under the action's name
+            changes.label(booking, action.upper(), user=request.user, notes=notes)
+            booking.save()
         
         return Response(BookingSerializer(booking).data)
 
-class MachineBookedDatesView(APIView):
+class CHCBookingBulkActionView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        if not (request.user.role == 'CHC_ADMIN' and request.user.chc_id):
+            return Response({"error": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+
+        items = request.data.get('actions')
+        if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+            return Response({"error": "actions must be a non-empty list of {id, action, notes} objects"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_ACTIONS:
+            return Response({"error": f"At most {MAX_BULK_ACTIONS} actions can be sent at once"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_booking_actions(request.user, items)
+        applied = sum(1 for result in results if result['ok'])
+        return Response({"applied": applied, "failed": len(results) - applied, "results": results})
+
+class MachineBookedDatesView(ConditionalGetMixin, APIView):
     permission_classes = (permissions.AllowAny,)
 
+    def get_freshness_querysets(self):
+        return [Booking.objects.filter(machine_id=self.kwargs['machine_id'])]
+
     def get(self, request, machine_id):
-        bookings = Booking.objects.filter(
-            machine_id=machine_id,
-            status__in=['Approved', 'Active']
-        ).values('start_date', 'end_date')
-        
-        return Response(list(bookings))
+        return Response(get_availability(machine_id).booked_ranges())
+
+class MachineNextFreeWindowView(ConditionalGetMixin, APIView):
+    permission_classes = (permissions.AllowAny,)
+
+    def get_freshness_querysets(self):
+        return [Booking.objects.filter(machine_id=self.kwargs['machine_id'])]
+
+    def get(self, request, machine_id):
+        try:
+            days = int(request.query_params.get('days', 1))
+            not_before = date.fromisoformat(request.query_params['from']) if 'from' in request.query_params else timezone.localdate()
+        except ValueError:
+            return Response({"error": "days must be an integer and from must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= 366:
+            return Response({"error": "days must be between 1 and 366"}, status=status.HTTP_400_BAD_REQUEST)
+
+        start_date, end_date = get_availability(machine_id).next_free_window(days, not_before)
+        return Response({"machine_id": machine_id, "start_date": start_date, "end_date": end_date})
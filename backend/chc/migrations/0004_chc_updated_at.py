@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chc', '0003_remove_chc_admin_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chc',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 
-class CHC(models.Model):
+from analytics.changes import AuditedModel
+
+class CHC(AuditedModel):
     chc_name = models.CharField(max_length=255)
     state = models.CharField(max_length=100)
     district = models.CharField(max_length=100)
@@ -20,6 +22,7 @@ class CHC(models.Model):
     
     is_active = models.BooleanField(default=True)
     registration_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
@@ -1,13 +1,33 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from accounts.models import User
+from utils.sparse import SparseFieldsMixin
 from .models import CHC
 
-class CHCSerializer(serializers.ModelSerializer):
+def active_admins_prefetch(lookup='admins'):
+    """Prefetch behind ``CHC.admin`` for list views; ``lookup`` may be prefixed, e.g. ``chc__admins``."""
+    return Prefetch(
+        lookup,
+        queryset=User.objects.filter(role='CHC_ADMIN', is_active=True).order_by('pk'),
+        to_attr='active_admins',
+    )
+
+class CHCSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     admin_name = serializers.SerializerMethodField()
 
     class Meta:
         model = CHC
         fields = '__all__'
+        expandable_fields = ('admin_name',)
+        field_sources = {'admin_name': ()}
 
     def get_admin_name(self, obj):
         admin = obj.admin
         return admin.get_full_name() if admin else None
+
+class CHCListSerializer(CHCSerializer):
+    """CHCSerializer for querysets prefetched with ``active_admins_prefetch()``."""
+
+    def get_admin_name(self, obj):
+        admin = obj.active_admins[0] if obj.active_admins else None
+        return admin.get_full_name() if admin else None
@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from chc.models import CHC
+
+
+class CHCListViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.govt_admin = User.objects.create_user(
+            username='govt', email='govt@example.com', password='x', role='GOVT_ADMIN'
+        )
+
+    def add_chcs(self, count):
+        for index in range(count):
+            chc = CHC.objects.create(
+                chc_name=f"CHC {index}", state='Punjab', district='Ludhiana', location='Gill Road',
+                pincode='141001', contact_number='9876543210', email=f"chc{index}@example.com",
+            )
+            User.objects.create_user(
+                username=f"admin{chc.id}", email=f"admin{chc.id}@example.com", password='x', role='CHC_ADMIN',
+                chc=chc, first_name='Gurpreet', last_name=str(chc.id),
+            )
+
+    def test_public_search_query_count_is_independent_of_chc_count(self):
+        url = reverse('public-chc-search')
+        self.add_chcs(2)
+        # Freshness aggregate, CHCs, their active admins
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertTrue(response.data[0]['admin_name'].startswith('Gurpreet'))
+
+        self.add_chcs(20)
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertEqual(len(response.data), 22)
+
+    def test_list_query_count_is_independent_of_chc_count(self):
+        url = reverse('chc-list-create')
+        self.client.force_authenticate(user=self.govt_admin)
+        self.add_chcs(2)
+        with self.assertNumQueries(3):
+            self.client.get(url, {'nopage': 'true'})
+        self.add_chcs(20)
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertTrue(all(row['admin_name'] for row in response.data))
@@ -1,23 +1,43 @@
 from rest_framework import generics, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import CHC
-from .serializers import CHCSerializer
+from .serializers import CHCSerializer, CHCListSerializer, active_admins_prefetch
+from utils.conditional import ConditionalGetMixin
+from utils.pagination import KeysetPagination
+from utils.sparse import SparseQuerysetMixin
 
 class IsGovtAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == 'GOVT_ADMIN'
 
-class PublicCHCSearchView(generics.ListAPIView):
-    queryset = CHC.objects.filter(is_active=True)
-    serializer_class = CHCSerializer
+class PublicCHCSearchView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListAPIView):
+    serializer_class = CHCListSerializer
+    pagination_class = KeysetPagination
     permission_classes = (permissions.AllowAny,)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['pincode', 'district', 'state']
     search_fields = ['chc_name', 'location']
 
-class CHCListCreateView(generics.ListCreateAPIView):
-    queryset = CHC.objects.all()
+    def get_queryset(self):
+        queryset = CHC.objects.filter(is_active=True).order_by('-registration_date')
+        if self.wants('admin_name'):
+            queryset = queryset.prefetch_related(active_admins_prefetch())
+        return queryset
+
+class CHCListCreateView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = CHCSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = CHC.objects.order_by('-registration_date')
+        if self.wants('admin_name'):
+            queryset = queryset.prefetch_related(active_admins_prefetch())
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return CHCListSerializer
+        return CHCSerializer
     
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -25,7 +45,7 @@ class CHCListCreateView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated(), IsGovtAdmin()]
         return [permissions.IsAuthenticated()] 
 
-class CHCDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CHCDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = CHC.objects.all()
     serializer_class = CHCSerializer
     
@@ -67,5 +87,8 @@ class AssignAdminView(APIView):
             new_admin.chc = chc
             new_admin.is_active = True
             new_admin.save()
+
+            # admin_name is part of the CHC payload; move its freshness token
+            chc.save(update_fields=['updated_at'])
             
         return Response({"message": "Admin assigned successfully", "admin_name": new_admin.get_full_name()})
@@ -66,6 +66,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'analytics.changes.AuditRequestMiddleware',
 
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -115,10 +116,70 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so booking
+                # admission checks never run on a read another writer is about
+                # to invalidate (see bookings/admission.py)
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
         }
     }
 
 
+# Cache
+# Local memory is per-process; point CACHE_BACKEND at a shared backend such as
+# django.core.cache.backends.filebased.FileBasedCache when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'crm-cache'),
+    }
+}
+
+# Seconds a dashboard payload may live in the cache; writes invalidate it earlier.
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 300))
+
+# Seconds a machine's cached booked dates may be served. Writes invalidate the
+# entry at once, but only in the process's own cache when it is local-memory,
+# so this bounds how stale other workers can be. Approvals always re-read.
+AVAILABILITY_CACHE_TIMEOUT = int(os.getenv('AVAILABILITY_CACHE_TIMEOUT', 30))
+
+# Seconds an unread-notification count may be served from the cache. Like
+# the booked dates above, adjustments only reach the writer's own
+# local-memory cache, so this bounds how far other workers' badges lag.
+NOTIFICATION_UNREAD_TIMEOUT = int(os.getenv('NOTIFICATION_UNREAD_TIMEOUT', 30))
+
+# Server-sent dashboard events (analytics.live), served by crm_backend.asgi.
+# 'analytics.live.CacheBroker' fans out across worker processes through a shared cache.
+LIVE_EVENTS_BACKEND = os.getenv('LIVE_EVENTS_BACKEND', 'analytics.live.LocalBroker')
+LIVE_EVENTS_HISTORY = int(os.getenv('LIVE_EVENTS_HISTORY', 1000))
+LIVE_EVENTS_QUEUE_SIZE = int(os.getenv('LIVE_EVENTS_QUEUE_SIZE', 256))
+LIVE_EVENTS_KEEPALIVE = float(os.getenv('LIVE_EVENTS_KEEPALIVE', 15))
+LIVE_EVENTS_MAX_AGE = float(os.getenv('LIVE_EVENTS_MAX_AGE', 3600))
+
+# Booking ids (BKG-XXXXXXX) are drawn from a database counter in blocks of
+# BOOKING_ID_BLOCK_SIZE and scrambled with BOOKING_ID_KEY. Changing the key on
+# a live database can make new ids collide with existing ones.
+BOOKING_ID_ALLOCATOR = 'bookings.ids.SequenceBlockAllocator'
+BOOKING_ID_BLOCK_SIZE = int(os.getenv('BOOKING_ID_BLOCK_SIZE', 1000))
+BOOKING_ID_KEY = os.getenv('BOOKING_ID_KEY', 'crm-tracker')
+
+# Audit rows are queued after commit and bulk-inserted by a background thread
+# (analytics.audit). 'sync' inserts them inside the request instead; 'off' disables auditing.
+AUDIT_LOG_MODE = os.getenv('AUDIT_LOG_MODE', 'async')
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', 500))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', 1.0))
+
+# Runs tests with AUDIT_LOG_MODE = 'sync'
+TEST_RUNNER = 'crm_backend.test_runner.TestRunner'
+
+# archive_audit_logs moves older rows into monthly gzip NDJSON files here
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv('AUDIT_LOG_RETENTION_DAYS', 180))
+AUDIT_ARCHIVE_DIR = Path(os.getenv('AUDIT_ARCHIVE_DIR', BASE_DIR / 'archive' / 'audit'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
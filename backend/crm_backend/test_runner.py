@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the suite with audit rows inserted inside the request.
+
+    The background audit writer would otherwise share the in-memory test
+    database with the tests and race their assertions. Tests of the writer
+    itself switch back with ``override_settings(AUDIT_LOG_MODE='async')``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.audit_mode = override_settings(AUDIT_LOG_MODE='sync')
+        self.audit_mode.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.audit_mode.disable()
+        super().teardown_test_environment(**kwargs)
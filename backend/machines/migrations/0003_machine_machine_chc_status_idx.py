@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chc', '0004_chc_updated_at'),
+        ('machines', '0002_alter_machine_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='machine',
+            index=models.Index(fields=['chc', 'status'], name='machine_chc_status_idx'),
+        ),
+    ]
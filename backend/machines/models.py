@@ -1,6 +1,8 @@
 from django.db import models
 
-class Machine(models.Model):
+from analytics.changes import AuditedModel
+
+class Machine(AuditedModel):
     MACHINE_TYPES = (
         ('Happy Seeder', 'Happy Seeder'),
         ('Super Seeder', 'Super Seeder'),
@@ -68,3 +70,7 @@ class Machine(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Per-CHC machine lists and status counts
+            models.Index(fields=['chc', 'status'], name='machine_chc_status_idx'),
+        ]
@@ -1,7 +1,14 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from utils.sparse import SparseFieldsMixin
 from .models import Machine
 
-class MachineSerializer(serializers.ModelSerializer):
+def active_bookings_prefetch():
+    """Prefetch behind ``MachineListSerializer.get_active_booking``."""
+    from bookings.models import Booking
+    return Prefetch('bookings', queryset=Booking.objects.filter(status='Active'), to_attr='active_bookings')
+
+class MachineSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     chc_details = serializers.SerializerMethodField()
     active_booking = serializers.SerializerMethodField()
     
@@ -9,6 +16,11 @@ class MachineSerializer(serializers.ModelSerializer):
         model = Machine
         fields = '__all__'
         read_only_fields = ('machine_code', 'created_at', 'updated_at', 'total_hours_used')
+        expandable_fields = ('chc_details', 'active_booking')
+        field_sources = {
+            'chc_details': ('chc__id', 'chc__chc_name', 'chc__district'),
+            'active_booking': ('status',),
+        }
 
     def get_chc_details(self, obj):
         return {
@@ -21,16 +33,19 @@ class MachineSerializer(serializers.ModelSerializer):
         if obj.status == 'In Use':
             # Import Booking here to avoid circular dependencies
             from bookings.models import Booking
-            active_booking = Booking.objects.filter(machine=obj, status='Active').first()
-            if active_booking:
-                return {
-                    "booking_id": str(active_booking.booking_id),
-                    "farmer_name": active_booking.farmer_name,
-                    "farmer_contact": active_booking.farmer_contact,
-                    "start_date": active_booking.start_date,
-                    "end_date": active_booking.end_date,
-                    "status": active_booking.status
-                }
+            return self.describe_booking(Booking.objects.filter(machine=obj, status='Active').first())
+        return None
+
+    def describe_booking(self, active_booking):
+        if active_booking:
+            return {
+                "booking_id": str(active_booking.booking_id),
+                "farmer_name": active_booking.farmer_name,
+                "farmer_contact": active_booking.farmer_contact,
+                "start_date": active_booking.start_date,
+                "end_date": active_booking.end_date,
+                "status": active_booking.status
+            }
         return None
 
     def validate_status(self, value):
@@ -50,3 +65,35 @@ class MachineSerializer(serializers.ModelSerializer):
                     raise serializers.ValidationError("Cannot change status to Idle directly while there is an active booking. Complete the booking first.")
                     
         return value
+
+class MachineListSerializer(MachineSerializer):
+    """MachineSerializer for querysets with ``select_related('chc')`` and ``active_bookings_prefetch()``."""
+
+    def get_active_booking(self, obj):
+        if obj.status == 'In Use':
+            # Same pick as .first() under Booking's default ordering
+            active = sorted(obj.active_bookings, key=lambda booking: booking.created_at, reverse=True)
+            return self.describe_booking(active[0] if active else None)
+        return None
+
+class MachineSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Machine
+        fields = ('id', 'machine_code', 'machine_name', 'machine_type', 'status')
+
+class AvailableMachineSerializer(serializers.ModelSerializer):
+    chc_details = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Machine
+        fields = ('id', 'machine_code', 'machine_name', 'machine_type', 'status', 'chc', 'chc_details')
+
+    def get_chc_details(self, obj):
+        return {
+            "id": obj.chc.id,
+            "name": obj.chc.chc_name,
+            "district": obj.chc.district,
+            "location": obj.chc.location,
+            "pincode": obj.chc.pincode,
+            "contact_number": obj.chc.contact_number,
+        }
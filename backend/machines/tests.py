@@ -0,0 +1,130 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from bookings.models import Booking
+from chc.models import CHC
+from machines.models import Machine
+
+
+class PublicAvailableMachineSearchViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.near = self.create_chc('Zira CHC', '142047')
+        self.far = self.create_chc('Abohar CHC', '152116')
+
+    def create_chc(self, name, pincode):
+        return CHC.objects.create(
+            chc_name=name, state='Punjab', district='Ferozepur', location='Main Road',
+            pincode=pincode, contact_number='9876543210', email='chc@example.com',
+        )
+
+    def create_machine(self, chc, machine_type='Happy Seeder', **kwargs):
+        return Machine.objects.create(
+            chc=chc, machine_name=machine_type, machine_type=machine_type, purchase_year=2022, **kwargs
+        )
+
+    def book(self, machine, start, end, status):
+        Booking.objects.create(
+            chc=machine.chc, machine=machine, start_date=start, end_date=end, status=status,
+            farmer_name='Ram Singh', farmer_contact='9876543210',
+            farmer_email='ram@example.com', farmer_aadhar='123456789012',
+        )
+
+    def search(self, headers=None, **params):
+        params.setdefault('start_date', '2025-10-10')
+        params.setdefault('end_date', '2025-10-12')
+        return self.client.get(reverse('public-machine-available'), params, **(headers or {}))
+
+    def test_returns_only_free_machines_ranked_by_chc(self):
+        booked = self.create_machine(self.near)
+        pending_only = self.create_machine(self.near)
+        far_free = self.create_machine(self.far)
+        self.create_machine(self.far, machine_type='Mulcher')
+        self.create_machine(self.far, status='Out of Service')
+        self.book(booked, date(2025, 10, 12), date(2025, 10, 14), 'Approved')
+        self.book(pending_only, date(2025, 10, 10), date(2025, 10, 11), 'Pending')
+        self.book(far_free, date(2025, 10, 1), date(2025, 10, 9), 'Active')
+
+        with self.assertNumQueries(4):
+            # Two freshness aggregates, the page count and the anti-join page
+            response = self.search(machine_type='Happy Seeder', district='ferozepur', pincode='142047')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [pending_only.id, far_free.id])
+
+        response = self.search(machine_type='Happy Seeder')
+        self.assertEqual([row['id'] for row in response.data['results']], [far_free.id, pending_only.id])
+
+    def test_etag_follows_only_the_candidate_machines(self):
+        seeder = self.create_machine(self.near)
+        mulcher = self.create_machine(self.far, machine_type='Mulcher')
+        etag = self.search(machine_type='Happy Seeder')['ETag']
+
+        self.book(mulcher, date(2025, 10, 10), date(2025, 10, 11), 'Approved')
+        CHC.objects.create(
+            chc_name='Moga CHC', state='Punjab', district='Moga', location='Main Road',
+            pincode='142001', contact_number='9876543210', email='moga@example.com',
+        )
+        self.assertEqual(self.search({'HTTP_IF_NONE_MATCH': etag}, machine_type='Happy Seeder').status_code, 304)
+
+        self.near.chc_name = 'Zira Kisan CHC'
+        self.near.save()
+        response = self.search({'HTTP_IF_NONE_MATCH': etag}, machine_type='Happy Seeder')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['chc_details']['name'], 'Zira Kisan CHC')
+        self.book(seeder, date(2025, 10, 10), date(2025, 10, 11), 'Approved')
+        self.assertEqual(self.search({'HTTP_IF_NONE_MATCH': response['ETag']}, machine_type='Happy Seeder').status_code, 200)
+
+    def test_requires_a_valid_date_range(self):
+        self.assertEqual(self.search(start_date='2025-10-12', end_date='2025-10-10').status_code, 400)
+        self.assertEqual(self.client.get(reverse('public-machine-available')).status_code, 400)
+
+
+class MachineListViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.chc = CHC.objects.create(
+            chc_name='CHC', state='Punjab', district='Ludhiana', location='Gill Road',
+            pincode='141001', contact_number='9876543210', email='chc@example.com',
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='CHC_ADMIN', chc=self.chc
+        )
+
+    def add_busy_machines(self, count):
+        for index in range(count):
+            machine = Machine.objects.create(
+                chc=self.chc, machine_name='Seeder', machine_type='Happy Seeder', purchase_year=2022, status='In Use'
+            )
+            Booking.objects.create(
+                chc=self.chc, machine=machine, start_date=date(2025, 10, 1), end_date=date(2025, 10, 2),
+                status='Active', farmer_name=f"Farmer {index}", farmer_contact='9876543210',
+                farmer_email='ram@example.com', farmer_aadhar='123456789012',
+            )
+
+    def test_public_list_query_count_is_independent_of_machine_count(self):
+        url = reverse('public-machine-list')
+        self.add_busy_machines(2)
+        # Freshness aggregate, machines with their CHC, active bookings
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertEqual(response.data[0]['active_booking']['farmer_name'], 'Farmer 1')
+
+        self.add_busy_machines(20)
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertEqual(len(response.data), 22)
+
+    def test_chc_list_query_count_is_independent_of_machine_count(self):
+        url = reverse('chc-machine-list-create')
+        self.client.force_authenticate(user=self.admin)
+        self.add_busy_machines(2)
+        with self.assertNumQueries(3):
+            self.client.get(url, {'nopage': 'true'})
+        self.add_busy_machines(20)
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'nopage': 'true'})
+        self.assertTrue(all(row['active_booking'] for row in response.data))
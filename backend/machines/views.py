@@ -1,34 +1,122 @@
+from datetime import date
 from rest_framework import generics, permissions, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Case, Count, Exists, IntegerField, Max, OuterRef, Value, When
 from .models import Machine
-from .serializers import MachineSerializer
-from rest_framework.exceptions import PermissionDenied
+from .serializers import MachineSerializer, MachineListSerializer, AvailableMachineSerializer, active_bookings_prefetch
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from bookings.availability import BLOCKING_STATUSES
+from bookings.models import Booking
+from utils.conditional import ConditionalGetMixin
+from utils.pagination import KeysetPagination
+from utils.sparse import SparseQuerysetMixin
 
-class PublicMachineListView(generics.ListAPIView):
-    queryset = Machine.objects.select_related('chc').all()
-    serializer_class = MachineSerializer
+def _machine_freshness(machines):
+    """Count and latest change of ``machines`` and of the CHCs they embed, in one query."""
+    # chc_details embeds the CHC name and district
+    stats = machines.aggregate(count=Count('pk'), latest=Max('updated_at'), chc_latest=Max('chc__updated_at'))
+    return f"{stats['count']}:{stats['latest']}:{stats['chc_latest']}"
+
+
+class PublicMachineListView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListAPIView):
+    serializer_class = MachineListSerializer
     permission_classes = (permissions.AllowAny,)
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['chc', 'machine_type', 'status']
     search_fields = ['machine_name']
 
-class DetailedMachineView(generics.RetrieveAPIView):
+    def get_queryset(self):
+        queryset = Machine.objects.select_related('chc')
+        if self.wants('active_booking'):
+            queryset = queryset.prefetch_related(active_bookings_prefetch())
+        return queryset
+
+    def get_freshness_token(self):
+        return _machine_freshness(self.get_queryset())
+
+class PublicAvailableMachineSearchView(ConditionalGetMixin, generics.ListAPIView):
+    """Machines free for a whole date range, found with one anti-join query."""
+    serializer_class = AvailableMachineSerializer
+    permission_classes = (permissions.AllowAny,)
+
+    def get_freshness_querysets(self):
+        start_date, end_date = self.get_dates()
+        return [Booking.objects.filter(
+            machine__in=self.get_candidates(), start_date__lte=end_date, end_date__gte=start_date,
+        )]
+
+    def get_freshness_token(self):
+        return f"{_machine_freshness(self.get_candidates())}|{super().get_freshness_token()}"
+
+    def get_dates(self):
+        params = self.request.query_params
+        try:
+            start_date = date.fromisoformat(params['start_date'])
+            end_date = date.fromisoformat(params['end_date'])
+        except (KeyError, ValueError):
+            raise ValidationError({"error": "start_date and end_date are required (YYYY-MM-DD)."})
+        if start_date > end_date:
+            raise ValidationError({"error": "start_date must not be after end_date."})
+        return start_date, end_date
+
+    def get_candidates(self):
+        params = self.request.query_params
+        queryset = Machine.objects.filter(chc__is_active=True).exclude(status='Out of Service')
+        if params.get('machine_type'):
+            queryset = queryset.filter(machine_type=params['machine_type'])
+        if params.get('district'):
+            queryset = queryset.filter(chc__district__iexact=params['district'])
+        return queryset
+
+    def get_queryset(self):
+        params = self.request.query_params
+        start_date, end_date = self.get_dates()
+
+        clashing_bookings = Booking.objects.filter(
+            machine=OuterRef('pk'),
+            status__in=BLOCKING_STATUSES,
+            start_date__lte=end_date,
+            end_date__gte=start_date,
+        )
+        queryset = self.get_candidates().select_related('chc').filter(~Exists(clashing_bookings))
+
+        # CHCs in the farmer's pincode come first, then CHCs by name
+        pincode = params.get('pincode')
+        if pincode:
+            pincode_rank = Case(When(chc__pincode=pincode, then=Value(0)), default=Value(1), output_field=IntegerField())
+        else:
+            pincode_rank = Value(0, output_field=IntegerField())
+        return queryset.annotate(pincode_rank=pincode_rank).order_by(
+            'pincode_rank', 'chc__chc_name', 'chc_id', 'machine_name', 'id'
+        )
+
+class DetailedMachineView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveAPIView):
     queryset = Machine.objects.all()
     serializer_class = MachineSerializer
     permission_classes = (permissions.AllowAny,)
 
-class CHCMachineListCreateView(generics.ListCreateAPIView):
+class CHCMachineListCreateView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = MachineSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return MachineListSerializer
+        return MachineSerializer
 
     def get_queryset(self):
         user = self.request.user
         if not user.is_authenticated:
             return Machine.objects.none()
+        queryset = Machine.objects.select_related('chc')
+        if self.wants('active_booking'):
+            queryset = queryset.prefetch_related(active_bookings_prefetch())
         if user.role == 'CHC_ADMIN' and user.chc:
-            return Machine.objects.select_related('chc').filter(chc=user.chc)
+            return queryset.filter(chc=user.chc)
         elif user.role == 'GOVT_ADMIN':
-            return Machine.objects.select_related('chc').all()
+            return queryset
         return Machine.objects.none()
 
     def perform_create(self, serializer):
@@ -38,7 +126,7 @@ class CHCMachineListCreateView(generics.ListCreateAPIView):
         else:
             raise PermissionDenied("You must be a CHC Admin to add machines.")
 
-class CHCMachineDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CHCMachineDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MachineSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
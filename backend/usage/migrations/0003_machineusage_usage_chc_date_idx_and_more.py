@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_booking_booking_chc_status_idx'),
+        ('chc', '0004_chc_updated_at'),
+        ('machines', '0003_machine_machine_chc_status_idx'),
+        ('usage', '0002_alter_machineusage_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='machineusage',
+            index=models.Index(fields=['chc', 'usage_date'], name='usage_chc_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='machineusage',
+            index=models.Index(fields=['machine', 'usage_date'], name='usage_machine_date_idx'),
+        ),
+    ]
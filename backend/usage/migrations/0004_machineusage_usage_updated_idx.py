@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_booking_updated_idx'),
+        ('chc', '0004_chc_updated_at'),
+        ('machines', '0003_machine_machine_chc_status_idx'),
+        ('usage', '0003_machineusage_usage_chc_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='machineusage',
+            index=models.Index(fields=['updated_at'], name='usage_updated_idx'),
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
 
-class MachineUsage(models.Model):
+from analytics.changes import AuditedModel
+
+class MachineUsage(AuditedModel):
+    audit_masked = ('farmer_aadhar',)
+
     machine = models.ForeignKey('machines.Machine', on_delete=models.CASCADE, related_name='usage_records')
     chc = models.ForeignKey('chc.CHC', on_delete=models.CASCADE, related_name='usage_records')
     booking = models.ForeignKey('bookings.Booking', on_delete=models.SET_NULL, null=True, blank=True, related_name='usage_records')
@@ -57,3 +61,11 @@ class MachineUsage(models.Model):
 
     class Meta:
         ordering = ['-usage_date', '-start_time']
+        indexes = [
+            # CHC usage lists and dashboards, newest day first
+            models.Index(fields=['chc', 'usage_date'], name='usage_chc_date_idx'),
+            # Per-machine history, latest-usage lookups and rollup refreshes
+            models.Index(fields=['machine', 'usage_date'], name='usage_machine_date_idx'),
+            # Incremental exports select rows changed since the last run
+            models.Index(fields=['updated_at'], name='usage_updated_idx'),
+        ]
@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from utils.sparse import SparseFieldsMixin
 from .models import MachineUsage
 
-class MachineUsageSerializer(serializers.ModelSerializer):
+class MachineUsageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = MachineUsage
         fields = '__all__'
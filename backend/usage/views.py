@@ -1,10 +1,13 @@
 from rest_framework import generics, permissions
 from .models import MachineUsage
 from .serializers import MachineUsageSerializer
+from utils.pagination import KeysetPagination
+from utils.sparse import SparseQuerysetMixin
 
-class MachineUsageListCreateView(generics.ListCreateAPIView):
+class MachineUsageListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = MachineUsageSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
     filterset_fields = ['machine', 'chc', 'booking']
 
     def get_queryset(self):
@@ -24,7 +27,7 @@ class MachineUsageListCreateView(generics.ListCreateAPIView):
         else:
             raise PermissionDenied("You must be a CHC Admin to record usage.")
 
-class MachineUsageDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MachineUsageDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MachineUsageSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -0,0 +1,195 @@
+"""Streaming table exports as NDJSON or CSV, optionally gzipped.
+
+Each table is read in primary key order with
+``values_list().iterator(chunk_size=...)`` and written one row at a time, so
+memory use does not grow with the table. Rows are plain tuples; no model
+instances are built. :func:`export_tables` runs tables concurrently in a
+thread or process pool, and each worker uses its own database connection.
+
+Files are written under a temporary name and renamed once complete, so a
+reader never sees a partial export.
+"""
+import csv
+import datetime
+import decimal
+import gzip
+import io
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+# name: (model, columns left out, columns cut down to their last four characters)
+TABLES = {
+    'users': ('accounts.User', ('password',), ()),
+    'chcs': ('chc.CHC', (), ()),
+    'machines': ('machines.Machine', (), ()),
+    'bookings': ('bookings.Booking', (), ('farmer_aadhar',)),
+    'usages': ('usage.MachineUsage', (), ('farmer_aadhar',)),
+    'audit_logs': ('analytics.AuditLog', (), ()),
+    'notifications': ('analytics.Notification', (), ()),
+}
+FORMATS = ('ndjson', 'csv')
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    # Keep microseconds, which DjangoJSONEncoder drops, so timestamps round-trip exactly
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+_encoder = ExportEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def columns(name):
+    """Column (attribute) names exported for table ``name``; foreign keys appear as ``<field>_id``."""
+    label, exclude, _ = TABLES[name]
+    return [
+        field.attname for field in apps.get_model(label)._meta.concrete_fields
+        if field.name not in exclude
+    ]
+
+
+def _masker(name, names):
+    masked = [index for index, column in enumerate(names) if column in TABLES[name][2]]
+    if not masked:
+        return None
+
+    def mask(row):
+        row = list(row)
+        for index in masked:
+            if row[index]:
+                row[index] = row[index][-4:].rjust(len(row[index]), '*')
+        return row
+    return mask
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return _encoder.encode(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+class _NDJSONWriter:
+    def __init__(self, stream, names):
+        self.stream = stream
+        self.names = names
+
+    def write(self, row):
+        self.stream.write(_encoder.encode(dict(zip(self.names, row))))
+        self.stream.write('\n')
+
+
+class _CSVWriter:
+    def __init__(self, stream, names):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(names)
+
+    def write(self, row):
+        self.writer.writerow([_csv_value(value) for value in row])
+
+
+def file_name(name, fmt='ndjson', compress=False, suffix=''):
+    return f"{name}{suffix}.{fmt}{'.gz' if compress else ''}"
+
+
+def open_export(path, compress=False):
+    """A text stream writing to ``path``, gzip-compressed if asked."""
+    raw = open(path, 'wb')
+    if compress:
+        # mtime=0 keeps identical exports byte-for-byte identical
+        raw = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0)
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='', write_through=False)
+
+
+def make_writer(stream, names, fmt='ndjson'):
+    """A writer whose ``write(row)`` takes tuples of ``names``; CSV writes the header first."""
+    return (_CSVWriter if fmt == 'csv' else _NDJSONWriter)(stream, names)
+
+
+def write_rows(stream, name, rows, fmt='ndjson'):
+    """Write ``rows`` (tuples in :func:`columns` order) for table ``name``; returns the number written."""
+    names = columns(name)
+    writer = make_writer(stream, names, fmt)
+    mask = _masker(name, names)
+    count = 0
+    for row in rows:
+        writer.write(mask(row) if mask else row)
+        count += 1
+    return count
+
+
+def table_rows(name, queryset=None, chunk_size=2000):
+    """Stream table ``name`` (or ``queryset`` of its model) as tuples in primary key order."""
+    if queryset is None:
+        queryset = apps.get_model(TABLES[name][0])._base_manager.all()
+    return queryset.order_by('pk').values_list(*columns(name)).iterator(chunk_size=chunk_size)
+
+
+def export_table(name, output_dir, fmt='ndjson', compress=False, chunk_size=2000, suffix=''):
+    """Write table ``name`` into ``output_dir``; returns ``{table, path, rows, bytes, seconds}``."""
+    path = Path(output_dir) / file_name(name, fmt, compress, suffix)
+    partial = path.with_name(f".{path.name}.partial")
+    started = time.perf_counter()
+    try:
+        with open_export(partial, compress) as stream:
+            count = write_rows(stream, name, table_rows(name, chunk_size=chunk_size), fmt)
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+    return {
+        'table': name, 'path': str(path), 'rows': count,
+        'bytes': path.stat().st_size, 'seconds': time.perf_counter() - started,
+    }
+
+
+def _export_in_worker(name, output_dir, **options):
+    try:
+        return export_table(name, output_dir, **options)
+    finally:
+        # Each pool thread or process opened its own connection
+        connections.close_all()
+
+
+def _init_process():
+    # Spawned (not forked) workers start without Django configured
+    if not apps.ready:
+        django.setup()
+
+
+def export_tables(names, output_dir, fmt='ndjson', compress=False, chunk_size=2000,
+                  workers=4, processes=False, suffix=''):
+    """Export ``names`` concurrently; yields each table's result as it finishes.
+
+    ``workers=1`` exports in the calling thread, one table after another.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    options = {'fmt': fmt, 'compress': compress, 'chunk_size': chunk_size, 'suffix': suffix}
+    if workers <= 1:
+        for name in names:
+            yield export_table(name, output_dir, **options)
+        return
+    if processes:
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+    with pool:
+        futures = [pool.submit(_export_in_worker, name, output_dir, **options) for name in names]
+        for future in as_completed(futures):
+            yield future.result()
@@ -16,7 +16,10 @@ from chc.models import CHC
 from machines.models import Machine
 from bookings.models import Booking
 from usage.models import MachineUsage
+from analytics import audit
 from analytics.models import AuditLog, Notification
+from analytics.rollups import rebuild_usage_rollup
+from analytics.cube import refresh_cube
 
 logger = logging.getLogger(__name__)
 
@@ -90,19 +93,24 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.WARNING("Starting population..."))
 
-        if options['clear']:
-            self.clear_data()
-
-        with transaction.atomic():
-            self.create_chcs()
-            self.create_chc_admins()
-            self.create_govt_admins()
-            self.create_machines()
-            self.create_bookings_and_usage()
-            self.update_machine_status()
-            self.create_audit_logs()
-            self.create_notifications()
-            self.validate_data()
+        # Seeded rows are not real changes; keep them out of the audit trail
+        with audit.suspended():
+            if options['clear']:
+                self.clear_data()
+
+            with transaction.atomic():
+                self.create_chcs()
+                self.create_chc_admins()
+                self.create_govt_admins()
+                self.create_machines()
+                self.create_bookings_and_usage()
+                self.update_machine_status()
+                self.create_audit_logs()
+                self.create_notifications()
+                self.validate_data()
+                # Usage rows are bulk-inserted, which bypasses the rollup signals
+                rebuild_usage_rollup()
+                refresh_cube()
 
         self.print_summary()
         self.stdout.write(self.style.SUCCESS("Done!"))
@@ -1,3 +1,13 @@
 from django.db import models
 
-# Create your models here.
+
+class ExportWatermark(models.Model):
+    """How far ``export_data --incremental`` has exported a table."""
+    table = models.CharField(max_length=50, unique=True)
+    # Rows changed before this instant have been exported
+    exported_until = models.DateTimeField()
+    run = models.CharField(max_length=20)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.table} until {self.exported_until}"
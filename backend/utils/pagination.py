@@ -1,4 +1,18 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
 
 class CustomPagination(PageNumberPagination):
     page_size = 10
@@ -9,3 +23,180 @@ class CustomPagination(PageNumberPagination):
         if request.query_params.get('nopage') == 'true':
             return None
         return super().paginate_queryset(queryset, request, view)
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder drops microseconds, which would make the seek skip or repeat rows
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def estimate_count(queryset):
+    """Row count of ``queryset``; the planner's estimate on Postgres, exact elsewhere.
+
+    Returns ``(count, is_estimate)``.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows']), True
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks past the last row instead of using OFFSET.
+
+    The page order is the queryset's ``order_by()`` (or the model's default
+    ordering) with the primary key appended as a tie-breaker. The cursor holds
+    the ordering values of the last row sent, and the next page is fetched
+    with a row comparison on them. The cost of a page is then the same however
+    deep it is. Ordering fields must not be NULL.
+
+    ``?count=true`` adds a ``count``. On Postgres it is the planner's estimate,
+    so there is no extra scan. ``?nopage=true`` still returns the whole list
+    for older clients.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or [])
+        names = {field.lstrip('-') for field in ordering}
+        if 'pk' not in names and queryset.model._meta.pk.name not in names:
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(json.dumps(values, cls=_CursorEncoder).encode()).decode()
+
+    def cursor_fields(self, model, ordering):
+        """The model field behind each ordering entry (None for annotations)."""
+        fields = []
+        for entry in ordering:
+            opts, field = model._meta, None
+            try:
+                for part in entry.lstrip('-').split('__'):
+                    field = opts.pk if part == 'pk' else opts.get_field(part)
+                    if field.is_relation:
+                        opts = field.related_model._meta
+            except FieldDoesNotExist:
+                field = None
+            fields.append(field)
+        return fields
+
+    def decode_cursor(self, request, ordering, model=None):
+        """The cursor's ordering values, converted with each field's ``to_python()`` when ``model`` is given.
+
+        A cursor that does not decode to one non-null scalar per ordering
+        entry raises ``NotFound`` rather than failing inside the query.
+        """
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(raw.encode()))
+        except ValueError:
+            raise NotFound("Invalid cursor")
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound("Invalid cursor")
+        if any(value is None or isinstance(value, (dict, list)) for value in values):
+            raise NotFound("Invalid cursor")
+        if model is None:
+            return values
+        converted = []
+        for field, value in zip(self.cursor_fields(model, ordering), values):
+            if field is not None:
+                try:
+                    value = field.to_python(value)
+                except (ValidationError, TypeError, ValueError):
+                    raise NotFound("Invalid cursor")
+                if value is None:
+                    raise NotFound("Invalid cursor")
+                if isinstance(value, datetime.datetime) and timezone.is_naive(value) and settings.USE_TZ:
+                    value = timezone.make_aware(value, datetime.timezone.utc)
+            converted.append(value)
+        return converted
+
+    def seek(self, ordering, values):
+        """Rows strictly after ``values`` in ``ordering``, as one OR of prefix-equal comparisons."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def row_values(self, row, ordering):
+        values = []
+        for field in ordering:
+            value = row
+            for part in field.lstrip('-').split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('nopage') == 'true':
+            return None
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+
+        self.count = None
+        if request.query_params.get('count') == 'true':
+            self.count = estimate_count(queryset)
+
+        values = self.decode_cursor(request, ordering, queryset.model)
+        page = queryset.order_by(*ordering)
+        if values is not None:
+            page = page.filter(self.seek(ordering, values))
+        rows = list(page[:self.page_size_value + 1])
+
+        self.next_values = None
+        if len(rows) > self.page_size_value:
+            rows = rows[:self.page_size_value]
+            self.next_values = self.row_values(rows[-1], ordering)
+        return rows
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_values))
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link()}
+        if self.count is not None:
+            payload['count'], payload['count_is_estimate'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_is_estimate': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
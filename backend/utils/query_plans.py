@@ -0,0 +1,45 @@
+"""Read query plans to check that hot ORM queries stay on an index."""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+# Subqueries name their tables with aliases such as "bookings_booking" U0
+_ALIAS = re.compile(r'"(\w+)" (U\d+)\b')
+
+
+@contextmanager
+def _prefer_indexes():
+    # On small test tables Postgres rightly picks sequential scans; forbid them
+    # so the plan shows whether an index *could* serve the query.
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+
+def explain(queryset):
+    """The database's plan for ``queryset`` (``EXPLAIN`` / ``EXPLAIN QUERY PLAN``)."""
+    with _prefer_indexes():
+        return queryset.explain()
+
+
+def full_scans(queryset):
+    """Tables that the plan for ``queryset`` reads from start to end.
+
+    On SQLite a ``SCAN`` over a table counts even when it walks an index
+    (``SCAN t USING INDEX i``), since every row is still visited.
+    """
+    pattern = _POSTGRES_SCAN if connection.vendor == 'postgresql' else _SQLITE_SCAN
+    tables = set(connection.introspection.table_names())
+    aliases = dict((alias, table) for table, alias in _ALIAS.findall(str(queryset.query)))
+    scanned = {aliases.get(name, name) for name in pattern.findall(explain(queryset))}
+    return sorted(scanned & tables)
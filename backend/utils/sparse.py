@@ -0,0 +1,118 @@
+"""``?fields=`` / ``?expand=`` support shared by serializers and their views.
+
+``fields`` lists the top-level fields to return. ``expand`` names the
+*expandable* fields to include: nested objects and computed fields that
+cost extra lookups, declared in ``Meta.expandable_fields``.
+
+- With neither parameter, responses are unchanged.
+- With only ``expand``, every plain field is returned, plus the expandable
+  fields that were named.
+- With ``fields``, exactly the named fields are returned. An expandable field
+  is returned when it appears in ``fields`` or ``expand``.
+
+Views using :class:`SparseQuerysetMixin` also narrow the SQL with ``only()``
+and drop ``select_related`` joins nobody asked for.
+"""
+from rest_framework import serializers
+
+
+def _names(request, param):
+    raw = request.query_params.get(param, '')
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+def sparse_selection(request):
+    """``(fields, expand)`` requested, or None when the client asked for the default shape.
+
+    Only reads honour the parameters; writes always validate every field.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    fields, expand = _names(request, 'fields'), _names(request, 'expand')
+    if not fields and not expand:
+        return None
+    return fields, expand
+
+
+class SparseFieldsMixin:
+    """Serializer mixin: prunes ``self.fields`` to the request's ``?fields=`` / ``?expand=``.
+
+    ``Meta.field_sources`` maps method fields to the model paths they read,
+    so :func:`model_paths` can tell the view which columns to load.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Nested serializers are built without a context and keep all their fields
+        selection = sparse_selection(self._context.get('request'))
+        if selection is None:
+            return
+        fields, expand = selection
+        expandable = set(getattr(self.Meta, 'expandable_fields', ()))
+        for name in list(self.fields):
+            if fields:
+                keep = name in fields or (name in expandable and name in expand)
+            else:
+                keep = name not in expandable or name in expand
+            if not keep:
+                self.fields.pop(name)
+
+
+def model_paths(serializer):
+    """Model field paths that rendering ``serializer.fields`` reads."""
+    model = serializer.Meta.model
+    sources = getattr(serializer.Meta, 'field_sources', {})
+    paths = {model._meta.pk.name}
+    for name, field in serializer.fields.items():
+        if name in sources:
+            paths.update(sources[name])
+        elif isinstance(field, serializers.ListSerializer):
+            continue  # reverse relations are loaded separately
+        elif isinstance(field, serializers.BaseSerializer):
+            paths.update(f"{field.source}__{path}" for path in model_paths(field))
+        elif field.source != '*':
+            paths.add(field.source.split('.')[0])
+    return paths
+
+
+class SparseQuerysetMixin:
+    """View mixin: loads only the columns the sparse serializer will read."""
+
+    def sparse_fields(self):
+        """Names of the fields the response will contain, or None for the default shape."""
+        if sparse_selection(self.request) is None:
+            return None
+        return set(self.get_serializer().fields)
+
+    def wants(self, name):
+        fields = self.sparse_fields()
+        return fields is None or name in fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if sparse_selection(self.request) is None:
+            return queryset
+        return self.sparse_queryset(queryset)
+
+    def sparse_queryset(self, queryset):
+        paths = model_paths(self.get_serializer())
+        # Columns the paginator and ordering read back from each row
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or ()
+        paths.update(field.lstrip('-').split('__')[0] for field in ordering if isinstance(field, str))
+
+        joined = queryset.query.select_related
+        joined = set(joined) if isinstance(joined, dict) else set()
+        needed = {path.split('__')[0] for path in paths if '__' in path} & joined
+        # Related paths without a join would load lazily; keep just the foreign key.
+        # Annotations and properties are not columns and are left alone.
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = {
+            path if path.split('__')[0] in needed else path.split('__')[0]
+            for path in paths
+            if path.split('__')[0] in concrete
+        }
+        queryset = queryset.select_related(None)
+        if needed:
+            # select_related() with no arguments would follow every foreign key
+            queryset = queryset.select_related(*needed)
+        return queryset.only(*columns)
@@ -87,21 +87,35 @@ class API {
         }
     }
 
-    // Helper to fetch all pages for DRF paginated endpoints
-    static async fetchAllPages(endpointUrl, auth = false, startMethod = 'GET') {
-        // Append nopage=true to fetch all items in a single request
+    // Helper to walk DRF paginated endpoints by following the `next` cursor.
+    // With onPage(items), each page is handed over as it arrives and nothing is kept,
+    // so memory stays at one page; the total item count is returned. Without it,
+    // every item is collected and returned (only for lists known to be small).
+    static async fetchAllPages(endpointUrl, auth = false, startMethod = 'GET', onPage = null, pageSize = 200) {
         const separator = endpointUrl.includes('?') ? '&' : '?';
-        const unpaginatedUrl = `${endpointUrl}${separator}nopage=true`;
+        let relativePath = `${endpointUrl}${separator}page_size=${pageSize}`;
+        const items = [];
+        let count = 0;
+
+        while (relativePath) {
+            const data = await this.request(relativePath, startMethod, null, auth);
+            if (!data) break;
+
+            const page = Array.isArray(data) ? data : (data.results ? data.results : [data]);
+            count += page.length;
+            if (onPage) {
+                onPage(page);
+            } else {
+                items.push(...page);
+            }
 
-        let relativePath = unpaginatedUrl;
-        if (unpaginatedUrl.startsWith(API_BASE_URL)) {
-            relativePath = unpaginatedUrl.substring(API_BASE_URL.length);
+            const next = Array.isArray(data) ? null : data.next;
+            if (!next) break;
+            // `next` is absolute; request() wants a path relative to the API root
+            const apiRoot = next.indexOf('/api/v1');
+            relativePath = apiRoot === -1 ? null : next.substring(apiRoot + '/api/v1'.length);
         }
-
-        const data = await this.request(relativePath, startMethod, null, auth);
-
-        // CustomPagination with nopage=true returns a flat array, or DRF might return an object with results
-        return Array.isArray(data) ? data : (data.results ? data.results : [data]);
+        return onPage ? count : items;
     }
 
     // Auth
@@ -146,6 +160,51 @@ class API {
         return await this.request('/analytics/govt/reports/', 'GET', null, true);
     }
 
+    // Aggregate cube: query = { level: 'state' | 'district' | 'chc', state, district, ordering, page }
+    static async getGovtDrilldown(query = {}) {
+        const params = new URLSearchParams(query).toString();
+        return await this.request(`/analytics/govt/drilldown/?${params}`, 'GET', null, true);
+    }
+
+    // Audit trail (live + archived): query = { user, table, action, record, start_date, end_date, archived, page_size, cursor }
+    static async getGovtAuditLog(query = {}) {
+        const params = new URLSearchParams(query).toString();
+        return await this.request(`/analytics/govt/audit/?${params}`, 'GET', null, true);
+    }
+
+    // Usage trends: query = { resolution, state, district, chc, machine_type, start_date, end_date }
+    static async getUsageTimeSeries(query = {}) {
+        const params = new URLSearchParams(query).toString();
+        return await this.request(`/analytics/usage/timeseries/?${params}`, 'GET', null, true);
+    }
+
+    // Notifications: query = { unread: 'true', page_size, cursor }
+    static async getNotifications(query = {}) {
+        const params = new URLSearchParams(query).toString();
+        return await this.request(`/analytics/notifications/?${params}`, 'GET', null, true);
+    }
+
+    static async getUnreadNotificationCount() {
+        return await this.request('/analytics/notifications/unread-count/', 'GET', null, true);
+    }
+
+    // ids: array of notification ids, or null to mark everything read
+    static async markNotificationsRead(ids = null) {
+        const body = ids === null ? { all: true } : { ids };
+        return await this.request('/analytics/notifications/mark-read/', 'POST', body, true);
+    }
+
+    // Live dashboard updates (server-sent events). handlers maps event types such as
+    // 'booking.status' or 'resync' to callbacks taking the parsed data. Call close() on the result to stop.
+    static openLiveEvents(handlers) {
+        const token = localStorage.getItem('access_token');
+        const source = new EventSource(`${API_BASE_URL}/analytics/live/?token=${encodeURIComponent(token || '')}`);
+        for (const [type, handler] of Object.entries(handlers)) {
+            source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+        }
+        return source;
+    }
+
     // Analytics (CHC)
     static async getCHCDashboard() {
         return await this.request('/analytics/chc/dashboard/', 'GET', null, true);
@@ -165,8 +224,8 @@ class API {
     }
 
     // Profile Management
-    static async getCHCAdmins() {
-        return await this.fetchAllPages('/auth/admins/', true);
+    static async getCHCAdmins(onPage = null) {
+        return await this.fetchAllPages('/auth/admins/', true, 'GET', onPage);
     }
 
     static async removeCHCAdmin(adminId) {
@@ -189,13 +248,25 @@ class API {
         return await this.request('/auth/change_password/', 'POST', { new_password: newPassword }, true);
     }
 
+    // CHCs visible to the signed-in admin, page by page through onPage(chcs)
+    static async getCHCs(onPage = null) {
+        return await this.fetchAllPages('/chc/', true, 'GET', onPage);
+    }
+
     // Machines
-    static async getMachines(publicView = false, chcId = null) {
+    // The list helpers below take an optional onPage(items) to render each page as it arrives
+    static async getMachines(publicView = false, chcId = null, onPage = null) {
         let endpoint = publicView ? '/machines/public/' : '/machines/';
         if (chcId) {
             endpoint += `?chc=${chcId}`;
         }
-        return await this.fetchAllPages(endpoint, !publicView);
+        return await this.fetchAllPages(endpoint, !publicView, 'GET', onPage);
+    }
+
+    static async searchAvailableMachines(query, onPage = null) {
+        // query: { start_date, end_date, machine_type?, district?, pincode? }
+        const params = new URLSearchParams(query).toString();
+        return await this.fetchAllPages(`/machines/public/available/?${params}`, false, 'GET', onPage);
     }
 
     // Get single machine detail (for CHC admin)
@@ -204,8 +275,8 @@ class API {
     }
 
     // Get usage history for a machine
-    static async getMachineUsage(machineId) {
-        return await this.fetchAllPages(`/usage/?machine=${machineId}`, true);
+    static async getMachineUsage(machineId, onPage = null) {
+        return await this.fetchAllPages(`/usage/?machine=${machineId}`, true, 'GET', onPage);
     }
 
     // Get booked dates for a machine (for public booking calendar)
@@ -213,6 +284,12 @@ class API {
         return await this.request(`/bookings/public/machine/${machineId}/dates/`, 'GET', null, false);
     }
 
+    static async getMachineNextFreeWindow(machineId, days = 1, from = null) {
+        const params = new URLSearchParams({ days });
+        if (from) params.append('from', from);
+        return await this.request(`/bookings/public/machine/${machineId}/next-free/?${params.toString()}`, 'GET', null, false);
+    }
+
     // Bookings
     static async createBooking(data) {
         return await this.request('/bookings/public/create/', 'POST', data, false);
@@ -224,21 +301,33 @@ class API {
     }
 
     // CHC Search
-    static async searchCHCs(query) {
+    // onPage(chcs) renders each page as it arrives; returns the number of CHCs found
+    static async searchCHCs(query, onPage) {
         const params = new URLSearchParams(query).toString();
-        return await this.fetchAllPages(`/chc/public/search/?${params}`, false);
+        return await this.fetchAllPages(`/chc/public/search/?${params}`, false, 'GET', onPage, 50);
     }
 
     // CHC Admin Bookings
-    static async getCHCBookings(queryParams = '') {
+    static async getCHCBookings(queryParams = '', onPage = null) {
         const url = queryParams ? `/bookings/chc/?${queryParams}` : '/bookings/chc/';
-        return await this.fetchAllPages(url, true);
+        return await this.fetchAllPages(url, true, 'GET', onPage);
+    }
+
+    // First page only, e.g. the newest few bookings for the activity feed
+    static async getRecentCHCBookings(limit = 5) {
+        const data = await this.request(`/bookings/chc/?page_size=${limit}`, 'GET', null, true);
+        return Array.isArray(data) ? data.slice(0, limit) : (data.results || []);
     }
 
     static async updateBookingStatus(id, action, notes = '') {
         return await this.request(`/bookings/chc/${id}/action/`, 'PATCH', { action, notes }, true);
     }
 
+    static async bulkUpdateBookingStatus(actions) {
+        // actions: [{ id, action, notes }]
+        return await this.request('/bookings/chc/bulk-action/', 'POST', { actions }, true);
+    }
+
     // --- Machine Usage (Linked to booking) ---
     static async createMachineUsage(data) {
         return await this.request('/usage/', 'POST', data, true);